@@ -0,0 +1,209 @@
+"""
+Memory of the review processor step, before and after streaming.
+
+legacy: fetchall() of reviews and photos, a photo_map over the whole
+version, a Review per row, then one json.dumps of every asdict() (the
+pre-streaming fetch_reviews + _process_reviews).
+stream: iter_reviews() keyset pages merged with their photos in one pass,
+serialized LLM_BATCH_SIZE reviews at a time.
+process: the whole step (review_processor.main) against a zero-latency
+FakeLLM: fetch, analysis, per-batch inserts, snapshot and JSON output, and
+the live events and search index fed from the committed rows.
+
+Each (size, mode) runs in its own process and reports peak RSS (VmHWM,
+reset just before the fetch; Linux only) above the RSS before the fetch.
+Streaming should stay flat as size grows.
+
+Run from backend/app/test:
+    python -m benchmarks.bench_fetch_reviews --sizes 10000 50000 100000
+    python -m benchmarks.bench_fetch_reviews --modes process --sizes 10000 50000
+"""
+import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+TEST_DIR = pathlib.Path(__file__).resolve().parents[1]
+BACKEND_DIR = TEST_DIR.parents[1]
+
+
+def seed_raw(workdir: pathlib.Path, size: int) -> tuple[pathlib.Path, int]:
+    """Load `size` raw reviews and their photos into a FakeDatabase; returns (db dir, version_id)."""
+    from benchmarks.fakes import FakeDatabase
+    from benchmarks.fixtures import make_raw_reviews
+    from app.test.services import datasets, properties
+
+    db_dir = workdir / "db"
+    db = FakeDatabase(db_dir)
+    raw = make_raw_reviews(size)
+    with db.connect() as conn:
+        cursor = conn.cursor()
+        hotel_id = properties.get_or_create_property(cursor, f"https://fixture.invalid/fetch-{size}.html")
+        version_id = datasets.begin_version(cursor, hotel_id)
+        cursor.executemany(
+            "INSERT INTO dbo.reviews (hotel_id, version_id, review_id, title, score, positive_txt, "
+            "negative_txt, posted_date, reviewer_stay_date, num_of_nights, traveler_type, room_name, "
+            "raw_review) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(hotel_id, version_id, r["review_id"], r["title"], r["score"], r["positive_txt"],
+              r["negative_txt"], r["posted_date"], r["reviewer_stay_date"], r["num_of_nights"],
+              r["traveler_type"], r["room_name"], r["raw_review"]) for r in raw],
+        )
+        cursor.executemany(
+            "INSERT INTO dbo.review_photos (hotel_id, version_id, review_id, src, alt) VALUES (?, ?, ?, ?, ?)",
+            [(hotel_id, version_id, r["review_id"], p["src"], p["alt"]) for r in raw for p in r["photo"]],
+        )
+    return db_dir, version_id
+
+
+def legacy_fetch(version_id: int) -> int:
+    """The pre-streaming fetch and prompt payload, kept here as the baseline."""
+    import pyodbc
+
+    from app.test.services.review_processor import CONN_STR, Picture, Review
+
+    with pyodbc.connect(CONN_STR) as conn:
+        cur = conn.cursor()
+        rows = cur.execute(
+            "SELECT hotel_id, review_id, title, score, positive_txt, negative_txt, "
+            "posted_date, reviewer_stay_date, num_of_nights, traveler_type, "
+            "room_name, raw_review FROM reviews WHERE version_id = ?",
+            version_id,
+        ).fetchall()
+        pics = cur.execute(
+            "SELECT hotel_id, review_id, src, alt FROM review_photos WHERE version_id = ?", version_id
+        ).fetchall()
+        photo_map = {}
+        for pic_hotel, rev_id, src, alt in pics:
+            photo_map.setdefault((pic_hotel, rev_id), []).append(Picture(src=src or "", alt=alt or ""))
+        reviews = [
+            Review(
+                review_id=r.review_id, title=r.title or "", score=float(r.score or 0),
+                positive_txt=r.positive_txt or "", negative_txt=r.negative_txt or "",
+                posted_date=r.posted_date.isoformat() if r.posted_date else None,
+                reviewer_stay_date=r.reviewer_stay_date.isoformat() if r.reviewer_stay_date else None,
+                num_of_nights=r.num_of_nights or 0, traveler_type=r.traveler_type or "",
+                room_name=r.room_name or "", raw_review=r.raw_review or "",
+                photo=photo_map.get((r.hotel_id, r.review_id), []),
+            )
+            for r in rows
+        ]
+    hotel_data = json.dumps([asdict(r) for r in reviews], ensure_ascii=False)
+    return len(reviews) if hotel_data else 0
+
+
+def stream_fetch(version_id: int) -> int:
+    from app.test.services import review_processor
+
+    count = 0
+    for batch in review_processor.batched(
+        review_processor.iter_reviews(version_id=version_id), review_processor.LLM_BATCH_SIZE
+    ):
+        json.dumps([review_processor.review_payload(r) for r in batch], ensure_ascii=False)
+        count += len(batch)
+    return count
+
+
+def process_step(version_id: int) -> int:
+    """review_processor.main() for the seeded version, outputs written to the current directory."""
+    import pyodbc
+
+    from app.test.services import review_processor
+    from app.test.services.review_processor import CONN_STR
+    from benchmarks.fakes import FakeLLM
+
+    review_processor.client = FakeLLM()
+    with pyodbc.connect(CONN_STR) as conn:
+        hotel_id = conn.cursor().execute(
+            "SELECT hotel_id FROM dbo.dataset_versions WHERE version_id = ?", version_id
+        ).fetchone()[0]
+    return review_processor.main(hotel_id, version_id)
+
+
+def _status_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def _reset_peak_rss() -> None:
+    """Restart the kernel's peak RSS (VmHWM) count, so import-time peaks don't count."""
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def worker(mode: str, db_dir: str, version_id: int) -> dict:
+    """Child process: one fetch, peak RSS above the starting RSS."""
+    import pyodbc
+
+    from benchmarks.fakes import FakeDatabase
+
+    pyodbc.connect = FakeDatabase(db_dir).connect
+    from app.test.services import review_processor  # noqa: F401  (imported before measuring)
+
+    os.chdir(os.environ.get("PROCESS_OUTPUT_DIR", "."))  # where the process step writes its files
+
+    before = _status_mb("VmRSS")
+    _reset_peak_rss()
+    start = time.perf_counter()
+    reviews = {"legacy": legacy_fetch, "stream": stream_fetch, "process": process_step}[mode](version_id)
+    seconds = time.perf_counter() - start
+    peak = _status_mb("VmHWM")
+    return {
+        "reviews": reviews,
+        "seconds": round(seconds, 3),
+        "rss_before_mb": round(before, 1),
+        "peak_rss_mb": round(peak, 1),
+        "fetch_rss_mb": round(peak - before, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Peak memory of the review processor step, legacy vs streaming.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--modes", nargs="+", choices=["legacy", "stream", "process"],
+                        default=["legacy", "stream", "process"])
+    parser.add_argument("--out", type=pathlib.Path, help="Write the results as JSON")
+    parser.add_argument("--worker", nargs=3, metavar=("MODE", "DB_DIR", "VERSION"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sys.path[:0] = [str(TEST_DIR), str(BACKEND_DIR)]
+
+    if args.worker:
+        mode, db_dir, version_id = args.worker
+        print("RESULT " + json.dumps(worker(mode, db_dir, int(version_id))))
+        return
+
+    report = {}
+    print(f"{'reviews':>8} {'mode':<7} {'seconds':>8} {'fetch RSS MB':>13} {'peak RSS MB':>12}")
+    for size in args.sizes:
+        workdir = pathlib.Path(tempfile.mkdtemp(prefix=f"fetch-{size}-"))
+        db_dir, version_id = seed_raw(workdir, size)
+        report[str(size)] = results = {}
+        for mode in args.modes:
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_fetch_reviews",
+                 "--worker", mode, str(db_dir), str(version_id)],
+                cwd=TEST_DIR, capture_output=True, text=True,
+                env={**os.environ, "SEARCH_INDEX_PATH": str(workdir / "search_index.db"),
+                     "LIVE_EVENTS_PATH": str(workdir / "live_events.db"), "PROCESS_OUTPUT_DIR": str(workdir)},
+            )
+            line = next((l for l in proc.stdout.splitlines() if l.startswith("RESULT ")), None)
+            if line is None:
+                print(f"{size:>8} {mode:<7} FAILED: {proc.stderr.strip()[-200:]}")
+                continue
+            results[mode] = r = json.loads(line[len("RESULT "):])
+            print(f"{size:>8} {mode:<7} {r['seconds']:>8} {r['fetch_rss_mb']:>13} {r['peak_rss_mb']:>12}")
+
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"✓ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
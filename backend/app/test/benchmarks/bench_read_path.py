@@ -0,0 +1,161 @@
+"""
+Compare the GET /reviews read path before and after the set-based join.
+
+legacy: processed rows, then photos with one IN (?, ?, ...) parameter per
+review (the raw id parsed out of platformReviewId), stitched with dicts.
+join: one LEFT JOIN on (version_id, review_id), pulled with fetchmany.
+
+Runs on the SQLite FakeDatabase, whose variable limit (32766) is far above
+SQL Server's ~2100 parameters, so the legacy path is also flagged wherever
+it would exceed the SQL Server limit.
+
+Run from backend/app/test:
+    python -m benchmarks.bench_read_path --sizes 10000 100000
+"""
+import argparse
+import json
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+TEST_DIR = pathlib.Path(__file__).resolve().parents[1]
+BACKEND_DIR = TEST_DIR.parents[1]
+
+SQL_SERVER_MAX_PARAMS = 2100
+
+
+def legacy_read(connect, hotel_id=None, stats=None):
+    """The pre-join read path, kept here as the baseline."""
+    from app.test.main import build_review_dict
+    from app.test.services import datasets, photo_mirror
+
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        where, params = datasets.active_filter(hotel_id)
+        rows = cursor.execute(f"""
+            SELECT
+                hotel_id, id, platformReviewId, rating, userName, reviewerName,
+                reviewText, summary, sentiment, language, categories,
+                keyPhrases, reviewDate, status, replyStatus, hasReply, source
+            FROM dbo.ProcessedReviews
+            {where}
+        """, *params).fetchall()
+
+        original_ids, id_map = [], {}
+        for r in rows:
+            try:
+                orig_id = int(r.platformReviewId.split("-")[1])
+            except (AttributeError, ValueError, IndexError):
+                continue
+            original_ids.append(orig_id)
+            id_map[(r.hotel_id, orig_id)] = (r.hotel_id, r.id)
+
+        photo_map = {}
+        if original_ids:
+            if stats is not None:
+                stats["parameters"] = len(params) + len(original_ids)
+            placeholders = ",".join("?" * len(original_ids))
+            pics = cursor.execute(
+                f"SELECT hotel_id, review_id, src, alt, content_hash FROM review_photos {where} "
+                f"AND review_id IN ({placeholders})",
+                params + original_ids,
+            ).fetchall()
+            for hid, pid, src, alt, content_hash in pics:
+                sys_id = id_map.get((hid, pid))
+                if sys_id:
+                    photo_map.setdefault(sys_id, []).append(photo_mirror.photo_dict(src, alt, content_hash))
+
+        return [build_review_dict(row, photo_map.get((row.hotel_id, row.id), [])) for row in rows]
+    finally:
+        conn.close()
+
+
+def measure(fn) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:  # the legacy path may hit the variable limit
+        tracemalloc.stop()
+        return {"error": str(e)[:120]}
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": round(seconds, 3),
+        "reviews": len(result),
+        "photos": sum(len(r["photos"]) for r in result),
+        "peak_mb": round(peak / 2**20, 1),
+    }
+
+
+def run(size: int) -> dict:
+    from benchmarks.fakes import FakeCursor, FakeDatabase
+    from benchmarks.load_test import seed
+
+    import pyodbc
+
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix=f"read-path-{size}-"))
+    db = FakeDatabase(seed(workdir, size))
+    pyodbc.connect = db.connect
+    from app.test import main as api
+
+    # Count statements sent to the database per read
+    queries = {"n": 0}
+    original_execute = FakeCursor.execute
+
+    def counting_execute(self, sql, *params):
+        queries["n"] += 1
+        return original_execute(self, sql, *params)
+
+    FakeCursor.execute = counting_execute
+    results = {}
+    try:
+        legacy_stats: dict = {}
+        for name, fn in (
+            ("legacy", lambda: legacy_read(db.connect, stats=legacy_stats)),
+            ("join", lambda: api._get_all_reviews_from_db()),
+            ("join_stream", lambda: list(api.iter_reviews_from_db())),
+        ):
+            queries["n"] = 0
+            results[name] = measure(fn)
+            results[name]["queries"] = queries["n"]
+        params = legacy_stats.get("parameters", 0)
+        results["legacy"]["parameters"] = params
+        results["legacy"]["exceeds_sql_server_limit"] = params > SQL_SERVER_MAX_PARAMS
+    finally:
+        FakeCursor.execute = original_execute
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Legacy IN-list vs joined read path for GET /reviews.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--out", type=pathlib.Path, help="Write the results as JSON")
+    args = parser.parse_args()
+    sys.path[:0] = [str(TEST_DIR), str(BACKEND_DIR)]
+
+    report = {}
+    for size in args.sizes:
+        print(f"\n=== {size} reviews ===")
+        report[str(size)] = results = run(size)
+        for name, r in results.items():
+            if "error" in r:
+                print(f"  {name:<12} FAILED: {r['error']}")
+                continue
+            extra = ""
+            if name == "legacy":
+                extra = f"  params={r['parameters']}" + (" (> SQL Server limit)" if r["exceeds_sql_server_limit"] else "")
+            print(f"  {name:<12} {r['seconds']:>8.3f}s  {r['reviews']} reviews / {r['photos']} photos  "
+                  f"queries={r['queries']}  peak={r['peak_mb']} MB{extra}")
+
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n✓ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
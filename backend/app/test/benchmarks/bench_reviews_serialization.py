@@ -0,0 +1,119 @@
+"""
+Compare the validated /reviews response against the streaming fast path.
+
+Run from backend/app/test:
+    python -m benchmarks.bench_reviews_serialization --rows 50000
+"""
+import argparse
+import datetime
+import json
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import TypeAdapter
+
+from main import ReviewModel, build_review_dict, serialize_review_row, stream_reviews_json
+
+
+def make_rows(n: int):
+    """Synthetic ProcessedReviews rows shaped like pyodbc results."""
+    rows = []
+    for i in range(1, n + 1):
+        rows.append(SimpleNamespace(
+            id=f"REV-{i:03d}",
+            platformReviewId=f"BK-{i}",
+            rating=(i % 5) + 1,
+            userName=f"Guest {i}",
+            reviewerName=f"Guest {i}",
+            reviewText="Great location. Friendly staff. The wifi was slow in the evenings.",
+            summary="Guest liked the location and staff but found the wifi slow.",
+            sentiment=("Negative", "Neutral", "Positive")[i % 3],
+            language="English",
+            categories=json.dumps(["Location", "Staff", "WiFi"]),
+            keyPhrases=json.dumps(["great location", "friendly staff", "slow wifi"]),
+            reviewDate=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365),
+            status="Pending",
+            replyStatus="Pending",
+            hasReply="No",
+            source="Booking.com",
+        ))
+    return rows
+
+
+def make_photos(i: int):
+    if i % 4:
+        return []
+    return [{"src": f"https://cf.bstatic.com/xdata/images/{i}.jpg", "alt": "Guest photo"}]
+
+
+def validated_response(rows) -> bytes:
+    """Mirror FastAPI's response_model path: validate every row, then encode."""
+    adapter = TypeAdapter(List[ReviewModel])
+    dicts = [build_review_dict(row, make_photos(i)) for i, row in enumerate(rows, start=1)]
+    models = adapter.validate_python(dicts)
+    content = adapter.dump_python(models, mode="json", by_alias=True)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def streamed_response(rows, ndjson: bool = False) -> bytes:
+    reviews = (serialize_review_row(row, make_photos(i)) for i, row in enumerate(rows, start=1))
+    return b"".join(stream_reviews_json(reviews, ndjson=ndjson))
+
+
+def drain_stream(rows, ndjson: bool = False) -> int:
+    """Consume the stream chunk by chunk, as the ASGI server would."""
+    reviews = (serialize_review_row(row, make_photos(i)) for i, row in enumerate(rows, start=1))
+    return sum(len(chunk) for chunk in stream_reviews_json(reviews, ndjson=ndjson))
+
+
+def measure(label: str, fn, *args) -> dict:
+    tracemalloc.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    payload = fn(*args)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        "path": label,
+        "cpu_s": round(cpu, 4),
+        "wall_s": round(wall, 4),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+        "bytes": payload if isinstance(payload, int) else len(payload),
+    }
+    print(f"{label:<12} cpu={result['cpu_s']:.3f}s wall={result['wall_s']:.3f}s "
+          f"peak={result['peak_mb']:.1f}MB size={result['bytes']}")
+    return result
+
+
+def check_equivalence(rows) -> None:
+    """The fast path must produce the same documents as ReviewModel."""
+    expected = json.loads(validated_response(rows))
+    actual = json.loads(streamed_response(rows))
+    assert actual == expected, "stream=json diverges from ReviewModel output"
+
+    ndjson = streamed_response(rows, ndjson=True).decode("utf-8").splitlines()
+    assert [json.loads(line) for line in ndjson] == expected, "stream=ndjson diverges from ReviewModel output"
+    print(f"✓ Schema equivalence holds for {len(rows)} rows")
+
+
+def run(n: int) -> list[dict]:
+    rows = make_rows(n)
+    check_equivalence(rows[:500])
+
+    print(f"\n--- /reviews serialization, {n} rows ---")
+    return [
+        measure("validated", validated_response, rows),
+        measure("stream=json", drain_stream, rows),
+        measure("stream=ndjson", drain_stream, rows, True),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark /reviews serialization paths.")
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+    run(args.rows)
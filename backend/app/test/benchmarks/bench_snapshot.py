@@ -0,0 +1,98 @@
+"""
+Compare the Arrow review snapshots against the pretty-printed JSON files.
+
+Run from backend/app/test:
+    python -m benchmarks.bench_snapshot --rows 100000
+    python -m benchmarks.bench_snapshot --json scraping/BookingOutput/reviews.json
+"""
+import argparse
+import json
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+import pyarrow.compute as pc
+
+from app.test.services import snapshot
+
+
+def make_raw_reviews(n: int) -> list[dict]:
+    return [
+        {
+            "review_id": i,
+            "title": f"Stay number {i}",
+            "score": float(i % 10 + 1),
+            "positive_txt": "Great location and friendly staff at the front desk.",
+            "negative_txt": "The wifi was slow and the room was a bit small.",
+            "posted_date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "reviewer_stay_date": f"2025-{i % 12 + 1:02d}-01",
+            "num_of_nights": i % 7 + 1,
+            "traveler_type": "Couple",
+            "room_name": "Standard Double Room",
+            "raw_review": f"Guest {i} Standard Double Room {i % 7 + 1} nights Couple",
+            "photo": [{"src": f"https://cf.bstatic.com/xdata/images/{i}.jpg", "alt": ""}] if i % 4 == 0 else [],
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run(records: list[dict], workdir: pathlib.Path) -> dict:
+    json_path = workdir / "reviews.json"
+    arrow_path = workdir / "reviews.arrow"
+
+    json_path.write_text(json.dumps(records, indent=2, ensure_ascii=False), encoding="utf-8")
+    _, write_s = timed(snapshot.write_snapshot, arrow_path, snapshot.RAW_SCHEMA, records)
+
+    def load_json():
+        with open(json_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_json_projection():
+        return [(r["review_id"], r["score"]) for r in load_json()]
+
+    def load_json_filter():
+        return [r for r in load_json() if r["score"] >= 8]
+
+    results = {
+        "rows": len(records),
+        "json_bytes": json_path.stat().st_size,
+        "arrow_bytes": arrow_path.stat().st_size,
+        "arrow_write_s": round(write_s, 4),
+    }
+    cases = {
+        "full_load": (load_json, lambda: snapshot.read_snapshot(arrow_path)),
+        "projection": (load_json_projection,
+                       lambda: snapshot.read_snapshot(arrow_path, columns=["review_id", "score"])),
+        "filter": (load_json_filter,
+                   lambda: snapshot.read_snapshot(arrow_path, filter=pc.field("score") >= 8)),
+    }
+    for name, (json_fn, arrow_fn) in cases.items():
+        _, json_s = timed(json_fn)
+        _, arrow_s = timed(arrow_fn)
+        results[f"{name}_json_s"] = round(json_s, 4)
+        results[f"{name}_arrow_s"] = round(arrow_s, 4)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Arrow snapshots vs JSON.")
+    parser.add_argument("--rows", type=int, default=100000, help="Synthetic raw reviews to generate")
+    parser.add_argument("--json", help="Use an existing raw reviews.json instead of synthetic data")
+    args = parser.parse_args()
+
+    if args.json:
+        records = json.loads(pathlib.Path(args.json).read_text(encoding="utf-8"))
+    else:
+        records = make_raw_reviews(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(json.dumps(run(records, pathlib.Path(tmp)), indent=2))
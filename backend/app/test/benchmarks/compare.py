@@ -0,0 +1,49 @@
+"""
+Diff two run_pipeline result files.
+
+    python -m benchmarks.compare baseline.json results.json
+"""
+import argparse
+import json
+import pathlib
+
+
+def _pct(old, new) -> str:
+    if not old or new is None:
+        return ""
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def _row(label: str, old, new) -> None:
+    old_s = "-" if old is None else str(old)
+    new_s = "-" if new is None else str(new)
+    print(f"  {label:<40} {old_s:>12} {new_s:>12} {_pct(old, new):>9}")
+
+
+def compare(old: dict, new: dict) -> None:
+    print(f"revision {old.get('revision')} -> {new.get('revision')}")
+    for size in sorted(set(old["sizes"]) | set(new["sizes"]), key=int):
+        a = old["sizes"].get(size, {})
+        b = new["sizes"].get(size, {})
+        print(f"\n=== {size} reviews ===")
+        for stage in sorted(set(a.get("stages", {})) | set(b.get("stages", {}))):
+            _row(f"{stage} reviews/sec",
+                 a.get("stages", {}).get(stage, {}).get("reviews_per_sec"),
+                 b.get("stages", {}).get(stage, {}).get("reviews_per_sec"))
+        for path in sorted(set(a.get("api", {})) | set(b.get("api", {}))):
+            for key in ("p50_ms", "p99_ms"):
+                _row(f"GET {path} {key}",
+                     a.get("api", {}).get(path, {}).get(key),
+                     b.get("api", {}).get(path, {}).get(key))
+        _row("peak RSS MB", a.get("peak_rss_mb"), b.get("peak_rss_mb"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two pipeline benchmark results.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+    compare(
+        json.loads(pathlib.Path(args.old).read_text(encoding="utf-8")),
+        json.loads(pathlib.Path(args.new).read_text(encoding="utf-8")),
+    )
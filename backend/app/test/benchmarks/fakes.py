@@ -0,0 +1,399 @@
+"""
+Local stand-ins for the pipeline's live dependencies.
+
+- FakeDatabase: SQLite file database exposing the pyodbc calls the code
+  uses, with the properties / reviews / review_photos / ProcessedReviews /
+  embedding_outbox tables under a "dbo" schema so the production SQL runs
+  unchanged.
+- FakeLLM: deterministic replacement for genai.Client that applies the
+  SYSTEM_PROMPT field mapping rules locally, with configurable latency.
+"""
+import collections
+import datetime
+import json
+import pathlib
+import re
+import sqlite3
+import time
+from types import SimpleNamespace
+
+FAKE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS dbo.properties (
+        hotel_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        booking_url TEXT NOT NULL UNIQUE,
+        name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_scraped_at TIMESTAMP,
+        active_version INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS dbo.dataset_versions (
+        version_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        hotel_id INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        activated_at TIMESTAMP,
+        review_id_scheme TEXT
+    );
+    CREATE TABLE IF NOT EXISTS dbo.reviews (
+        hotel_id INTEGER,
+        version_id INTEGER,
+        review_id INTEGER,
+        title TEXT,
+        score REAL,
+        positive_txt TEXT,
+        negative_txt TEXT,
+        posted_date DATE,
+        reviewer_stay_date DATE,
+        num_of_nights INTEGER,
+        traveler_type TEXT,
+        room_name TEXT,
+        raw_review TEXT
+    );
+    CREATE TABLE IF NOT EXISTS dbo.review_photos (
+        hotel_id INTEGER,
+        version_id INTEGER,
+        review_id INTEGER,
+        src TEXT,
+        alt TEXT,
+        content_hash TEXT
+    );
+    CREATE TABLE IF NOT EXISTS dbo.ProcessedReviews (
+        hotel_id INTEGER,
+        version_id INTEGER,
+        review_id INTEGER,
+        id TEXT,
+        platformReviewId TEXT,
+        source TEXT,
+        rating INTEGER,
+        userName TEXT,
+        reviewerName TEXT,
+        reviewText TEXT,
+        [text] TEXT,
+        summary TEXT,
+        sentiment TEXT,
+        language TEXT,
+        categories TEXT,
+        keyPhrases TEXT,
+        reviewDate DATE,
+        firstSeen TIMESTAMP,
+        lastUpdated TIMESTAMP,
+        scrapedAt TIMESTAMP,
+        [status] TEXT,
+        replyStatus TEXT,
+        hasReply TEXT,
+        PRIMARY KEY (version_id, id)
+    );
+    CREATE TABLE IF NOT EXISTS dbo.embedding_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        hotel_id INTEGER NOT NULL,
+        version_id INTEGER,
+        embedding_id TEXT NOT NULL,
+        [text] TEXT NOT NULL,
+        metadata TEXT,
+        created_ts REAL NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_ts REAL NOT NULL,
+        lease_owner TEXT,
+        lease_until_ts REAL,
+        dispatched_ts REAL,
+        last_error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS dbo.IX_reviews_hotel_posted ON reviews (hotel_id, posted_date);
+    CREATE INDEX IF NOT EXISTS dbo.IX_review_photos_hotel_review ON review_photos (hotel_id, review_id);
+    CREATE INDEX IF NOT EXISTS dbo.IX_ProcessedReviews_hotel_date ON ProcessedReviews (hotel_id, reviewDate);
+    CREATE INDEX IF NOT EXISTS dbo.IX_reviews_version ON reviews (version_id, review_id);
+    CREATE INDEX IF NOT EXISTS dbo.IX_review_photos_version ON review_photos (version_id, review_id);
+    CREATE INDEX IF NOT EXISTS dbo.IX_ProcessedReviews_version_date ON ProcessedReviews (version_id, reviewDate);
+    CREATE INDEX IF NOT EXISTS dbo.IX_ProcessedReviews_version_review ON ProcessedReviews (version_id, review_id);
+"""
+
+
+# ------------------------------------------------------------------
+# Database
+# ------------------------------------------------------------------
+# T-SQL's INSERT ... OUTPUT INSERTED.col VALUES ... is SQLite's INSERT ... VALUES ... RETURNING col
+_OUTPUT_INSERTED = re.compile(r"\s+OUTPUT\s+INSERTED\.(\w+)\s+", re.IGNORECASE)
+
+
+class FakeCursor:
+    """pyodbc-style cursor: positional varargs and attribute-access rows."""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+        self._row_type = None
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def execute(self, sql: str, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+        output = _OUTPUT_INSERTED.search(sql)
+        if output:
+            sql = f"{sql[:output.start()]} {sql[output.end():].rstrip().rstrip(';')} RETURNING {output.group(1)}"
+        self._cursor.execute(sql, params)
+        self._row_type = None
+        if self._cursor.description:
+            names = [d[0] for d in self._cursor.description]
+            self._row_type = collections.namedtuple("Row", names, rename=True)
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        self._cursor.executemany(sql, seq_of_params)
+        return self
+
+    def _wrap(self, row):
+        return self._row_type(*row) if row is not None else None
+
+    def fetchone(self):
+        return self._wrap(self._cursor.fetchone())
+
+    def fetchmany(self, size: int = 1):
+        return [self._wrap(r) for r in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._wrap(r) for r in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._wrap(row)
+
+
+class FakeConnection:
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self._conn.cursor())
+
+    def execute(self, sql: str, *params) -> FakeCursor:
+        return self.cursor().execute(sql, *params)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # pyodbc commits on a clean exit and does not close the connection
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+class FakeDatabase:
+    """SQLite stand-in for SQL Server; pass .connect in place of pyodbc.connect."""
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.main_path = self.directory / "main.db"
+        self.dbo_path = self.directory / "dbo.db"
+        with self.connect() as conn:
+            conn._conn.executescript(FAKE_SCHEMA)
+
+    def connect(self, *args, **kwargs) -> FakeConnection:
+        conn = sqlite3.connect(
+            self.main_path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            timeout=30,
+        )
+        conn.execute("ATTACH DATABASE ? AS dbo", (str(self.dbo_path),))
+        return FakeConnection(conn)
+
+    def count(self, table: str) -> int:
+        conn = self.connect()
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM dbo.{table}").fetchone()[0]
+        finally:
+            conn.close()
+
+
+# ------------------------------------------------------------------
+# LLM
+# ------------------------------------------------------------------
+_INPUT_DATA = re.compile(r"Input Data: (\[.*?\])\n", re.DOTALL)
+_CATEGORIES = {
+    "Cleanliness": ("clean", "dirty"),
+    "Staff": ("staff", "reception"),
+    "Location": ("location", "central"),
+    "Facilities": ("pool", "gym", "parking"),
+    "Comfort": ("bed", "comfortable"),
+    "Value": ("price", "value"),
+    "Noise": ("noise", "noisy", "loud"),
+    "Food": ("breakfast", "food", "restaurant"),
+    "Privacy": ("privacy",),
+    "WiFi": ("wifi", "internet"),
+    "Room Size": ("small", "spacious"),
+}
+
+
+def _stamp(posted_date, at: str):
+    try:
+        day = datetime.date.fromisoformat(posted_date)
+    except (TypeError, ValueError):
+        return None
+    return f"{day.strftime('%B %d, %Y')} at {at}"
+
+
+def fake_process_review(raw: dict) -> dict:
+    """Apply the SYSTEM_PROMPT mapping rules deterministically."""
+    rating = int(round(float(raw.get("score") or 0) / 2))
+    text = ". ".join(p for p in (raw.get("title"), raw.get("positive_txt"), raw.get("negative_txt")) if p)
+    lowered = text.lower()
+    categories = [name for name, words in _CATEGORIES.items() if any(w in lowered for w in words)][:3] or ["Comfort"]
+    sentiment = "Positive" if rating >= 4 else "Neutral" if rating == 3 else "Negative"
+    user_name = (raw.get("raw_review") or "Anonymous").split()[0]
+    stay = raw.get("reviewer_stay_date")
+    try:
+        date = datetime.date.fromisoformat(stay).strftime("%b %d, %Y") if stay else None
+    except ValueError:
+        date = None
+
+    return {
+        "id": f"REV-{raw['review_id']:03d}",
+        "rating": rating,
+        "userName": user_name,
+        "reviewerName": user_name,
+        "text": text,
+        "sentiment": sentiment,
+        "categories": categories,
+        "source": "Booking.com",
+        "date": date,
+        "status": "Pending",
+        "reviewText": text,
+        "keyPhrases": [w for w in lowered.replace(".", "").split() if len(w) > 5][:5],
+        "summary": f"Guest rated the stay {rating}/5 mentioning {', '.join(categories).lower()}.",
+        "platformReviewId": f"BK-{raw['review_id']}",
+        "language": "English",
+        "replyStatus": "Pending",
+        "firstSeen": _stamp(raw.get("posted_date"), "09:00 AM"),
+        "lastUpdated": _stamp(raw.get("posted_date"), "09:00 AM"),
+        "scrapedAt": _stamp(raw.get("posted_date"), "08:00 PM"),
+        "hasReply": "No",
+    }
+
+
+def _tokens(text) -> int:
+    return len(text or "") // 4
+
+
+class _FakeCaches:
+    """Explicit context caches: prompts stored by name, with an expiry."""
+
+    def __init__(self, llm: "FakeLLM"):
+        self._llm = llm
+        self._caches: dict[str, SimpleNamespace] = {}
+
+    def create(self, model: str, config: dict):
+        if _tokens(config.get("system_instruction")) < self._llm.min_cache_tokens:
+            raise ValueError(f"Cached content is too small; min_total_token_count={self._llm.min_cache_tokens}")
+        name = f"cachedContents/fake-{len(self._caches) + 1}"
+        ttl_s = float(str(config.get("ttl", "3600s")).rstrip("s"))
+        self._caches[name] = cache = SimpleNamespace(
+            name=name,
+            model=model,
+            display_name=config.get("display_name"),
+            system_instruction=config.get("system_instruction"),
+            expire_time=time.time() + ttl_s,
+        )
+        self._llm.caches_created += 1
+        return cache
+
+    def list(self):
+        now = time.time()
+        return [c for c in self._caches.values() if c.expire_time > now]
+
+    def get(self, name: str):
+        cache = self._caches.get(name)
+        if cache is None or cache.expire_time <= time.time():
+            raise KeyError(f"CachedContent not found: {name}")
+        return cache
+
+    def delete(self, name: str) -> None:
+        self._caches.pop(name, None)
+
+
+class _FakeModels:
+    def __init__(self, llm: "FakeLLM"):
+        self._llm = llm
+        self._seen_prefixes: set[str] = set()
+
+    def _prefix(self, config) -> tuple[str, bool]:
+        """The system prefix of a call and whether it is served from cache."""
+        config = config or {}
+        if config.get("cached_content"):
+            return self._llm.caches.get(config["cached_content"]).system_instruction, True
+        prefix = config.get("system_instruction") or ""
+        # Implicit caching: a prefix already seen is (eventually) a cache hit
+        hit = self._llm.implicit_cache and prefix in self._seen_prefixes
+        self._seen_prefixes.add(prefix)
+        return prefix, hit
+
+    def _run(self, contents, config):
+        prompt = contents if isinstance(contents, str) else str(contents)
+        prefix, cached = self._prefix(config)
+        match = _INPUT_DATA.search(prompt)
+        raw_reviews = json.loads(match.group(1)) if match else []
+        prompt_tokens = _tokens(prefix) + _tokens(prompt)
+        cached_tokens = _tokens(prefix) if cached else 0
+
+        # Prefill is paid only for tokens not served from the cache
+        time.sleep(self._llm.latency_s + self._llm.prefill_per_ktok_s * (prompt_tokens - cached_tokens) / 1000)
+        self._llm.calls += 1
+
+        rows = [fake_process_review(r) for r in raw_reviews]
+        text = "```json\n" + json.dumps(rows, ensure_ascii=False) + "\n```"
+        usage = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=_tokens(text),
+            cached_content_token_count=cached_tokens,
+        )
+        return text, usage, len(raw_reviews)
+
+    def generate_content(self, model: str, contents, config=None):
+        text, usage, n = self._run(contents, config)
+        time.sleep(self._llm.per_review_s * n)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def generate_content_stream(self, model: str, contents, config=None):
+        text, usage, n = self._run(contents, config)
+        half = len(text) // 2
+        yield SimpleNamespace(text=text[:half], usage_metadata=None)
+        time.sleep(self._llm.per_review_s * n)
+        yield SimpleNamespace(text=text[half:], usage_metadata=usage)
+
+
+class FakeLLM:
+    """
+    Drop-in for genai.Client with deterministic output and fixed latency.
+    Supports explicit context caches (client.caches) and streaming; the
+    prefill_per_ktok_s latency is charged only for uncached prompt tokens,
+    so prefix caching shows up in time to first token.
+    """
+
+    def __init__(self, latency_s: float = 0.0, per_review_s: float = 0.0, prefill_per_ktok_s: float = 0.0,
+                 min_cache_tokens: int = 0, implicit_cache: bool = False):
+        self.latency_s = latency_s
+        self.per_review_s = per_review_s
+        self.prefill_per_ktok_s = prefill_per_ktok_s
+        self.min_cache_tokens = min_cache_tokens
+        self.implicit_cache = implicit_cache
+        self.calls = 0
+        self.caches_created = 0
+        self.models = _FakeModels(self)
+        self.caches = _FakeCaches(self)
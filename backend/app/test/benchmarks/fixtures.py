@@ -0,0 +1,226 @@
+"""
+Synthetic review data and a local Booking.com-like HTML fixture server.
+
+The fixture page reproduces the data-testid markup scrape_booking() relies
+on: the "read all reviews" button, review cards loaded page by page over an
+XHR to /reviewlist, a "Next page" button and the photo gallery overlay.
+"""
+import html
+import json
+import random
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 10
+
+_WORDS = (
+    "clean staff friendly location central breakfast pool parking bed comfortable "
+    "price value noisy loud wifi slow small spacious view quiet shower"
+).split()
+_TRAVELERS = ("Couple", "Solo traveler", "Family", "Group of friends", "Business traveler")
+_ROOMS = ("Standard Double Room", "Deluxe King Room", "Twin Room", "Family Suite")
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December")
+
+
+def make_raw_reviews(n: int, seed: int = 7, photo_every: int = 5) -> list[dict]:
+    """Deterministic raw reviews shaped like booking.Review (as dicts)."""
+    rng = random.Random(seed)
+    reviews = []
+    for i in range(1, n + 1):
+        month = rng.randrange(12)
+        day = rng.randrange(1, 28)
+        reviews.append({
+            "review_id": i,
+            "title": " ".join(rng.choice(_WORDS) for _ in range(3)).capitalize(),
+            "score": float(rng.randint(2, 10)),
+            "positive_txt": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 30))),
+            "negative_txt": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(0, 20))),
+            "posted_date": f"2025-{month + 1:02d}-{day:02d}",
+            "reviewer_stay_date": f"2025-{month + 1:02d}-01",
+            "num_of_nights": rng.randint(1, 10),
+            "traveler_type": rng.choice(_TRAVELERS),
+            "room_name": rng.choice(_ROOMS),
+            "raw_review": f"Guest{i} {rng.choice(_ROOMS)}",
+            "photo": [
+                {"src": f"/photos/{i}-{k}.jpg", "alt": f"Photo {k} by Guest{i}"}
+                for k in range(rng.randint(1, 3))
+            ] if photo_every and i % photo_every == 0 else [],
+        })
+    return reviews
+
+
+# ------------------------------------------------------------------
+# HTML rendering
+# ------------------------------------------------------------------
+_INDEX = """<!doctype html>
+<html><head><title>Fixture Hotel</title></head>
+<body>
+  <div data-testid="poi-block">Nearby places</div>
+  <button data-testid="fr-read-all-reviews" id="read-all">Read all reviews</button>
+  <div id="modal" hidden>
+    <button data-testid="sorters-dropdown-trigger" id="sort">Sort reviews by</button>
+    <div id="sort-menu" hidden><button data-id="NEWEST_FIRST" id="newest">Newest first</button></div>
+    <div id="cards"></div>
+    <button aria-label="Next page" id="next">Next page</button>
+  </div>
+  <div data-testid="GALLERY" id="gallery" hidden>
+    <button data-testid="GALLERY_CLOSE" id="gallery-close">Close</button>
+    <div id="gallery-photos"></div>
+  </div>
+  <script>
+    const PAGES = __PAGES__;
+    let current = 1;
+    let sort = '';
+    async function load(p) {
+      const res = await fetch('/reviewlist?page=' + p + '&sort=' + sort);
+      document.getElementById('cards').innerHTML = await res.text();
+      current = p;
+      document.getElementById('next').disabled = p >= PAGES;
+    }
+    document.getElementById('read-all').onclick = () => {
+      document.getElementById('modal').hidden = false;
+      load(1);
+    };
+    document.getElementById('next').onclick = () => load(current + 1);
+    document.getElementById('sort').onclick = () => {
+      document.getElementById('sort-menu').hidden = false;
+    };
+    document.getElementById('newest').onclick = () => {
+      document.getElementById('sort-menu').hidden = true;
+      sort = 'newest';
+      load(1);
+    };
+    document.addEventListener('click', (e) => {
+      const thumb = e.target.closest('[data-testid="REVIEW_THUMBNAIL_PROPERTY"]');
+      if (!thumb) return;
+      const photos = JSON.parse(thumb.closest('[data-testid="review-photos"]').dataset.photos);
+      document.getElementById('gallery-photos').innerHTML = photos.map(p =>
+        `<div data-testid="REVIEW_PHOTO_PROPERTY"><img src="${p.src}" alt="${p.alt}"></div>`).join('');
+      document.getElementById('gallery').hidden = false;
+    });
+    document.getElementById('gallery-close').onclick = () => {
+      document.getElementById('gallery').hidden = true;
+    };
+  </script>
+</body></html>
+"""
+
+
+def _long_date(iso: str, with_day: bool = True) -> str:
+    year, month, day = iso.split("-")
+    name = _MONTHS[int(month) - 1]
+    return f"{name} {int(day)}, {year}" if with_day else f"{name} {year}"
+
+
+def render_card(review: dict, gallery_only_photos: bool = False) -> str:
+    """
+    Render one review card. With gallery_only_photos the thumbnails carry no
+    <img>, so photo URLs can only be read from the gallery overlay.
+    """
+    e = html.escape
+    photos = ""
+    if review["photo"]:
+        thumbs = "".join(
+            '<button data-testid="REVIEW_THUMBNAIL_PROPERTY"></button>' if gallery_only_photos else
+            f'<button data-testid="REVIEW_THUMBNAIL_PROPERTY"><img src="{e(p["src"])}" alt="{e(p["alt"])}"></button>'
+            for p in review["photo"]
+        )
+        photos = (
+            f'<div data-testid="review-photos" data-photos="{e(json.dumps(review["photo"]))}">{thumbs}</div>'
+        )
+    return f"""
+    <div data-testid="review-card" data-review-id="{review['review_id']}">
+      <span>{e(review['raw_review'])}</span>
+      <span data-testid="review-room-name">{e(review['room_name'])}</span>
+      <span data-testid="review-num-nights">{review['num_of_nights']} nights</span>
+      <span data-testid="review-stay-date">{_long_date(review['reviewer_stay_date'], with_day=False)}</span>
+      <span data-testid="review-traveler-type">{e(review['traveler_type'])}</span>
+      <span data-testid="review-date">Reviewed: {_long_date(review['posted_date'])}</span>
+      <h3 data-testid="review-title">{e(review['title'])}</h3>
+      <div data-testid="review-score">Scored {review['score']:.1f}</div>
+      <div data-testid="review-positive-text">{e(review['positive_txt'])}</div>
+      {f'<div data-testid="review-negative-text">{e(review["negative_txt"])}</div>' if review['negative_txt'] else ''}
+      {photos}
+    </div>"""
+
+
+# A 1x1 white JPEG, served for every fixture photo URL
+_PIXEL_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c"
+    "140d0c0b0b0c1912130f141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27"
+    "393d38323c2e333432ffc0000b080001000101011100ffc4001f0000010501010101010100000000"
+    "000000000102030405060708090a0bffc400b5100002010303020403050504040000017d01020300"
+    "041105122131410613516107227114328191a1082342b1c11552d1f02433627282090a161718191a"
+    "25262728292a3435363738393a434445464748494a535455565758595a636465666768696a737475"
+    "767778797a838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9ba"
+    "c2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9faffda"
+    "0008010100003f00fbfcffd9"
+)
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    def __init__(self, *args, reviews: list[dict], gallery_only_photos: bool = False, **kwargs):
+        self.reviews = reviews
+        self.gallery_only_photos = gallery_only_photos
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):  # keep benchmark output clean
+        pass
+
+    def _send(self, body: bytes, content_type: str, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        pages = max(1, -(-len(self.reviews) // PAGE_SIZE))
+
+        if url.path in ("/", "/hotel.html"):
+            self._send(_INDEX.replace("__PAGES__", str(pages)).encode("utf-8"), "text/html; charset=utf-8")
+        elif url.path == "/reviewlist":
+            query = parse_qs(url.query)
+            page = int(query.get("page", ["1"])[0])
+            reviews = self.reviews
+            if query.get("sort") == ["newest"]:
+                reviews = sorted(reviews, key=lambda r: (r["posted_date"], r["review_id"]), reverse=True)
+            chunk = reviews[(page - 1) * PAGE_SIZE: page * PAGE_SIZE]
+            body = "".join(render_card(r, self.gallery_only_photos) for r in chunk)
+            self._send(body.encode("utf-8"), "text/html; charset=utf-8")
+        elif url.path.startswith("/photos/"):
+            self._send(_PIXEL_JPEG, "image/jpeg")
+        else:
+            self._send(b"not found", "text/plain", status=404)
+
+
+class FixtureServer:
+    """Serve the fixture hotel on a background thread (use as a context manager)."""
+
+    def __init__(self, reviews: list[dict], host: str = "127.0.0.1", port: int = 0,
+                 gallery_only_photos: bool = False):
+        handler = partial(_FixtureHandler, reviews=reviews, gallery_only_photos=gallery_only_photos)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/hotel.html"
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FixtureServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,21 @@
+"""
+gunicorn entry point for benchmarks.load_test: the review API backed by
+the SQLite FakeDatabase in LOAD_TEST_DB instead of SQL Server.
+
+    LOAD_TEST_DB=/tmp/db gunicorn -c gunicorn.conf.py benchmarks.load_app:app
+"""
+import os
+import pathlib
+import sys
+
+import pyodbc
+
+TEST_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(TEST_DIR), str(TEST_DIR.parents[1])]
+
+from benchmarks.fakes import FakeDatabase  # noqa: E402
+
+# Patched before the app is imported (and, with preload_app, before the fork)
+pyodbc.connect = FakeDatabase(os.environ["LOAD_TEST_DB"]).connect
+
+from app.test.main import app  # noqa: E402,F401
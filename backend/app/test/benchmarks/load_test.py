@@ -0,0 +1,213 @@
+"""
+Local load test for the multi-worker run mode (gunicorn.conf.py).
+
+Seeds a SQLite FakeDatabase with processed reviews, then for each worker
+count starts gunicorn on benchmarks.load_app and hammers GET /reviews from
+client processes over keep-alive connections, with the shared read cache
+off and on. Reports requests/s, latency percentiles and the speedup over
+one worker. Clients share the machine with the workers, so scaling flattens
+before the core count; run with --clients at least 2x the largest worker
+count.
+
+Run from backend/app/test:
+    python -m benchmarks.load_test --workers 1 2 4 --size 2000 --out load.json
+"""
+import argparse
+import datetime
+import http.client
+import json
+import multiprocessing
+import os
+import pathlib
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+TEST_DIR = pathlib.Path(__file__).resolve().parents[1]
+BACKEND_DIR = TEST_DIR.parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed(workdir: pathlib.Path, size: int) -> pathlib.Path:
+    """Load `size` raw and processed reviews (and their photos) into a FakeDatabase."""
+    os.environ["SEARCH_INDEX_PATH"] = str(workdir / "search_index.db")
+    os.environ["LIVE_EVENTS_PATH"] = str(workdir / "live_events.db")
+    sys.path[:0] = [str(TEST_DIR), str(BACKEND_DIR)]
+
+    from benchmarks.fakes import FakeDatabase, fake_process_review
+    from benchmarks.fixtures import make_raw_reviews
+    from app.test.services import datasets, properties, review_processor
+
+    db_dir = workdir / "db"
+    db = FakeDatabase(db_dir)
+    raw = make_raw_reviews(size)
+    with db.connect() as conn:
+        cursor = conn.cursor()
+        hotel_id = properties.get_or_create_property(cursor, "https://fixture.invalid/load-test.html")
+        version_id = datasets.begin_version(cursor, hotel_id)
+        cursor.executemany(
+            "INSERT INTO dbo.reviews (hotel_id, version_id, review_id, title, score, positive_txt, "
+            "negative_txt, posted_date, reviewer_stay_date, num_of_nights, traveler_type, room_name, "
+            "raw_review) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(hotel_id, version_id, r["review_id"], r["title"], r["score"], r["positive_txt"],
+              r["negative_txt"], r["posted_date"], r["reviewer_stay_date"], r["num_of_nights"],
+              r["traveler_type"], r["room_name"], r["raw_review"]) for r in raw],
+        )
+        cursor.executemany(
+            "INSERT INTO dbo.review_photos (hotel_id, version_id, review_id, src, alt) VALUES (?, ?, ?, ?, ?)",
+            [(hotel_id, version_id, r["review_id"], p["src"], p["alt"]) for r in raw for p in r["photo"]],
+        )
+    conn = db.connect()
+    try:
+        review_processor.insert_processed_reviews(
+            conn, [fake_process_review(r) for r in raw], hotel_id, version_id
+        )
+    finally:
+        conn.close()
+    return db_dir
+
+
+# ------------------------------------------------------------------
+# Load generation
+# ------------------------------------------------------------------
+def _client(args) -> tuple[int, int, list[float]]:
+    """One client process: GET path in a loop over a keep-alive connection."""
+    port, path, duration_s = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    ok, errors, timings = 0, 0, []
+    deadline = time.perf_counter() + duration_s
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            continue
+        if response.status == 200:
+            ok += 1
+            timings.append((time.perf_counter() - start) * 1000)
+        else:
+            errors += 1
+    conn.close()
+    return ok, errors, timings
+
+
+def run_load(port: int, path: str, clients: int, duration_s: float) -> dict:
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(_client, [(port, path, duration_s)] * clients)
+    ok = sum(r[0] for r in results)
+    timings = sorted(t for r in results for t in r[2])
+    return {
+        "requests": ok,
+        "errors": sum(r[1] for r in results),
+        "req_per_s": round(ok / duration_s, 1),
+        "p50_ms": round(statistics.median(timings), 2) if timings else None,
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 2) if timings else None,
+    }
+
+
+def start_server(workers: int, db_dir: pathlib.Path, cache_path: pathlib.Path, cache_ttl_s: float,
+                 timeout_s: float = 60) -> tuple[subprocess.Popen, int]:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "BIND": f"127.0.0.1:{port}",
+        "LOAD_TEST_DB": str(db_dir),
+        "READ_CACHE_PATH": str(cache_path),
+        "READ_CACHE_TTL_S": str(cache_ttl_s),
+        "SEARCH_INDEX_PATH": str(db_dir / "search_index.db"),
+        "METRICS_ENABLED": "0",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning",
+         "benchmarks.load_app:app"],
+        cwd=TEST_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"gunicorn exited:\n{proc.stderr.read()[-1000:]}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2):
+                return proc, port
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit(f"gunicorn did not answer within {timeout_s}s")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.terminate()  # SIGTERM: graceful shutdown
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    parser = argparse.ArgumentParser(description="Multi-worker throughput test for GET /reviews.")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--size", type=int, default=1000, help="Processed reviews in the dataset")
+    parser.add_argument("--clients", type=int, help="Client processes (default: 2x max workers)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per run")
+    parser.add_argument("--path", default="/reviews", help="Endpoint to load")
+    parser.add_argument("--cache", choices=["off", "on", "both"], default="both",
+                        help="Shared read cache setting(s) to test")
+    parser.add_argument("--out", type=pathlib.Path, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    clients = args.clients or 2 * max(args.workers)
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix="load-test-"))
+    print(f"Seeding {args.size} reviews in {workdir} ...")
+    db_dir = seed(workdir, args.size)
+
+    cache_modes = ["off", "on"] if args.cache == "both" else [args.cache]
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": cpus,
+        "options": {"size": args.size, "clients": clients, "duration_s": args.duration, "path": args.path},
+        "runs": [],
+    }
+    print(f"{'cache':<6} {'workers':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'speedup':>8}")
+    for cache in cache_modes:
+        baseline = None
+        for workers in args.workers:
+            cache_path = workdir / f"read_cache-{cache}-{workers}.db"
+            proc, port = start_server(workers, db_dir, cache_path, 30 if cache == "on" else 0)
+            try:
+                run_load(port, args.path, clients, min(2.0, args.duration))  # warm-up
+                result = run_load(port, args.path, clients, args.duration)
+            finally:
+                stop_server(proc)
+            baseline = baseline or result["req_per_s"] or None
+            result.update({"cache": cache, "workers": workers})
+            result["speedup"] = round(result["req_per_s"] / baseline, 2) if baseline else None
+            report["runs"].append(result)
+            print(f"{cache:<6} {workers:>7} {result['req_per_s']:>9} {result['p50_ms'] or '-':>9} "
+                  f"{result['p99_ms'] or '-':>9} {result['errors']:>7} {result['speedup'] or '-':>8}")
+
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"✓ Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Cold-start profile for the API and the embedding service.
+
+Two measurements, each in a fresh interpreter:
+- import: `python -X importtime -c "import <module>"`, aggregated by
+  top-level package (self time) plus the slowest individual imports.
+- first request: start uvicorn and poll until the first 200 response,
+  i.e. what a new worker or container costs before it can serve traffic.
+
+Run from backend/app/test:
+    python -m benchmarks.profile_startup
+    python -m benchmarks.profile_startup --target embedding --out startup.json
+"""
+import argparse
+import collections
+import json
+import pathlib
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+TEST_DIR = pathlib.Path(__file__).resolve().parents[1]
+BACKEND_DIR = TEST_DIR.parents[1]
+
+# target -> (working directory, module to import, uvicorn app, health path)
+TARGETS = {
+    "api": (TEST_DIR, "main", "main:app", "/"),
+    "embedding": (BACKEND_DIR / "embedding-service", "app.main", "app.main:app", "/metrics"),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def profile_imports(cwd: pathlib.Path, module: str, top: int) -> dict:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        tail = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        return {"error": "\n".join(tail[-5:])}
+
+    by_package: dict[str, int] = collections.defaultdict(int)
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        by_package[name.split(".")[0]] += int(self_us)
+        imports.append((int(cumulative_us), depth, name))
+
+    imports.sort(reverse=True)
+    return {
+        "wall_s": round(wall, 3),
+        "modules": len(imports),
+        "packages_ms": {
+            pkg: round(us / 1000, 1)
+            for pkg, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]
+        },
+        "slowest_ms": [
+            {"module": name, "depth": depth, "cumulative_ms": round(us / 1000, 1)}
+            for us, depth, name in imports[:top]
+        ],
+    }
+
+
+def time_to_first_request(cwd: pathlib.Path, app: str, path: str, timeout_s: float = 120) -> dict:
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        while time.perf_counter() - start < timeout_s:
+            if proc.poll() is not None:
+                return {"error": proc.stderr.read()[-500:]}
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as resp:
+                    resp.read()
+                return {"seconds": round(time.perf_counter() - start, 3), "status": resp.status}
+            except OSError:
+                time.sleep(0.02)
+        return {"error": f"no response within {timeout_s}s"}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import-time and time-to-first-request profile.")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="api")
+    parser.add_argument("--top", type=int, default=15, help="Packages / imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts to time (best is reported)")
+    parser.add_argument("--out", type=pathlib.Path, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    cwd, module, app, path = TARGETS[args.target]
+    report = {"target": args.target, "python": sys.version.split()[0]}
+    report["imports"] = profile_imports(cwd, module, args.top)
+    runs = [time_to_first_request(cwd, app, path) for _ in range(args.runs)]
+    ok = [r["seconds"] for r in runs if "seconds" in r]
+    report["first_request"] = {"best_s": min(ok), "runs_s": ok} if ok else runs[0]
+
+    imports = report["imports"]
+    if "error" in imports:
+        print(f"import {module} FAILED:\n{imports['error']}")
+    else:
+        print(f"import {module}: {imports['wall_s']}s wall, {imports['modules']} modules")
+        print("  self time by package:")
+        for pkg, ms in imports["packages_ms"].items():
+            print(f"    {pkg:<28} {ms:>8.1f} ms")
+        print("  slowest imports (cumulative):")
+        for entry in imports["slowest_ms"]:
+            print(f"    {'  ' * entry['depth']}{entry['module']:<40} {entry['cumulative_ms']:>8.1f} ms")
+    first = report["first_request"]
+    if "best_s" in first:
+        print(f"time to first request: best {first['best_s']}s of {first['runs_s']}")
+    else:
+        print(f"time to first request FAILED: {first['error'][-200:]}")
+
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"✓ Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
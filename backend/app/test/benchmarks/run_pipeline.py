@@ -0,0 +1,286 @@
+"""
+Offline replay harness and benchmark suite for the ingestion pipeline.
+
+Every live dependency is replaced by a local stand-in: Booking.com by the
+HTML fixture server, SQL Server by a SQLite FakeDatabase, Gemini by a
+deterministic FakeLLM. Each dataset size runs in its own process so peak
+RSS is measured per size.
+
+Run from backend/app/test:
+    python -m benchmarks.run_pipeline --sizes 1000 10000 100000 --out results.json
+    python -m benchmarks.compare old.json results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+TEST_DIR = pathlib.Path(__file__).resolve().parents[1]
+BACKEND_DIR = TEST_DIR.parents[1]
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+
+def _stage(results: dict, name: str, reviews: int, fn):
+    start = time.perf_counter()
+    try:
+        value = fn()
+    except Exception as e:
+        results[name] = {"reviews": reviews, "error": str(e)[:200]}
+        print(f"  {name:<14} FAILED: {str(e)[:80]}")
+        return None
+    elapsed = time.perf_counter() - start
+    results[name] = {
+        "reviews": reviews,
+        "seconds": round(elapsed, 4),
+        "reviews_per_sec": round(reviews / elapsed, 1) if elapsed else None,
+    }
+    print(f"  {name:<14} {reviews:>7} reviews in {elapsed:8.3f}s")
+    return value
+
+
+def _latency(url: str, requests: int) -> dict:
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=600) as resp:
+                resp.read()
+        except Exception as e:
+            return {"requests": requests, "error": str(e)[:200]}
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "requests": requests,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 2),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ------------------------------------------------------------------
+# One dataset size (runs inside a worker process)
+# ------------------------------------------------------------------
+def run_size(size: int, args) -> dict:
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix=f"pipeline-{size}-"))
+    os.environ["SEARCH_INDEX_PATH"] = str(workdir / "search_index.db")
+    os.environ["PHOTO_STORE_DIR"] = str(workdir / "photo_store")
+    os.chdir(workdir)
+    sys.path[:0] = [str(TEST_DIR), str(BACKEND_DIR)]
+
+    import pyodbc
+    import uvicorn
+
+    from benchmarks.fakes import FakeDatabase, FakeLLM
+    from benchmarks.fixtures import PAGE_SIZE, FixtureServer, make_raw_reviews
+
+    import scraping.booking as booking
+    from app.test import main as api
+    from app.test.services import datasets, metrics, photo_mirror, properties, review_processor
+
+    db = FakeDatabase(workdir / "db")
+    llm = FakeLLM(latency_s=args.llm_latency, per_review_s=args.llm_per_review, prefill_per_ktok_s=args.llm_prefill)
+    pyodbc.connect = db.connect
+    review_processor.client = llm
+
+    stages: dict = {}
+    raw = make_raw_reviews(size)
+    print(f"\n=== {size} reviews ===")
+
+    # 1. Scrape: fixture HTML -> raw tables (no LLM step), once per wait mode
+    if args.scrape_reviews:
+        scrape_set = raw[:args.scrape_reviews]
+        original_processor = booking.run_review_processor
+        booking.run_review_processor = lambda *args: 0
+        try:
+            for mode in args.wait_modes:
+                name = f"scrape_{mode}"
+                with FixtureServer(scrape_set, gallery_only_photos=args.gallery_only_photos) as server:
+                    summary = _stage(stages, name, len(scrape_set),
+                                     lambda: booking.scrape_booking(server.url, wait_mode=mode))
+                if summary:
+                    pages = summary.get("pages") or -(-len(scrape_set) // PAGE_SIZE)
+                    stages[name].update({
+                        "scraped": summary["review_count"],
+                        "pages": pages,
+                        "pages_per_min": round(pages / stages[name]["seconds"] * 60, 1),
+                        "idle_s": summary.get("idle_s"),
+                        "requests_blocked": summary.get("traffic", {}).get("requests_blocked"),
+                        "deferred_photo_reviews": summary.get("deferred_photo_reviews", 0),
+                    })
+                api.remove_all_reviews_from_db()
+        finally:
+            booking.run_review_processor = original_processor
+
+    # 2. Raw insert
+    with db.connect() as conn:
+        hotel_id = properties.get_or_create_property(conn.cursor(), f"https://fixture.invalid/hotel-{size}.html")
+        version_id = datasets.begin_version(conn.cursor(), hotel_id)
+
+    def insert_raw():
+        with db.connect() as conn:
+            cursor = conn.cursor()
+            for r in raw:
+                booking.insert_review(cursor, booking.Review(
+                    **{**r, "photo": [booking.Picture(**p) for p in r["photo"]]}
+                ), hotel_id, version_id)
+    _stage(stages, "raw_insert", size, insert_raw)
+
+    # 2b. Photo mirror: download the fixture photos (all identical bytes, so one file)
+    with FixtureServer(raw) as server:
+        mirrored = _stage(stages, "photo_mirror", size,
+                          lambda: photo_mirror.mirror_photos(db.connect, version_id, base_url=server.base_url))
+    if mirrored:
+        stages["photo_mirror"].update(mirrored)
+
+    # 3. Fetch raw reviews back
+    _stage(stages, "fetch_raw", size, lambda: sum(1 for _ in review_processor.iter_reviews(hotel_id, version_id)))
+
+    # 4. LLM processing + processed insert + search index + snapshot
+    _stage(stages, "process", size, lambda: review_processor.main(hotel_id, version_id))
+    stages["process"]["llm_calls"] = llm.calls
+    counters = metrics.snapshot()["counters"]
+    first_token = metrics.snapshot()["timers"].get("llm_first_token", (0, 0))
+    stages["process"].update({
+        "prompt_tokens": counters.get("llm_prompt_tokens_total", 0),
+        "cached_prompt_tokens": counters.get("llm_cached_prompt_tokens_total", 0),
+        "first_token_s": round(first_token[1] / first_token[0], 3) if first_token[0] else None,
+    })
+
+    # 5. Read path
+    _stage(stages, "read_reviews", size, lambda: api.get_all_reviews_from_db(hotel_id))
+
+    # 6. API latency
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        requests = max(5, args.api_requests * 1000 // max(size, 1000))
+        api_results = {
+            "/reviews": _latency(f"{base}/reviews", requests),
+            "/reviews?stream=json": _latency(f"{base}/reviews?stream=json", requests),
+            "/reviews/search?q=wifi slow": _latency(f"{base}/reviews/search?q=wifi%20slow", args.api_requests),
+        }
+        photo = next((p for r in api.get_all_reviews_from_db(hotel_id) for p in r["photos"] if p["thumbSrc"]), None)
+        if photo:
+            api_results["/photos/{hash}?size=thumb"] = _latency(f"{base}{photo['thumbSrc']}", args.api_requests)
+    finally:
+        server.should_exit = True
+        thread.join()
+    for path, result in api_results.items():
+        if "error" in result:
+            print(f"  GET {path:<28} FAILED: {result['error'][:60]}")
+        else:
+            print(f"  GET {path:<28} p50={result['p50_ms']}ms p99={result['p99_ms']}ms")
+
+    return {
+        "size": size,
+        "stages": stages,
+        "api": api_results,
+        "peak_rss_mb": _peak_rss_mb(),
+        "timers": {
+            name: {"count": count, "total_s": round(total, 4)}
+            for name, (count, total) in metrics.snapshot()["timers"].items()
+        },
+        "row_counts": {t: db.count(t) for t in ("properties", "dataset_versions", "reviews", "review_photos", "ProcessedReviews")},
+    }
+
+
+# ------------------------------------------------------------------
+# Suite driver
+# ------------------------------------------------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--out", help="Write JSON results to this file")
+    parser.add_argument("--scrape-reviews", type=int, default=100,
+                        help="Reviews served by the HTML fixture for the scrape stage (0 to skip)")
+    parser.add_argument("--gallery-only-photos", action="store_true",
+                        help="Serve thumbnails without <img> so photos need the gallery")
+    parser.add_argument("--wait-modes", nargs="+", choices=["fast", "polite"], default=["fast", "polite"],
+                        help="Scraper wait modes to benchmark (one scrape stage per mode)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Fake LLM latency per call (s)")
+    parser.add_argument("--llm-per-review", type=float, default=0.0, help="Fake LLM latency per review (s)")
+    parser.add_argument("--llm-prefill", type=float, default=0.0,
+                        help="Fake LLM prefill latency per 1k uncached prompt tokens (s)")
+    parser.add_argument("--api-requests", type=int, default=50, help="Requests per endpoint at 1k reviews")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print("RESULT " + json.dumps(run_size(args.worker, args)))
+        return
+
+    report = {
+        "revision": _git_revision(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "options": {k: v for k, v in vars(args).items() if k not in ("out", "worker", "sizes")},
+        "sizes": {},
+    }
+    passthrough = [
+        "--scrape-reviews", str(args.scrape_reviews),
+        "--llm-latency", str(args.llm_latency),
+        "--llm-per-review", str(args.llm_per_review),
+        "--llm-prefill", str(args.llm_prefill),
+        "--api-requests", str(args.api_requests),
+        "--wait-modes", *args.wait_modes,
+    ]
+    if args.gallery_only_photos:
+        passthrough.append("--gallery-only-photos")
+    for size in args.sizes:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run_pipeline", "--worker", str(size), *passthrough],
+            cwd=TEST_DIR, capture_output=True, text=True,
+        )
+        sys.stdout.write(proc.stdout.split("RESULT ")[0])
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            raise SystemExit(f"Benchmark for {size} reviews failed")
+        report["sizes"][str(size)] = json.loads(proc.stdout.split("RESULT ", 1)[1])
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        pathlib.Path(args.out).write_text(output, encoding="utf-8")
+        print(f"\n✓ Results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+-- Versioned datasets: each scrape loads into a new dataset version and
+-- readers follow dbo.properties.active_version, which is switched in the
+-- same transaction that commits the processed rows.
+-- Run after add_property_partitioning.sql. Safe to run more than once.
+
+IF OBJECT_ID('dbo.dataset_versions', 'U') IS NULL
+    CREATE TABLE dbo.dataset_versions (
+        version_id   INT IDENTITY(1, 1) NOT NULL CONSTRAINT PK_dataset_versions PRIMARY KEY,
+        hotel_id     INT                NOT NULL,
+        status       VARCHAR(16)        NOT NULL,  -- loading | active | retired | failed
+        created_at   DATETIME2          NOT NULL CONSTRAINT DF_dataset_versions_created_at DEFAULT SYSUTCDATETIME(),
+        activated_at DATETIME2          NULL
+    )
+GO
+
+IF COL_LENGTH('dbo.properties', 'active_version') IS NULL
+    ALTER TABLE dbo.properties ADD active_version INT NULL
+GO
+
+IF COL_LENGTH('dbo.reviews', 'version_id') IS NULL
+    ALTER TABLE dbo.reviews ADD version_id INT NULL
+GO
+
+IF COL_LENGTH('dbo.review_photos', 'version_id') IS NULL
+    ALTER TABLE dbo.review_photos ADD version_id INT NULL
+GO
+
+IF COL_LENGTH('dbo.ProcessedReviews', 'version_id') IS NULL
+    ALTER TABLE dbo.ProcessedReviews ADD version_id INT NULL
+GO
+
+-- Existing rows become the first active version of their hotel
+INSERT INTO dbo.dataset_versions (hotel_id, status, activated_at)
+SELECT p.hotel_id, 'active', SYSUTCDATETIME()
+FROM dbo.properties p
+WHERE p.active_version IS NULL
+  AND EXISTS (SELECT 1 FROM dbo.reviews r WHERE r.hotel_id = p.hotel_id AND r.version_id IS NULL)
+GO
+
+UPDATE p SET active_version = v.version_id
+FROM dbo.properties p
+JOIN dbo.dataset_versions v ON v.hotel_id = p.hotel_id AND v.status = 'active'
+WHERE p.active_version IS NULL
+GO
+
+UPDATE r SET version_id = p.active_version
+FROM dbo.reviews r JOIN dbo.properties p ON p.hotel_id = r.hotel_id
+WHERE r.version_id IS NULL
+GO
+
+UPDATE r SET version_id = p.active_version
+FROM dbo.review_photos r JOIN dbo.properties p ON p.hotel_id = r.hotel_id
+WHERE r.version_id IS NULL
+GO
+
+UPDATE r SET version_id = p.active_version
+FROM dbo.ProcessedReviews r JOIN dbo.properties p ON p.hotel_id = r.hotel_id
+WHERE r.version_id IS NULL
+GO
+
+-- Two versions of one hotel coexist while a re-scrape loads
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_ProcessedReviews_hotel_id' AND object_id = OBJECT_ID('dbo.ProcessedReviews'))
+    DROP INDEX UX_ProcessedReviews_hotel_id ON dbo.ProcessedReviews
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_ProcessedReviews_version_id' AND object_id = OBJECT_ID('dbo.ProcessedReviews'))
+    CREATE UNIQUE INDEX UX_ProcessedReviews_version_id ON dbo.ProcessedReviews (version_id, id)
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_reviews_version' AND object_id = OBJECT_ID('dbo.reviews'))
+    CREATE INDEX IX_reviews_version ON dbo.reviews (version_id, review_id)
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_review_photos_version' AND object_id = OBJECT_ID('dbo.review_photos'))
+    CREATE INDEX IX_review_photos_version ON dbo.review_photos (version_id, review_id)
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ProcessedReviews_version_date' AND object_id = OBJECT_ID('dbo.ProcessedReviews'))
+    CREATE INDEX IX_ProcessedReviews_version_date ON dbo.ProcessedReviews (version_id, reviewDate)
+GO
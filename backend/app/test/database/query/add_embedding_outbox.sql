@@ -0,0 +1,35 @@
+-- Transactional outbox feeding processed reviews to the embedding service.
+-- insert_processed_reviews() writes one row per review in the same commit as
+-- the review; services/embedding_outbox.py leases rows in batches, POSTs them
+-- to /embed/batch and marks them dispatched (or schedules a retry).
+-- Times are epoch seconds. Safe to run more than once.
+
+IF OBJECT_ID('dbo.embedding_outbox', 'U') IS NULL
+    CREATE TABLE dbo.embedding_outbox (
+        id BIGINT IDENTITY(1,1) PRIMARY KEY,
+        hotel_id INT NOT NULL,
+        version_id INT NULL,
+        embedding_id NVARCHAR(100) NOT NULL,
+        [text] NVARCHAR(MAX) NOT NULL,
+        metadata NVARCHAR(MAX) NULL,
+        created_ts FLOAT NOT NULL,
+        attempts INT NOT NULL DEFAULT 0,
+        next_attempt_ts FLOAT NOT NULL,
+        lease_owner VARCHAR(32) NULL,
+        lease_until_ts FLOAT NULL,
+        dispatched_ts FLOAT NULL,
+        last_error NVARCHAR(500) NULL
+    )
+GO
+
+-- The dispatcher scans undelivered rows oldest first
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_embedding_outbox_pending' AND object_id = OBJECT_ID('dbo.embedding_outbox'))
+    CREATE INDEX IX_embedding_outbox_pending ON dbo.embedding_outbox (id)
+        INCLUDE (attempts, next_attempt_ts, lease_until_ts)
+        WHERE dispatched_ts IS NULL
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_embedding_outbox_dispatched' AND object_id = OBJECT_ID('dbo.embedding_outbox'))
+    CREATE INDEX IX_embedding_outbox_dispatched ON dbo.embedding_outbox (dispatched_ts)
+        WHERE dispatched_ts IS NOT NULL
+GO
@@ -0,0 +1,13 @@
+-- Local photo mirror: review_photos.content_hash is the sha256 of the
+-- downloaded image, served by GET /photos/{hash}. NULL until mirrored.
+-- Safe to run more than once.
+
+IF COL_LENGTH('dbo.review_photos', 'content_hash') IS NULL
+    ALTER TABLE dbo.review_photos ADD content_hash CHAR(64) NULL
+GO
+
+-- The mirror worker reads the src of not-yet-mirrored photos
+-- (src may be NVARCHAR(MAX), so it is an included column, not a key)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_review_photos_pending' AND object_id = OBJECT_ID('dbo.review_photos'))
+    CREATE INDEX IX_review_photos_pending ON dbo.review_photos (version_id) INCLUDE (src) WHERE content_hash IS NULL
+GO
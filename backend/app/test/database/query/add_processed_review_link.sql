@@ -0,0 +1,40 @@
+-- Processed reviews reference their raw review: (version_id, review_id) on
+-- dbo.ProcessedReviews and dbo.review_photos point at dbo.reviews, so
+-- GET /reviews reads reviews and photos in one joined query instead of
+-- parsing platformReviewId ("BK-101") into an IN list.
+-- Safe to run more than once.
+
+IF COL_LENGTH('dbo.ProcessedReviews', 'review_id') IS NULL
+    ALTER TABLE dbo.ProcessedReviews ADD review_id INT NULL
+GO
+
+-- Rows written before the column existed: recover the id from platformReviewId
+UPDATE p
+SET review_id = r.review_id
+FROM dbo.ProcessedReviews p
+JOIN dbo.reviews r
+    ON r.version_id = p.version_id
+    AND r.review_id = TRY_CAST(SUBSTRING(p.platformReviewId, CHARINDEX('-', p.platformReviewId) + 1, 20) AS INT)
+WHERE p.review_id IS NULL
+GO
+
+-- Review ids are stable and unique within a dataset version
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_reviews_version_review' AND object_id = OBJECT_ID('dbo.reviews'))
+    CREATE UNIQUE INDEX UX_reviews_version_review ON dbo.reviews (version_id, review_id)
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.foreign_keys WHERE name = 'FK_ProcessedReviews_reviews')
+    ALTER TABLE dbo.ProcessedReviews WITH CHECK ADD CONSTRAINT FK_ProcessedReviews_reviews
+        FOREIGN KEY (version_id, review_id) REFERENCES dbo.reviews (version_id, review_id)
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.foreign_keys WHERE name = 'FK_review_photos_reviews')
+    ALTER TABLE dbo.review_photos WITH CHECK ADD CONSTRAINT FK_review_photos_reviews
+        FOREIGN KEY (version_id, review_id) REFERENCES dbo.reviews (version_id, review_id)
+GO
+
+-- The read path walks ProcessedReviews in (version_id, id) order and seeks
+-- photos on (version_id, review_id) through IX_review_photos_version
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ProcessedReviews_version_review' AND object_id = OBJECT_ID('dbo.ProcessedReviews'))
+    CREATE INDEX IX_ProcessedReviews_version_review ON dbo.ProcessedReviews (version_id, review_id)
+GO
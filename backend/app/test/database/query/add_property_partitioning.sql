@@ -0,0 +1,71 @@
+-- Property dimension: one dbo.properties row per Booking.com URL, and a
+-- hotel_id on every review table so scrapes, deletes and reprocessing are
+-- scoped to a single hotel. Safe to run more than once.
+
+IF OBJECT_ID('dbo.properties', 'U') IS NULL
+    CREATE TABLE dbo.properties (
+        hotel_id        INT IDENTITY(1, 1) NOT NULL CONSTRAINT PK_properties PRIMARY KEY,
+        booking_url     NVARCHAR(450)      NOT NULL CONSTRAINT UQ_properties_booking_url UNIQUE,
+        name            NVARCHAR(255)      NULL,
+        created_at      DATETIME2          NOT NULL CONSTRAINT DF_properties_created_at DEFAULT SYSUTCDATETIME(),
+        last_scraped_at DATETIME2          NULL
+    )
+GO
+
+IF COL_LENGTH('dbo.reviews', 'hotel_id') IS NULL
+    ALTER TABLE dbo.reviews ADD hotel_id INT NULL
+GO
+
+IF COL_LENGTH('dbo.review_photos', 'hotel_id') IS NULL
+    ALTER TABLE dbo.review_photos ADD hotel_id INT NULL
+GO
+
+IF COL_LENGTH('dbo.ProcessedReviews', 'hotel_id') IS NULL
+    ALTER TABLE dbo.ProcessedReviews ADD hotel_id INT NULL
+GO
+
+-- Rows scraped before this migration belong to one unknown hotel
+IF EXISTS (SELECT 1 FROM dbo.reviews WHERE hotel_id IS NULL)
+   OR EXISTS (SELECT 1 FROM dbo.ProcessedReviews WHERE hotel_id IS NULL)
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM dbo.properties WHERE booking_url = N'legacy://unassigned')
+        INSERT INTO dbo.properties (booking_url, name) VALUES (N'legacy://unassigned', N'Imported before partitioning')
+
+    DECLARE @legacy INT = (SELECT hotel_id FROM dbo.properties WHERE booking_url = N'legacy://unassigned')
+    UPDATE dbo.reviews          SET hotel_id = @legacy WHERE hotel_id IS NULL
+    UPDATE dbo.review_photos    SET hotel_id = @legacy WHERE hotel_id IS NULL
+    UPDATE dbo.ProcessedReviews SET hotel_id = @legacy WHERE hotel_id IS NULL
+END
+GO
+
+-- Review ids restart at 1 for every scrape, so they are only unique per hotel
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_reviews_hotel_posted' AND object_id = OBJECT_ID('dbo.reviews'))
+    CREATE INDEX IX_reviews_hotel_posted ON dbo.reviews (hotel_id, posted_date) INCLUDE (review_id)
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_review_photos_hotel_review' AND object_id = OBJECT_ID('dbo.review_photos'))
+    CREATE INDEX IX_review_photos_hotel_review ON dbo.review_photos (hotel_id, review_id)
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ProcessedReviews_hotel_date' AND object_id = OBJECT_ID('dbo.ProcessedReviews'))
+    CREATE INDEX IX_ProcessedReviews_hotel_date ON dbo.ProcessedReviews (hotel_id, reviewDate)
+GO
+
+-- "REV-001" exists once per hotel: a primary key on id alone becomes (hotel_id, id)
+DECLARE @pk SYSNAME = (
+    SELECT name FROM sys.key_constraints
+    WHERE parent_object_id = OBJECT_ID('dbo.ProcessedReviews') AND type = 'PK'
+)
+IF @pk IS NOT NULL AND NOT EXISTS (
+    SELECT 1
+    FROM sys.index_columns ic
+    JOIN sys.indexes i ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+    WHERE i.object_id = OBJECT_ID('dbo.ProcessedReviews') AND i.is_primary_key = 1
+      AND COL_NAME(ic.object_id, ic.column_id) = 'hotel_id'
+)
+    EXEC('ALTER TABLE dbo.ProcessedReviews DROP CONSTRAINT ' + QUOTENAME(@pk))
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_ProcessedReviews_hotel_id' AND object_id = OBJECT_ID('dbo.ProcessedReviews'))
+    CREATE UNIQUE INDEX UX_ProcessedReviews_hotel_id ON dbo.ProcessedReviews (hotel_id, id)
+GO
@@ -0,0 +1,9 @@
+-- Dataset versions record how their review_ids were assigned. Versions
+-- loaded before stable ids have positional ids (1..N per scrape), which
+-- never match the ids a scrape computes today, so an incremental scrape
+-- must not use them as its base. NULL marks those versions.
+-- Run after add_dataset_versions.sql. Safe to run more than once.
+
+IF COL_LENGTH('dbo.dataset_versions', 'review_id_scheme') IS NULL
+    ALTER TABLE dbo.dataset_versions ADD review_id_scheme VARCHAR(16) NULL  -- NULL (positional) | stable
+GO
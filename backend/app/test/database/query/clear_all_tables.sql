@@ -1,8 +1,20 @@
+-- Children first: review_photos and ProcessedReviews reference dbo.reviews
+-- (add_processed_review_link.sql)
+DELETE FROM dbo.review_photos
+GO
+
+DELETE FROM dbo.ProcessedReviews
+GO
+
+IF OBJECT_ID('dbo.embedding_outbox', 'U') IS NOT NULL
+    DELETE FROM dbo.embedding_outbox
+GO
+
 DELETE FROM dbo.reviews
 GO
 
-DELETE FROM dbo.review_photos
+DELETE FROM dbo.dataset_versions
 GO
 
-DELETE FROM dbo.ProcessedReviews
+DELETE FROM dbo.properties
 GO
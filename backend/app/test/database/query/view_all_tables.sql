@@ -8,3 +8,8 @@ select * from dbo.ProcessedReviews
 GO
 
 
+select * from dbo.properties
+GO
+
+select * from dbo.dataset_versions
+GO
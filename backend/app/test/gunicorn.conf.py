@@ -0,0 +1,68 @@
+"""
+Production run mode for the review API.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Runs WEB_CONCURRENCY uvicorn workers (default: one per core) forked from a
+preloaded app, so the app is imported once and workers start warm. Heavy
+clients are still created lazily inside each worker, after the fork.
+Workers are recycled after WORKER_MAX_REQUESTS requests (jittered so they
+don't all restart together) and get WORKER_GRACEFUL_TIMEOUT seconds to
+finish in-flight requests. /reviews is served from the shared read cache
+(services/read_cache.py) so the workers don't each query SQL Server.
+
+Scrapes take minutes and would not survive that recycling, so here they
+don't run in the web workers: POST /scrape/booking queues the job and a
+scrape runner process started by the master runs it (services/scrape_queue.py).
+
+Every worker and the runner count their own metrics; they share them
+through METRICS_MULTIPROC_DIR, so /metrics from any worker shows the total.
+"""
+import multiprocessing
+import os
+import pathlib
+import shutil
+import tempfile
+
+# Read by main.py when the preloaded app is imported
+os.environ.setdefault("SCRAPE_RUNNER", "process")
+
+# Fresh for every master: files of the previous run's processes must not be summed in
+_created_metrics_dir = None
+if os.environ.get("METRICS_MULTIPROC_DIR"):
+    for _stale in pathlib.Path(os.environ["METRICS_MULTIPROC_DIR"]).glob("*.json"):
+        _stale.unlink()
+else:
+    _created_metrics_dir = os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="review-metrics-")
+
+bind = os.getenv("BIND", "127.0.0.1:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+max_requests = int(os.getenv("WORKER_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "200"))
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+# Silence from a worker for this long means it is hung; requests are short
+# since scrapes run in the scrape runner, not in the workers
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+keepalive = 5
+
+_scrape_runner = None
+
+
+def when_ready(server):
+    global _scrape_runner
+    if os.environ.get("SCRAPE_RUNNER") == "process":
+        from app.test.services import scrape_queue  # importable once main.py is preloaded
+
+        _scrape_runner = scrape_queue.start_runner()
+        server.log.info("Started scrape runner (pid %s)", _scrape_runner.pid)
+
+
+def on_exit(server):
+    # SIGTERM: the runner stops claiming jobs and finishes the scrapes it is running
+    if _scrape_runner is not None and _scrape_runner.poll() is None:
+        _scrape_runner.terminate()
+    if _created_metrics_dir:
+        shutil.rmtree(_created_metrics_dir, ignore_errors=True)
@@ -1,19 +1,31 @@
 import json
+import orjson
 import pyodbc
 import uvicorn
 import os
+import sys
 import datetime  # Import the whole module to avoid naming conflicts
-from typing import List, Optional
+from typing import List, Literal, Optional
 from dotenv import load_dotenv
 
-from fastapi import FastAPI, HTTPException ,BackgroundTasks
+from fastapi import FastAPI, HTTPException ,BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, AnyHttpUrl ,Field
 
 
-from scraping.booking import scrape_booking
+# Make 'app' importable (test -> app -> backend) for the shared services
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../")))
 
-load_dotenv()  # Load environment variables
+load_dotenv()  # Load environment variables (before the services read theirs at import)
+
+from app.test.services import (
+    datasets, embedding_outbox, live_events, metrics, photo_mirror, properties, read_cache, scrape_queue,
+    search_index,
+)
+from app.test.services.review_rows import (
+    REVIEWS_WITH_PHOTOS_SQL, fold_photo_rows, serialize_review_row
+)
 
 # ==========================================
 # 1. CONFIGURATION
@@ -27,6 +39,12 @@ DB_CONNECTION_STRING = (
     "TrustServerCertificate=yes;"
 )
 
+# Rows pulled per round trip by the streaming /reviews path
+STREAM_FETCH_SIZE = int(os.getenv("REVIEWS_STREAM_FETCH_SIZE", "1000"))
+
+# Mirrored photos never change under their content hash
+PHOTO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 # ==========================================
 # 2. DATA MODELS (Pydantic)
 # ==========================================
@@ -34,9 +52,13 @@ DB_CONNECTION_STRING = (
 class PhotoModel(BaseModel):
     src: str
     alt: str = ""
+    # Set once the photo mirror has downloaded it (GET /photos/{hash})
+    localSrc: Optional[str] = None
+    thumbSrc: Optional[str] = None
 
 class ReviewModel(BaseModel):
-    id: str
+    hotel_id: Optional[int] = None
+    id: str  # Unique within a hotel only
     platformReviewId: Optional[str] = None
     rating: int
     userName: str
@@ -65,6 +87,9 @@ class ReviewModel(BaseModel):
 class BookingScrapeRequest(BaseModel):
     url: AnyHttpUrl
     headless: bool = True
+    wait_mode: Optional[Literal["fast", "polite"]] = None  # None -> SCRAPE_WAIT_MODE
+    artifact_policy: Optional[Literal["off", "on-error", "sampled", "full"]] = None  # None -> ARTIFACT_POLICY
+    incremental: Optional[bool] = None  # None -> SCRAPE_INCREMENTAL
 
 # ==========================================
 # 3. APP INITIALIZATION
@@ -79,109 +104,150 @@ app.add_middleware(
     allow_headers=["*"], 
 )
 
+
+@app.on_event("startup")
+def start_embedding_dispatcher():
+    """Drain outbox rows left by earlier runs or other processes, not only after this worker's next insert."""
+    embedding_outbox.schedule_dispatch(lambda: pyodbc.connect(DB_CONNECTION_STRING))
+
 # ==========================================
 # 4. DATABASE HELPERS
 # ==========================================
-def get_all_reviews_from_db():
+def build_review_dict(row, photos):
+    """Map a ProcessedReviews row onto ReviewModel's input (validation) keys."""
+    review = serialize_review_row(row, photos)
+    review["text"] = review.pop("reviewText")  # ReviewModel validates reviewText from "text"
+    return review
+
+
+def iter_review_rows(hotel_id: Optional[int] = None, fetch_size: int = STREAM_FETCH_SIZE):
+    """
+    Stream (row, photos) for the active processed reviews: a single joined
+    query pulled with fetchmany, whatever the table size, with each
+    review's photo rows folded into its photo list.
+
+    Connects and runs the query before returning, so connection and query
+    errors raise here rather than part-way through a streamed response.
+    """
+    where, params = datasets.active_filter(hotel_id, column="p.version_id")
+    conn = pyodbc.connect(DB_CONNECTION_STRING)
     try:
-        conn = pyodbc.connect(DB_CONNECTION_STRING)
         cursor = conn.cursor()
+        cursor.execute(REVIEWS_WITH_PHOTOS_SQL.format(where=where), *params)
+    except Exception:
+        conn.close()
+        raise
+    return _fold_review_rows(conn, cursor, fetch_size)
 
-        # 1. Fetch the PROCESSED data
-        sql_reviews = """
-            SELECT 
-                id, platformReviewId, rating, userName, reviewerName,
-                reviewText, summary, sentiment, language, categories, 
-                keyPhrases, reviewDate, status, replyStatus, hasReply, source
-            FROM dbo.ProcessedReviews
-        """
-        rows = cursor.execute(sql_reviews).fetchall()
-        
-        # 2. Fetch Photos (Link via platformReviewId -> raw review_id)
-        original_ids = []
-        id_map = {} # Maps original_int_id -> new_system_id (REV-XXX)
-        
-        for r in rows:
-            try:
-                # Extract ID from "BK-101" -> 101
-                if r.platformReviewId and "-" in r.platformReviewId:
-                    orig_id = int(r.platformReviewId.split('-')[1])
-                    original_ids.append(orig_id)
-                    id_map[orig_id] = r.id
-            except (ValueError, IndexError):
-                continue
-
-        # Bulk fetch photos
-        photo_map = {}
-        if original_ids:
-            placeholders = ','.join('?' * len(original_ids))
-            sql_photos = f"SELECT review_id, src, alt FROM review_photos WHERE review_id IN ({placeholders})"
-            pics = cursor.execute(sql_photos, original_ids).fetchall()
-            
-            for pid, src, alt in pics:
-                sys_id = id_map.get(pid)
-                if sys_id:
-                    photo_map.setdefault(sys_id, []).append({"src": src, "alt": alt})
-
-        # 3. Build the Result List
-        results = []
-        for row in rows:
-            # Parse JSON Lists
-            try:
-                cat_list = json.loads(row.categories) if row.categories else []
-            except json.JSONDecodeError:
-                cat_list = []
-
-            try:
-                phrase_list = json.loads(row.keyPhrases) if row.keyPhrases else []
-            except json.JSONDecodeError:
-                phrase_list = []
-
-            results.append({
-                "id": row.id,
-                "platformReviewId": row.platformReviewId,
-                "rating": row.rating or 0,
-                "userName": row.userName or "Anonymous",
-                "reviewerName": row.reviewerName,
-                "text": row.reviewText, 
-                "summary": row.summary,
-                "sentiment": row.sentiment,
-                "language": row.language,
-                "categories": cat_list,
-                "keyPhrases": phrase_list,
-                "date": row.reviewDate, 
-                "status": row.status,
-                "replyStatus": row.replyStatus,
-                "hasReply": row.hasReply,
-                "source": row.source,
-                "photos": photo_map.get(row.id, []) 
-            })
 
+def _fold_review_rows(conn, cursor, fetch_size: int):
+    try:
+        yield from fold_photo_rows(cursor, fetch_size)
+    finally:
+        conn.close()
+
+
+def iter_reviews_from_db(fetch_size: int = STREAM_FETCH_SIZE, hotel_id: Optional[int] = None):
+    """Stream processed reviews straight off the cursor as serialized dicts (query runs on call)."""
+    rows = iter_review_rows(hotel_id, fetch_size)
+    return (serialize_review_row(row, photos) for row, photos in rows)
+
+
+def stream_reviews_json(reviews, ndjson: bool = False, chunk_size: int = STREAM_FETCH_SIZE):
+    """
+    Encode serialized reviews with orjson into chunks, either as a single
+    JSON array or as newline-delimited JSON.
+    """
+    if ndjson:
+        buffer = []
+        for review in reviews:
+            buffer.append(orjson.dumps(review, option=orjson.OPT_APPEND_NEWLINE))
+            if len(buffer) >= chunk_size:
+                yield b"".join(buffer)
+                buffer = []
+        if buffer:
+            yield b"".join(buffer)
+        return
+
+    yield b"["
+    buffer = []
+    first = True
+    for review in reviews:
+        encoded = orjson.dumps(review)
+        buffer.append(encoded if first else b"," + encoded)
+        first = False
+        if len(buffer) >= chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+    buffer.append(b"]")
+    yield b"".join(buffer)
+
+
+def cached_reviews_json(hotel_id: Optional[int] = None) -> bytes:
+    """
+    The /reviews JSON body from the shared read cache. The key carries the
+    active dataset versions, so only a cheap pointer lookup hits SQL Server
+    until a dataset swaps or the entry expires.
+    """
+    conn = pyodbc.connect(DB_CONNECTION_STRING)
+    try:
+        versions = datasets.active_versions(conn.cursor(), hotel_id)
+    finally:
         conn.close()
-        return results
+    scope = "all" if hotel_id is None else hotel_id
+    key = f"reviews:{scope}:{','.join(map(str, versions))}"
+    with metrics.timer("reviews_cached_read"):
+        return read_cache.get_or_build(
+            key, lambda: orjson.dumps(list(iter_reviews_from_db(hotel_id=hotel_id)))
+        )
 
+
+def get_all_reviews_from_db(hotel_id: Optional[int] = None):
+    with metrics.timer("db_get_all_reviews"):
+        return _get_all_reviews_from_db(hotel_id)
+
+
+def _get_all_reviews_from_db(hotel_id: Optional[int] = None):
+    try:
+        return [build_review_dict(row, photos) for row, photos in iter_review_rows(hotel_id)]
     except Exception as e:
         print(f"Database Error: {e}")
         raise e 
     
     
 def remove_all_reviews_from_db():
+    """
+    Retire every hotel's dataset in one small transaction; the rows are
+    deleted afterwards by the background purge.
+    """
     try:
         conn = pyodbc.connect(DB_CONNECTION_STRING)
         cursor = conn.cursor()
 
-        # Delete all records from ProcessedReviews
-        cursor.execute("DELETE FROM dbo.reviews")
+        datasets.retire_versions(cursor)
         conn.commit()
+        datasets.schedule_purge(lambda: pyodbc.connect(DB_CONNECTION_STRING))
 
-        # Delete all records from ReviewPhotos
-        cursor.execute("DELETE FROM dbo.review_photos")
-        conn.commit()
-        
-        # Delete all records from RawReviews
-        cursor.execute("DELETE FROM dbo.ProcessedReviews")
+        search_index.clear_index()
+
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Database Error: {e}")
+        raise e 
+
+
+def remove_reviews_from_db(hotel_id: int):
+    """Retire one hotel's dataset; its rows are purged in the background."""
+    try:
+        conn = pyodbc.connect(DB_CONNECTION_STRING)
+        cursor = conn.cursor()
+
+        datasets.retire_versions(cursor, hotel_id)
         conn.commit()
+        datasets.schedule_purge(lambda: pyodbc.connect(DB_CONNECTION_STRING))
 
+        search_index.clear_index(hotel_id)
 
         conn.close()
         return True
@@ -190,6 +256,32 @@ def remove_all_reviews_from_db():
         raise e 
 
 
+def run_booking_scrape(url: str, headless: bool, wait_mode: Optional[str], artifact_policy: Optional[str],
+                       incremental: Optional[bool] = None):
+    """
+    Background scrape task. The scraper (Playwright, the Gemini client) is
+    imported here on first use so API workers start without it.
+    """
+    from scraping.booking import scrape_booking
+
+    return scrape_booking(url, headless, wait_mode, artifact_policy, incremental)
+
+
+def start_scrape(payload, background_tasks: BackgroundTasks) -> dict:
+    """
+    Hand a scrape to the scrape runner process (SCRAPE_RUNNER=process, as
+    under gunicorn), or run it as a background task of this worker.
+    """
+    args = {
+        "url": str(payload.url), "headless": payload.headless, "wait_mode": payload.wait_mode,
+        "artifact_policy": payload.artifact_policy, "incremental": payload.incremental,
+    }
+    if scrape_queue.MODE == "process":
+        return {"job_id": scrape_queue.enqueue(args)}
+    background_tasks.add_task(run_booking_scrape, *args.values())
+    return {}
+
+
 # ==========================================
 # 5. API ROUTES
 # ==========================================
@@ -199,33 +291,175 @@ def read_root():
     return {"status": "Active", "message": "Visit /docs to see the API"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """
+    Pipeline timers and counters in Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+
+@app.get("/properties")
+def read_properties():
+    """
+    List the scraped properties (hotels) and their hotel_id.
+    """
+    try:
+        conn = pyodbc.connect(DB_CONNECTION_STRING)
+        try:
+            return properties.list_properties(conn.cursor())
+        finally:
+            conn.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 @app.get("/reviews", response_model=List[ReviewModel])
-def read_reviews():
+def read_reviews(
+    stream: Optional[Literal["json", "ndjson"]] = None,
+    hotel_id: Optional[int] = None,
+):
     """
-    Fetch all processed reviews from the database.
+    Fetch processed reviews from the database, for every hotel or for
+    one ``hotel_id``.
+
+    Pass ``stream=json`` (chunked JSON array) or ``stream=ndjson`` to skip
+    per-row Pydantic validation and stream orjson-encoded rows straight
+    from the cursor. The payload is identical to the validated response.
+
+    Unstreamed responses are served from the cross-process read cache
+    unless READ_CACHE_TTL_S=0.
     """
+    if stream:
+        media_type = "application/x-ndjson" if stream == "ndjson" else "application/json"
+        # Query before the 200 goes out, so a database error is a 500, not a cut-off body
+        try:
+            reviews = iter_reviews_from_db(hotel_id=hotel_id)
+        except Exception as e:
+            print(f"API Error: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+        return StreamingResponse(
+            stream_reviews_json(reviews, ndjson=stream == "ndjson"),
+            media_type=media_type,
+        )
+
     try:
-        reviews = get_all_reviews_from_db()
+        if read_cache.ENABLED:
+            return Response(cached_reviews_json(hotel_id), media_type="application/json")
+        reviews = get_all_reviews_from_db(hotel_id)
         return reviews
     except Exception as e:
         # Log the full error to console for debugging
         print(f"API Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/reviews/stream")
+async def stream_review_events(request: Request, hotel_id: Optional[int] = None):
+    """
+    Server-Sent Events channel for dashboards, instead of re-polling /reviews.
+
+    Emits ``scrape`` progress events and a ``review`` event (ReviewModel
+    shape plus hotel_id) for every processed review as soon as it is
+    committed. Reconnecting clients send Last-Event-ID and get what they missed.
+    """
+    return StreamingResponse(
+        live_events.sse_stream(request.is_disconnected, hotel_id, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/reviews/search")
+def search_reviews(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    hotel_id: Optional[int] = None,
+):
+    """
+    Full-text search over reviewText, summary and keyPhrases.
+
+    Words are ANDed, "quoted text" is matched as a phrase, results are
+    ranked by BM25 and matches are wrapped in <mark> tags.
+    """
+    try:
+        hits = search_index.search_reviews(q, limit=limit, hotel_id=hotel_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"API Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"query": q, "count": len(hits), "results": hits}
+
+
+@app.post("/reviews/search/reindex")
+def reindex_reviews():
+    """
+    Rebuild the search index from dbo.ProcessedReviews.
+    """
+    try:
+        conn = pyodbc.connect(DB_CONNECTION_STRING)
+        try:
+            hotel_ids = [p["hotel_id"] for p in properties.list_properties(conn.cursor())]
+        finally:
+            conn.close()
+
+        search_index.clear_index()
+        total = 0
+        for hotel_id in hotel_ids:
+            batch = []
+            for review in iter_reviews_from_db(hotel_id=hotel_id):
+                batch.append(review)
+                if len(batch) >= STREAM_FETCH_SIZE:
+                    search_index.index_reviews(batch, hotel_id)
+                    total += len(batch)
+                    batch = []
+            search_index.index_reviews(batch, hotel_id)
+            total += len(batch)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "success", "indexed": total}
+
+
+@app.get("/photos/{content_hash}")
+def read_photo(content_hash: str, size: Literal["full", "thumb"] = "full"):
+    """
+    Serve a mirrored review photo (or its thumbnail) by content hash.
+
+    Responses are cacheable for a year and honour Range requests.
+    """
+    if not photo_mirror.is_content_hash(content_hash):
+        raise HTTPException(status_code=404, detail="Photo not found.")
+    path = photo_mirror.photo_path(content_hash, size)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Photo not found.")
+    media_type = photo_mirror.MEDIA_TYPES.get(path.suffix.lstrip("."), "application/octet-stream")
+    return FileResponse(path, media_type=media_type, headers={"Cache-Control": PHOTO_CACHE_CONTROL})
+
+
+@app.post("/photos/mirror")
+def mirror_photos():
+    """
+    Download every photo that hasn't been mirrored yet, in the background.
+    """
+    photo_mirror.schedule_mirror(lambda: pyodbc.connect(DB_CONNECTION_STRING))
+    return {"status": "started"}
+
+
 @app.get("/reviews_count")
-def count_reviews():
+def count_reviews(hotel_id: Optional[int] = None):
     """
-    Returns the total number of reviews in the database.
+    Returns the total number of reviews in the database (or for one hotel).
     """
     try:
         conn = pyodbc.connect(DB_CONNECTION_STRING)
         cursor = conn.cursor()
+        where, params = datasets.active_filter(hotel_id)
 
         # FIXED: Updated table name to dbo.ProcessedReviews
-        query = "SELECT COUNT(*) FROM dbo.ProcessedReviews"
+        query = f"SELECT COUNT(*) FROM dbo.ProcessedReviews {where}"
 
-        cursor.execute(query)
+        cursor.execute(query, *params)
         count = cursor.fetchone()[0] 
 
         conn.close()
@@ -236,14 +470,19 @@ def count_reviews():
     
     
 @app.delete("/delete_reviews")
-def delete_all_reviews():
+def delete_all_reviews(hotel_id: Optional[int] = None):
     """
-    Deletes all reviews from the database.
+    Deletes all reviews from the database, or only one hotel's reviews.
     """
     try:
-        success = remove_all_reviews_from_db()
+        if hotel_id is not None:
+            success = remove_reviews_from_db(hotel_id)
+            message = f"Reviews for hotel {hotel_id} deleted."
+        else:
+            success = remove_all_reviews_from_db()
+            message = "All reviews deleted."
         if success:
-            return {"status": "success", "message": "All reviews deleted."}
+            return {"status": "success", "message": message}
         else:
             raise HTTPException(status_code=500, detail="Failed to delete reviews.")
     except Exception as e:
@@ -262,7 +501,7 @@ async def start_booking_scrape(payload: BookingScrapeRequest, background_tasks:
     #     raise HTTPException(status_code=500, detail=f"Unable to clear existing reviews: {exc}")
         
     try:
-        background_tasks.add_task(scrape_booking, str(payload.url), payload.headless)
+        started = start_scrape(payload, background_tasks)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=f"Unable to start scrape: {exc}")
 
@@ -270,6 +509,9 @@ async def start_booking_scrape(payload: BookingScrapeRequest, background_tasks:
         "message": "Booking.com scrape started",
         "url": str(payload.url),
         "headless": payload.headless,
+        "wait_mode": payload.wait_mode,
+        "incremental": payload.incremental,
+        **started,
     }
 
 
@@ -277,22 +519,21 @@ async def start_booking_scrape(payload: BookingScrapeRequest, background_tasks:
 class BookingScrapeRequest(BaseModel):
     url: AnyHttpUrl
     headless: bool = True
+    wait_mode: Optional[Literal["fast", "polite"]] = None  # None -> SCRAPE_WAIT_MODE
+    artifact_policy: Optional[Literal["off", "on-error", "sampled", "full"]] = None  # None -> ARTIFACT_POLICY
+    incremental: Optional[bool] = None  # None -> SCRAPE_INCREMENTAL
 
 
 @app.post("/scrape/booking", tags=["Scraping"])
 async def start_booking_scrape(payload: BookingScrapeRequest, background_tasks: BackgroundTasks):
     """Kick off a Booking.com scrape from the front end.
 
-    Runs in a background task so the HTTP request returns immediately.
+    Runs in the scrape runner (or a background task) so the HTTP request
+    returns immediately. Only the scraped property's rows are replaced, once
+    the scrape finishes.
     """
-    
-    try:
-        remove_all_reviews_from_db()
-    except Exception as e:
-        print(e)
-    
     try:
-        background_tasks.add_task(scrape_booking, str(payload.url), payload.headless)
+        started = start_scrape(payload, background_tasks)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=f"Unable to start scrape: {exc}")
 
@@ -300,11 +541,16 @@ async def start_booking_scrape(payload: BookingScrapeRequest, background_tasks:
         "message": "Booking.com scrape started",
         "url": str(payload.url),
         "headless": payload.headless,
+        "wait_mode": payload.wait_mode,
+        "incremental": payload.incremental,
+        **started,
     }
 
 
 # ==========================================
 # 6. RUNNER
 # ==========================================
+# Development: a single process. Production (several workers, preloaded app,
+# recycling): gunicorn -c gunicorn.conf.py main:app
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
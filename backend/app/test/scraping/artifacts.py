@@ -0,0 +1,131 @@
+"""
+Debug artifacts (screenshots) for the scraper, captured according to a policy.
+
+    off       never capture
+    on-error  only the error-state screenshot (default)
+    sampled   error state plus every Nth step (ARTIFACT_SAMPLE_EVERY)
+    full      every step, like the original scraper
+
+Screenshots are JPEG (ARTIFACT_JPEG_QUALITY) and are written to disk by a
+background thread, so the scraping thread only pays for the capture itself.
+The directory is rotated by size: once it exceeds ARTIFACT_MAX_MB the oldest
+files are deleted.
+"""
+import atexit
+import os
+import pathlib
+import queue
+import threading
+import time
+
+POLICIES = ("off", "on-error", "sampled", "full")
+
+DEFAULT_POLICY = os.getenv("ARTIFACT_POLICY", "on-error")
+SAMPLE_EVERY = int(os.getenv("ARTIFACT_SAMPLE_EVERY", "10"))
+JPEG_QUALITY = int(os.getenv("ARTIFACT_JPEG_QUALITY", "60"))
+MAX_BYTES = int(float(os.getenv("ARTIFACT_MAX_MB", "200")) * 1024 * 1024)
+ARTIFACT_DIR = pathlib.Path(os.getenv("ARTIFACT_DIR", "scraping/screenshots"))
+
+
+class _Writer:
+    """Single background thread writing artifacts and rotating their directories."""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=256)
+        self._sizes: dict[pathlib.Path, int] = {}
+        self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: pathlib.Path, data: bytes, max_bytes: int) -> None:
+        try:
+            self._queue.put_nowait((path, data, max_bytes))
+        except queue.Full:
+            print(f"Artifact queue full; dropping {path.name}")
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            path, data, max_bytes = self._queue.get()
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(data)
+                self._rotate(path.parent, len(data), max_bytes)
+            except OSError as e:
+                print(f"Artifact write failed for {path.name}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _rotate(self, directory: pathlib.Path, added: int, max_bytes: int) -> None:
+        size = self._sizes.get(directory)
+        if size is None:
+            size = sum(f.stat().st_size for f in directory.iterdir() if f.is_file())
+        else:
+            size += added
+        if max_bytes and size > max_bytes:
+            files = sorted((f for f in directory.iterdir() if f.is_file()), key=lambda f: f.stat().st_mtime)
+            for old in files:
+                if size <= max_bytes:
+                    break
+                size -= old.stat().st_size
+                old.unlink(missing_ok=True)
+        self._sizes[directory] = size
+
+
+_writer: _Writer | None = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> _Writer:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = _Writer()
+        return _writer
+
+
+class ArtifactRecorder:
+    """Per-scrape artifact capture; file names are prefixed with the run's start time."""
+
+    def __init__(self, policy: str | None = None, directory: pathlib.Path = ARTIFACT_DIR,
+                 sample_every: int = SAMPLE_EVERY, quality: int = JPEG_QUALITY, max_bytes: int = MAX_BYTES):
+        policy = policy or DEFAULT_POLICY
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown artifact policy {policy!r}; expected one of {POLICIES}")
+        self.policy = policy
+        self.directory = pathlib.Path(directory)
+        self.sample_every = max(1, sample_every)
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+        self.captured = 0
+
+    def _save(self, page, name: str) -> None:
+        data = page.screenshot(type="jpeg", quality=self.quality)
+        path = self.directory / f"{self.run_id}_{name}.jpg"
+        _get_writer().submit(path, data, self.max_bytes)
+        self.captured += 1
+
+    def step(self, page, name: str, seq: int = 0) -> None:
+        """A regular checkpoint; seq (e.g. page index) drives sampling."""
+        if self.policy == "full" or (self.policy == "sampled" and seq % self.sample_every == 0):
+            self._save(page, name)
+
+    def error(self, page, name: str = "99_error_state") -> None:
+        """Evidence for a failure; kept under every policy except off."""
+        if self.policy == "off":
+            return
+        try:
+            self._save(page, name)
+        except Exception as e:  # noqa: BLE001 - the page may already be gone
+            print(f"Error screenshot failed: {e}")
+
+
+def flush() -> None:
+    """Block until queued artifacts are on disk."""
+    if _writer is not None:
+        _writer.flush()
+
+
+atexit.register(flush)
@@ -1,14 +1,15 @@
 from datetime import datetime
 from dataclasses import dataclass, asdict
 import argparse
+import hashlib
 import json
 import pathlib
-import random
 import re
-from time import sleep
+import time
+from concurrent.futures import Future
 from typing import List
 
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 
 import pyodbc
 import sys
@@ -32,7 +33,11 @@ backend_path = os.path.abspath(os.path.join(current_dir, "../../../"))
 # 3. Add backend to sys.path so Python can find 'app'
 sys.path.append(backend_path)
 
-
+from app.test.services import datasets, live_events, metrics, photo_mirror, properties, snapshot
+from app.test.scraping import browser_pool
+from app.test.scraping.artifacts import ArtifactRecorder, flush as flush_artifacts
+from app.test.scraping.resource_filter import ResourceFilter
+from app.test.scraping.waits import WaitStrategy
 
 
 
@@ -46,8 +51,55 @@ CONN_STR = (
 )
 
 
-def rand_between(a: int = 2000, b: int = 4500) -> int:
-    return random.randint(min(a, b), max(a, b))
+# Parallel browsers used to open galleries for photos the card markup can't give us
+PHOTO_ENRICH_WORKERS = int(os.getenv("PHOTO_ENRICH_WORKERS", "2"))
+
+# Booking CDN size segment, e.g. .../images/hotel/square60/123.jpg
+BSTATIC_SIZE_SEGMENT = re.compile(r"/(?:square|max|maxx)\d+(?:x\d+)?/")
+FULL_SIZE_SEGMENT = "/max1280x900/"
+
+# "newest-first incremental" mode: sort newest first, stop at the first page of known reviews
+SCRAPE_INCREMENTAL = os.getenv("SCRAPE_INCREMENTAL", "0").lower() in ("1", "true", "yes")
+
+# Review ids live in INT columns
+MAX_REVIEW_ID = 2**31 - 1
+
+# Booking's sort menu in the reviews modal
+SORT_TRIGGER = '[data-testid="sorters-dropdown-trigger"]'
+SORT_NEWEST = '[data-id="NEWEST_FIRST"]'
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+def full_size_photo_url(src: str) -> str:
+    """Swap a Booking CDN thumbnail size for the full-size variant."""
+    if "bstatic.com" not in src:
+        return src
+    return BSTATIC_SIZE_SEGMENT.sub(FULL_SIZE_SEGMENT, src, count=1)
+
+
+def stable_review_id(*parts) -> int:
+    """Deterministic positive INT id for a review from its identifying parts."""
+    digest = hashlib.sha256("\x1f".join("" if p is None else str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") & MAX_REVIEW_ID or 1
+
+
+def booking_review_id(card) -> int | None:
+    """
+    Booking's own identifier for a review card, when the markup exposes one:
+    numeric ids are used as-is, opaque ones (review URLs) are hashed.
+    """
+    for attribute in ("data-review-id", "data-review-url"):
+        try:
+            value = (card.get_attribute(attribute, timeout=1000) or "").strip()
+        except Exception:
+            value = ""
+        if not value:
+            continue
+        if value.isdigit() and 0 < int(value) <= MAX_REVIEW_ID:
+            return int(value)
+        return stable_review_id("booking", value)
+    return None
 
 
 def first_float(text: str) -> float | None:
@@ -57,6 +109,69 @@ def first_float(text: str) -> float | None:
     return float(match.group(0)) if match else None
 
 
+def read_card_fields(card) -> dict:
+    """The Review fields shown on a review card; a missing one gets its default."""
+    def text(testid: str) -> str:
+        node = card.locator(f'[data-testid="{testid}"]')
+        return node.text_content(timeout=1000).strip() if node.count() > 0 else ""
+
+    fields = {}
+    try:
+        fields["title"] = card.locator('[data-testid="review-title"]').text_content(timeout=1000).strip()
+    except Exception:
+        fields["title"] = "No Title"
+
+    try:
+        rev_po_date = card.locator('[data-testid="review-date"]').text_content(timeout=1000).strip().split(":", 1)[-1].strip()
+        fields["posted_date"] = datetime.strptime(rev_po_date, "%B %d, %Y").date().isoformat()
+    except Exception:
+        fields["posted_date"] = None
+
+    try:
+        score_text = card.locator('[data-testid="review-score"]').text_content(timeout=1000).strip()
+        fields["score"] = first_float(score_text) or 0.0
+    except Exception:
+        fields["score"] = 0.0
+
+    for name, testid in (("positive_txt", "review-positive-text"), ("negative_txt", "review-negative-text")):
+        try:
+            fields[name] = text(testid)
+        except Exception:
+            fields[name] = ""
+
+    try:
+        st_date = card.locator('[data-testid="review-stay-date"]').text_content(timeout=1000).strip()
+        fields["reviewer_stay_date"] = datetime.strptime(st_date, "%B %Y").date().isoformat()
+    except Exception:
+        fields["reviewer_stay_date"] = None
+
+    try:
+        nights_text = card.locator('[data-testid="review-num-nights"]').text_content(timeout=1000).strip()
+        fields["num_of_nights"] = int(first_float(nights_text) or 0)
+    except Exception:
+        fields["num_of_nights"] = 0
+
+    for name, testid in (("traveler_type", "review-traveler-type"), ("room_name", "review-room-name")):
+        try:
+            fields[name] = card.locator(f'[data-testid="{testid}"]').text_content(timeout=1000).strip()
+        except Exception:
+            fields[name] = ""
+    return fields
+
+
+def card_review_id(card, fields: dict | None = None) -> int:
+    """Stable identity of a card: Booking's id, else a fingerprint of its content."""
+    booking_id = booking_review_id(card)
+    if booking_id:
+        return booking_id
+    fields = fields if fields is not None else read_card_fields(card)
+    return stable_review_id(
+        fields["title"], fields["posted_date"], fields["score"], fields["positive_txt"],
+        fields["negative_txt"], fields["reviewer_stay_date"], fields["num_of_nights"],
+        fields["traveler_type"], fields["room_name"],
+    )
+
+
 @dataclass
 class Picture:
     src: str = ""
@@ -83,16 +198,35 @@ class Review:
             self.photo = []
 
 
-def insert_review(cursor, review: Review) -> None:
+@dataclass
+class PhotoTask:
+    """A review whose photos are only reachable through the gallery overlay."""
+    review_id: int
+    # card_review_id() of the card, before the duplicate-content shift to review_id
+    card_id: int
+    page_number: int
+    card_index: int
+
+
+def known_review_ids(cursor, version_id: int) -> set[int]:
+    """Review ids already stored in a dataset version."""
+    return {r[0] for r in cursor.execute(
+        "SELECT review_id FROM dbo.reviews WHERE version_id = ?", version_id
+    ).fetchall()}
+
+
+def insert_review(cursor, review: Review, hotel_id: int, version_id: int) -> None:
     cursor.execute(
         """
         INSERT INTO reviews (
-            review_id, title, score, positive_txt, negative_txt,
+            hotel_id, version_id, review_id, title, score, positive_txt, negative_txt,
             posted_date, reviewer_stay_date, num_of_nights,
             traveler_type, room_name, raw_review
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
+        hotel_id,
+        version_id,
         review.review_id,
         review.title,
         review.score,
@@ -106,19 +240,30 @@ def insert_review(cursor, review: Review) -> None:
         review.raw_review,
     )
 
-    for pic in review.photo:
+    insert_photos(cursor, hotel_id, version_id, review.review_id, review.photo)
+
+
+def insert_photos(cursor, hotel_id: int, version_id: int, review_id: int, pictures: List[Picture]) -> None:
+    for pic in pictures:
         cursor.execute(
             """
-            INSERT INTO review_photos (review_id, src, alt)
-            VALUES (?, ?, ?)
+            INSERT INTO review_photos (hotel_id, version_id, review_id, src, alt)
+            VALUES (?, ?, ?, ?, ?)
             """,
-            review.review_id,
+            hotel_id,
+            version_id,
+            review_id,
             pic.src,
             pic.alt,
         )
 
 
-def run_review_processor() -> None:
+def run_review_processor(hotel_id: int | None = None, version_id: int | None = None,
+                         review_ids: set[int] | None = None) -> int:
+    """
+    Process the scraped version (only review_ids after an incremental
+    scrape); returns the number of processed reviews committed.
+    """
     current_dir = pathlib.Path(__file__).resolve().parent
     backend_path = current_dir.parent
     sys.path.append(str(backend_path))
@@ -128,234 +273,467 @@ def run_review_processor() -> None:
         from app.test.services import review_processor
     except ImportError:
         print("Review processor not found; skipping post-processing.")
-        return
+        return 0
 
-    review_processor.main()
+    processed = review_processor.main(hotel_id, version_id, review_ids)
     print("✓ Review processing completed.")
+    return processed
+
+
+# ------------------------------------------------------------------
+# Page helpers
+# ------------------------------------------------------------------
+def open_reviews_modal(page, url: str, waits: WaitStrategy, artifacts: ArtifactRecorder | None = None) -> None:
+    """Load the property page and open the "read all reviews" modal."""
+    print("Loading page...")
+    waits.pause()
+    with metrics.timer("scrape_page_load"):
+        page.goto(url, wait_until="domcontentloaded", timeout=60000)
+    if artifacts:
+        artifacts.step(page, "01_initial_page_load")
+
+    print("Waiting for reviews button...")
+    view_all_reviews = page.locator('[data-testid="fr-read-all-reviews"]')
+    view_all_reviews.wait_for(state="visible", timeout=10000)
+    if artifacts:
+        artifacts.step(page, "02_review_button_visible")
+
+    page.locator('[data-testid="poi-block"]').last.wait_for(state="visible")
+    view_all_reviews.hover()
+    waits.pause()
+    print("Clicking review button, waiting for modal...")
+    try:
+        waits.reviews_loaded(view_all_reviews.click)
+    except PlaywrightTimeoutError:
+        pass  # The modal opened on the review the property page already showed first
+    page.locator('[data-testid="review-card"]').last.wait_for(state="visible", timeout=10000)
+    if artifacts:
+        artifacts.step(page, "03_review_modal_loaded")
+
+
+def sort_newest_first(page, waits: WaitStrategy) -> bool:
+    """Switch the reviews modal to newest first; False when there is no sort menu."""
+    trigger = page.locator(SORT_TRIGGER)
+    if trigger.count() == 0:
+        return False
+    waits.pause()
+    trigger.first.click()
+    option = page.locator(SORT_NEWEST).first
+    try:
+        option.wait_for(state="visible", timeout=5000)
+    except PlaywrightTimeoutError:
+        return False
+    print("Sorting reviews newest first...")
+    try:
+        waits.reviews_loaded(option.click)
+    except PlaywrightTimeoutError:
+        pass  # The newest review was already first, so the cards didn't change
+    page.locator('[data-testid="review-card"]').last.wait_for(state="visible", timeout=10000)
+    return True
+
 
+def go_to_next_page(page, waits: WaitStrategy) -> bool:
+    """Click "Next page"; returns False when there are no more pages."""
+    next_page_button = page.locator('[aria-label="Next page"]')
+
+    if next_page_button.count() == 0 or next_page_button.is_disabled():
+        return False
+
+    next_page_button.hover()
+    waits.pause()
+    print("Clicking next page, waiting for load...")
+    try:
+        waits.reviews_loaded(next_page_button.click)
+    except PlaywrightTimeoutError:
+        # The cards never changed: click once more rather than read the same page again
+        print("Next page did not load; clicking again...")
+        waits.pause()
+        try:
+            waits.reviews_loaded(next_page_button.click)
+        except PlaywrightTimeoutError:
+            print("Next page still did not load; stopping here.")
+            return False
+    page.locator('[data-testid="review-card"]').last.wait_for(state='visible', timeout=10000)
+    return True
+
+
+def read_card_photos(photo_block) -> List[Picture]:
+    """
+    Read photo URLs straight from the thumbnails in a review card.
+
+    One round trip per card; thumbnail URLs are mapped to full-size ones.
+    """
+    found = photo_block.locator("img").evaluate_all(
+        """imgs => imgs.map(img => [
+            img.getAttribute('src') ? img.src : (img.dataset.src || ''),
+            img.getAttribute('alt') || ''
+        ])"""
+    )
+    return [
+        Picture(src=full_size_photo_url(src), alt=alt)
+        for src, alt in found
+        if src and not src.startswith("data:")
+    ]
 
-def scrape_booking(url: str, headless: bool = True) -> dict:
+
+def read_gallery_photos(page, review, waits: WaitStrategy,
+                        artifacts: ArtifactRecorder | None = None, artifact_name: str = "05_gallery") -> List[Picture]:
+    """Open the gallery overlay for one review card and read its photos."""
+    review_pictures: List[Picture] = []
+    try:
+        thumb_place = review.locator('[data-testid="review-photos"] [data-testid="REVIEW_THUMBNAIL_PROPERTY"]').first
+
+        thumb_place.wait_for(state="visible", timeout=2000)
+        thumb_place.hover()
+        waits.pause()
+
+        gallery = page.locator('[data-testid="GALLERY"]')
+        with metrics.timer("scrape_gallery_open"):
+            thumb_place.click()
+            gallery.wait_for(state="visible", timeout=5000)
+            gallery.locator('[data-testid="REVIEW_PHOTO_PROPERTY"] img').first.wait_for(state="attached", timeout=5000)
+        if artifacts:
+            artifacts.step(page, artifact_name)
+
+        img_elements = gallery.locator('[data-testid="REVIEW_PHOTO_PROPERTY"] img').all()
+
+        print(f"  → Extracting {len(img_elements)} photo(s)...")
+        for img in img_elements:
+            try:
+                src = img.get_attribute("src", timeout=1000) or ""
+                alt = img.get_attribute("alt", timeout=1000) or ""
+                review_pictures.append(Picture(src=src, alt=alt))
+            except Exception:
+                continue
+
+        close_btn = page.locator('[data-testid="GALLERY_CLOSE"]')
+        close_btn.wait_for(state="visible", timeout=2000)
+        close_btn.click()
+        gallery.wait_for(state="hidden", timeout=2000)
+
+    except Exception as e:
+        print(f"  → Photo extraction failed: {str(e)[:50]}...")
+        try:
+            close_btn = page.locator('[data-testid="GALLERY_CLOSE"]')
+            if close_btn.count() > 0 and close_btn.is_visible():
+                close_btn.click()
+                page.locator('[data-testid="GALLERY"]').wait_for(state="hidden", timeout=2000)
+        except Exception:
+            pass
+
+    return review_pictures
+
+
+# ------------------------------------------------------------------
+# Deferred photo enrichment
+# ------------------------------------------------------------------
+def find_card(cards, task: PhotoTask, used: set[int]):
+    """
+    The card on the current page that a task was queued for, matched by
+    identity rather than position (the listing may have shifted since the
+    scrape): the recorded index first, then every other card. None if absent.
+    """
+    count = cards.count()
+    order = [task.card_index] + [i for i in range(count) if i != task.card_index]
+    for i in order:
+        if i >= count or i in used:
+            continue
+        card = cards.nth(i)
+        try:
+            if card_review_id(card) == task.card_id:
+                used.add(i)
+                return card
+        except Exception:
+            continue
+    return None
+
+
+def _enrich_photo_tasks(browser, url: str, hotel_id: int, version_id: int,
+                        tasks: List[PhotoTask], wait_mode: str | None, artifact_policy: str | None,
+                        newest_first: bool = False) -> int:
+    """Pool job: walk to each task's page in a private context, open its gallery, save photos."""
+    saved = 0
+    with pyodbc.connect(CONN_STR) as conn:
+        cursor = conn.cursor()
+        context = browser.new_context(viewport={'width': 1050, 'height': 600}, user_agent=USER_AGENT)
+        ResourceFilter().attach(context)
+        page = context.new_page()
+        waits = WaitStrategy(page, url, wait_mode)
+        artifacts = ArtifactRecorder(artifact_policy)
+        try:
+            open_reviews_modal(page, url, waits)
+            if newest_first:
+                sort_newest_first(page, waits)  # Task pages were numbered in this order
+            current_page = 1
+            used: set[int] = set()  # Card indexes on the current page already matched
+            for task in sorted(tasks, key=lambda t: (t.page_number, t.card_index)):
+                while current_page < task.page_number:
+                    if not go_to_next_page(page, waits):
+                        return saved
+                    current_page += 1
+                    used.clear()
+
+                card = find_card(page.locator('[data-testid="review-card"]'), task, used)
+                if card is None:
+                    print(f"  → Review {task.review_id} is no longer on page {task.page_number}; skipping its photos")
+                    metrics.inc("scrape_photo_tasks_skipped_total")
+                    continue
+                pictures = read_gallery_photos(
+                    page, card, waits, artifacts, f"05_gallery_{task.page_number}_{task.card_index}"
+                )
+                insert_photos(cursor, hotel_id, version_id, task.review_id, pictures)
+                conn.commit()
+                saved += len(pictures)
+                metrics.inc("scrape_photos_total", len(pictures))
+        except Exception as exc:  # noqa: BLE001 - a failed worker must not fail the scrape
+            print(f"Photo enrichment worker stopped: {exc}")
+            artifacts.error(page, "99_enrichment_error")
+        finally:
+            context.close()
+    return saved
+
+
+def start_photo_enrichment(url: str, hotel_id: int, version_id: int, tasks: List[PhotoTask],
+                           headless: bool = True, wait_mode: str | None = None,
+                           artifact_policy: str | None = None, newest_first: bool = False) -> List[Future]:
+    """
+    Open galleries for queued reviews on background workers.
+
+    Pages are spread round-robin over PHOTO_ENRICH_WORKERS jobs on the
+    browser pool so the work runs concurrently with review processing.
+    """
+    if not tasks:
+        return []
+    pages = sorted({t.page_number for t in tasks})
+    workers = max(1, min(PHOTO_ENRICH_WORKERS, len(pages)))
+    chunks: List[List[PhotoTask]] = [[] for _ in range(workers)]
+    for idx, page_number in enumerate(pages):
+        chunks[idx % workers].extend(t for t in tasks if t.page_number == page_number)
+
+    print(f"Queued {len(tasks)} review(s) for gallery photo enrichment in {workers} job(s)")
+    pool = browser_pool.get_pool(headless)
+    return [
+        pool.submit(_enrich_photo_tasks, url, hotel_id, version_id, chunk, wait_mode, artifact_policy, newest_first)
+        for chunk in chunks
+    ]
+
+
+def scrape_booking(url: str, headless: bool = True, wait_mode: str | None = None,
+                   artifact_policy: str | None = None, incremental: bool | None = None) -> dict:
+    """
+    wait_mode: "fast" waits only for page events; "polite" (default, or
+    SCRAPE_WAIT_MODE) also spaces navigations per domain.
+    artifact_policy: "off", "on-error" (default, or ARTIFACT_POLICY),
+    "sampled" or "full" debug screenshots.
+    incremental: sort newest first and stop at the first page whose reviews
+    are all stored already; the new version is the active one plus the new
+    reviews (default SCRAPE_INCREMENTAL). Falls back to a full crawl for a
+    property without an active version or a page without a sort menu.
+    """
+    live_events.publish("scrape", {"status": "started", "url": url})
+    try:
+        with metrics.job("scrape_booking") as job_summary:
+            result = _scrape_booking(url, headless, wait_mode, artifact_policy, incremental) or {}
+    except Exception as exc:
+        live_events.publish("scrape", {"status": "failed", "url": url, "error": str(exc)})
+        raise
+    finally:
+        # Screenshots are written by a daemon thread; a CLI run must not exit before them
+        flush_artifacts()
+    result["metrics"] = job_summary.result
+    live_events.publish("scrape", {
+        "status": "finished",
+        "url": url,
+        "hotel_id": result.get("hotel_id"),
+        "dataset_version": result.get("dataset_version"),
+        "reviews": result.get("review_count", 0),
+    }, result.get("hotel_id"))
+    return result
+
+
+def _scrape_booking(url: str, headless: bool = True, wait_mode: str | None = None,
+                    artifact_policy: str | None = None, incremental: bool | None = None) -> dict:
     if not url or not url.startswith("http"):
         raise ValueError("A valid Booking.com property reviews URL is required.")
+    if incremental is None:
+        incremental = SCRAPE_INCREMENTAL
+
+    # Incremental runs compare against the reviews of the active version
+    base_version = None
+    known_ids: set[int] = set()
+    if incremental:
+        with pyodbc.connect(CONN_STR) as conn:
+            cursor = conn.cursor()
+            known_hotel = properties.find_property(cursor, url)
+            if known_hotel is not None:
+                base_version = datasets.active_version(cursor, known_hotel)
+            if base_version is not None and datasets.review_id_scheme(cursor, base_version) != datasets.STABLE_REVIEW_IDS:
+                # Positional ids of an older scrape never match; copying them would duplicate every review
+                print(f"Version {base_version} predates stable review ids; running a full scrape.")
+                base_version = None
+            elif base_version is not None:
+                known_ids = known_review_ids(cursor, base_version)
+        if base_version is None:
+            print("No usable active dataset for this property yet; running a full scrape.")
+            incremental = False
+        else:
+            print(f"Incremental scrape against version {base_version} ({len(known_ids)} known reviews)")
 
-    screenshot_dir = pathlib.Path("scraping/screenshots")
-    screenshot_dir.mkdir(parents=True, exist_ok=True)
-    print(f"Screenshots will be saved to: {screenshot_dir.absolute()}")
+    artifacts = ArtifactRecorder(artifact_policy)
+    if artifacts.policy != "off":
+        print(f"Screenshots ({artifacts.policy}) will be saved to: {artifacts.directory.absolute()}")
 
     all_reviews: List[Review] = []
+    photo_tasks: List[PhotoTask] = []
     output_file = None
+    hotel_id = None
+    version_id = None
+    page_counter = 0
+    known_seen = 0
+    seen_ids: set[int] = set()
+    # Card ids read on earlier pages: meeting one again means a page was read twice
+    earlier_card_ids: set[int] = set()
+    idle_s = 0.0
+    traffic_totals: dict = {}
+
+    # Columnar snapshot is written page by page while scraping
+    output_dir = pathlib.Path("scraping/BookingOutput")
+    snapshot_writer = snapshot.SnapshotWriter(output_dir / "reviews.arrow", snapshot.RAW_SCHEMA)
+
+    def scrape_pages(browser) -> None:
+        """Pool job: walk every review page in a fresh context."""
+        nonlocal page_counter, known_seen, incremental, idle_s, traffic_totals
+
+        context = browser.new_context(
+            viewport={'width': 1050, 'height': 600},
+            user_agent=USER_AGENT
+        )
+        resource_filter = ResourceFilter().attach(context)
+
+        page = context.new_page()
+        waits = WaitStrategy(page, url, wait_mode)
+
+        try:
+            open_reviews_modal(page, url, waits, artifacts)
+            if incremental and not sort_newest_first(page, waits):
+                print("No sort menu on this page; running a full scrape.")
+                incremental = False
+                known_ids.clear()
+
+            page_counter = 1
+            while True:
+                print(f"\n--- Processing Page {page_counter} ---")
+
+                review_nodes = page.locator('[data-testid="review-card"]')
+                review_nodes.last.wait_for(state="visible")
+                artifacts.step(page, f"04_page_{page_counter}_content", seq=page_counter - 1)
+
+                no_of_reviews_for_the_page = review_nodes.count()
+                new_on_page = 0
+                page_card_ids: set[int] = set()
+
+                metrics.inc("scrape_pages_total")
+
+                for i in range(no_of_reviews_for_the_page):
+                    print(f"Reading review: {i + 1}/{no_of_reviews_for_the_page}")
+                    card_started = time.perf_counter()
+
+                    review = review_nodes.nth(i)
+
+                    try:
+                        raw_text = review.text_content(timeout=1000) or ""
+                    except Exception:
+                        raw_text = ""
+
+                    fields = read_card_fields(review)
+                    card_id = review_id = card_review_id(review, fields)
+                    if card_id in earlier_card_ids:
+                        # Already saved from an earlier page; a new id would duplicate it
+                        metrics.inc("scrape_cards_reread_total")
+                        continue
+                    page_card_ids.add(card_id)
+                    if review_id in known_ids:
+                        known_seen += 1
+                        continue
+                    # Identical content twice on one page: two reviews, told apart by position
+                    while review_id in seen_ids:
+                        review_id = review_id % MAX_REVIEW_ID + 1
+                    seen_ids.add(review_id)
+                    new_on_page += 1
+
+                    # Photo URLs come from the card markup; the gallery is deferred
+                    review_pictures: List[Picture] = []
+                    try:
+                        is_photo = review.locator('[data-testid="review-photos"]')
+                        if is_photo.count() > 0:
+                            review_pictures = read_card_photos(is_photo)
+                            if review_pictures:
+                                print(f"  → Read {len(review_pictures)} photo(s) from card markup")
+                                metrics.inc("scrape_photos_total", len(review_pictures))
+                            else:
+                                print("  → Photos need the gallery, queued for enrichment")
+                                photo_tasks.append(PhotoTask(review_id, card_id, page_counter, i))
+                    except Exception as e:
+                        print(f"  → Photo extraction failed: {str(e)[:50]}...")
+
+                    all_reviews.append(
+                        Review(review_id=review_id, **fields, photo=review_pictures, raw_review=raw_text)
+                    )
+                    snapshot_writer.write(all_reviews[-1])
+                    metrics.observe("scrape_card_extract", time.perf_counter() - card_started)
+                    metrics.inc("scrape_reviews_total")
+
+                earlier_card_ids.update(page_card_ids)
+                snapshot_writer.flush()
+                live_events.publish("scrape", {
+                    "status": "page", "url": url, "page": page_counter, "reviews": len(all_reviews),
+                })
+
+                traffic = resource_filter.page_done()
+                metrics.inc("scrape_requests_blocked_total", traffic["requests_blocked"])
+                metrics.inc("scrape_bytes_loaded_total", traffic["bytes_loaded"])
+                metrics.inc("scrape_bytes_saved_estimate_total", traffic["bytes_saved_estimate"])
+                print(
+                    f"Page {page_counter} traffic: {traffic['requests_allowed']} loaded "
+                    f"({traffic['bytes_loaded'] / 1024:.0f} KiB), {traffic['requests_blocked']} blocked "
+                    f"(~{traffic['bytes_saved_estimate'] / 1024:.0f} KiB saved)"
+                )
+
+                if incremental and no_of_reviews_for_the_page and not new_on_page:
+                    print(f"Page {page_counter} holds only known reviews; stopping.")
+                    break
+
+                print(f"\nMoving to page {page_counter + 1}...")
+
+                if not go_to_next_page(page, waits):
+                    print("No more pages available.")
+                    break
+                page_counter += 1
+
+            print("\nFinished scraping all reviews!")
+
+        except Exception as exc:  # noqa: BLE001 - keeping broad catch for screenshot + cleanup
+            print(f"\nError occurred: {exc}")
+            artifacts.error(page)
+            print("Saving collected reviews before exit...")
+
+        finally:
+            idle_s = waits.idle_s
+            traffic_totals = resource_filter.totals()
+            print("Closing browser context...")
+            context.close()
+            if all_reviews:
+                snapshot_writer.close()
+            else:
+                snapshot_writer.abort()
+
+    # The browser comes from the warm pool; this thread waits for the job
+    browser_pool.get_pool(headless).run(scrape_pages)
 
     with pyodbc.connect(CONN_STR) as conn:
         cursor = conn.cursor()
 
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch(
-                headless=headless,
-                args=['--disable-blink-features=AutomationControlled'],
-            )
-
-            context = browser.new_context(
-                viewport={'width': 1050, 'height': 600},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
-
-            page = context.new_page()
-
-            try:
-                print("Loading page...")
-                page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                page.screenshot(path=str(screenshot_dir / "01_initial_page_load.png"))
-
-                print("Waiting for reviews button...")
-                view_all_reviews = page.locator('[data-testid="fr-read-all-reviews"]')
-                view_all_reviews.wait_for(state="visible", timeout=10000)
-                page.screenshot(path=str(screenshot_dir / "02_review_button_visible.png"))
-
-                page.locator('[data-testid="poi-block"]').last.wait_for(state="visible")
-                view_all_reviews.hover()
-                page.wait_for_timeout(rand_between())
-                view_all_reviews.click()
-                print("Review button clicked, waiting for modal...")
-
-                page.wait_for_timeout(2000)
-                page.locator('[data-testid="review-card"]').first.wait_for(state="visible", timeout=10000)
-                page.screenshot(path=str(screenshot_dir / "03_review_modal_loaded.png"))
-
-                page_counter = 1
-                while True:
-                    print(f"\n--- Processing Page {page_counter} ---")
-
-                    sleep(0.5)
-                    page.wait_for_timeout(rand_between())
-
-                    review_nodes = page.locator('[data-testid="review-card"]')
-                    review_nodes.last.wait_for(state="visible")
-                    page.screenshot(path=str(screenshot_dir / f"04_page_{page_counter}_content.png"))
-
-                    base_id = len(all_reviews) + 1
-                    no_of_reviews_for_the_page = review_nodes.count()
-
-                    for i in range(no_of_reviews_for_the_page):
-                        print(f"Reading review: {i + 1}/{no_of_reviews_for_the_page}")
-
-                        review = review_nodes.nth(i)
-
-                        try:
-                            raw_text = review.text_content(timeout=1000) or ""
-                        except Exception:
-                            raw_text = ""
-
-                        try:
-                            review_title = review.locator('[data-testid="review-title"]').text_content(timeout=1000).strip()
-                        except Exception:
-                            review_title = "No Title"
-
-                        try:
-                            rev_po_date = review.locator('[data-testid="review-date"]').text_content(timeout=1000).strip().split(":", 1)[-1].strip()
-                            review_post_date = datetime.strptime(rev_po_date, "%B %d, %Y").date().isoformat()
-                        except Exception:
-                            review_post_date = None
-
-                        try:
-                            score_text = review.locator('[data-testid="review-score"]').text_content(timeout=1000).strip()
-                            review_score = first_float(score_text) or 0.0
-                        except Exception:
-                            review_score = 0.0
-
-                        try:
-                            pos_rev = review.locator('[data-testid="review-positive-text"]')
-                            positive_review = pos_rev.text_content(timeout=1000).strip() if pos_rev.count() > 0 else ""
-                        except Exception:
-                            positive_review = ""
-
-                        try:
-                            neg_rev = review.locator('[data-testid="review-negative-text"]')
-                            negative_review = neg_rev.text_content(timeout=1000).strip() if neg_rev.count() > 0 else ""
-                        except Exception:
-                            negative_review = ""
-
-                        try:
-                            st_date = review.locator('[data-testid="review-stay-date"]').text_content(timeout=1000).strip()
-                            stayed_date = datetime.strptime(st_date, "%B %Y").date().isoformat()
-                        except Exception:
-                            stayed_date = None
-
-                        try:
-                            nights_text = review.locator('[data-testid="review-num-nights"]').text_content(timeout=1000).strip()
-                            num_of_nights = int(first_float(nights_text) or 0)
-                        except Exception:
-                            num_of_nights = 0
-
-                        try:
-                            traveler_type = review.locator('[data-testid="review-traveler-type"]').text_content(timeout=1000).strip()
-                        except Exception:
-                            traveler_type = ""
-
-                        try:
-                            room_name = review.locator('[data-testid="review-room-name"]').text_content(timeout=1000).strip()
-                        except Exception:
-                            room_name = ""
-
-                        review_pictures: List[Picture] = []
-                        try:
-                            is_photo = review.locator('[data-testid="review-photos"]')
-                            if is_photo.count() > 0:
-                                print("  → Detected photos, opening gallery...")
-                                thumb_place = is_photo.locator('[data-testid="REVIEW_THUMBNAIL_PROPERTY"]').first
-
-                                thumb_place.wait_for(state="visible", timeout=2000)
-                                thumb_place.hover()
-                                page.wait_for_timeout(rand_between())
-                                thumb_place.click()
-
-                                gallery = page.locator('[data-testid="GALLERY"]')
-                                gallery.wait_for(state="visible", timeout=5000)
-                                page.wait_for_timeout(1000)
-
-                                gallery.locator('[data-testid="REVIEW_PHOTO_PROPERTY"] img').first.wait_for(state="attached", timeout=5000)
-                                page.wait_for_timeout(rand_between())
-                                page.screenshot(path=str(screenshot_dir / f"05_gallery_pg{page_counter}_rev{i + 1}.png"))
-
-                                img_elements = gallery.locator('[data-testid="REVIEW_PHOTO_PROPERTY"] img').all()
-
-                                print(f"  → Extracting {len(img_elements)} photo(s)...")
-                                for img in img_elements:
-                                    try:
-                                        src = img.get_attribute("src", timeout=1000) or ""
-                                        alt = img.get_attribute("alt", timeout=1000) or ""
-                                        review_pictures.append(Picture(src=src, alt=alt))
-                                    except Exception:
-                                        continue
-
-                                close_btn = page.locator('[data-testid="GALLERY_CLOSE"]')
-                                close_btn.wait_for(state="visible", timeout=2000)
-                                page.wait_for_timeout(rand_between())
-                                close_btn.click()
-
-                                gallery.wait_for(state="hidden", timeout=2000)
-                                page.wait_for_timeout(500)
-
-                        except Exception as e:
-                            print(f"  → Photo extraction failed: {str(e)[:50]}...")
-                            try:
-                                close_btn = page.locator('[data-testid="GALLERY_CLOSE"]')
-                                if close_btn.count() > 0 and close_btn.is_visible():
-                                    close_btn.click()
-                                    page.wait_for_timeout(500)
-                            except Exception:
-                                pass
-
-                        all_reviews.append(
-                            Review(
-                                review_id=base_id + i,
-                                title=review_title,
-                                score=review_score,
-                                positive_txt=positive_review,
-                                negative_txt=negative_review,
-                                posted_date=review_post_date,
-                                reviewer_stay_date=stayed_date,
-                                num_of_nights=num_of_nights,
-                                traveler_type=traveler_type,
-                                room_name=room_name,
-                                photo=review_pictures,
-                                raw_review=raw_text,
-                            )
-                        )
-
-                    page_counter += 1
-                    print(f"\nMoving to page {page_counter}...")
-
-                    next_page_button = page.locator('[aria-label="Next page"]')
-
-                    if next_page_button.count() == 0 or next_page_button.is_disabled():
-                        print("No more pages available.")
-                        break
-
-                    next_page_button.hover()
-                    page.wait_for_timeout(rand_between())
-                    next_page_button.click()
-                    print("Next page clicked, waiting for load...")
-
-                    page.wait_for_timeout(rand_between())
-                    page.locator('[data-testid="review-card"]').first.wait_for(state='visible', timeout=10000)
-
-                print("\nFinished scraping all reviews!")
-                page.wait_for_timeout(1000)
-
-            except Exception as exc:  # noqa: BLE001 - keeping broad catch for screenshot + cleanup
-                print(f"\nError occurred: {exc}")
-                try:
-                    page.screenshot(path=str(screenshot_dir / "99_error_state.png"))
-                except Exception:
-                    pass
-                print("Saving collected reviews before exit...")
-
-            finally:
-                print("Closing browser...")
-                browser.close()
-
         if all_reviews:
-            output_dir = pathlib.Path("scraping/BookingOutput")
             output_dir.mkdir(parents=True, exist_ok=True)
 
             reviews_data = [asdict(review) for review in all_reviews]
@@ -365,35 +743,66 @@ def scrape_booking(url: str, headless: bool = True) -> dict:
                 encoding="utf-8",
             )
             print(f"\n✓ Successfully wrote {len(all_reviews)} reviews to reviews.json")
-            
-            
-            #-----------------------------------------------------------------------------------
-            
-            print("Clearing existing reviews from database...")
-            try:
-                from app.test.main import remove_all_reviews_from_db
-            except ImportError:
-                print("Review processor not found; skipping post-processing.")
-                return
-            
-            remove_all_reviews_from_db()
-            
-            #-----------------------------------------------------------------------------------
-            
-
-            print("\nSaving reviews to database...")
-            for review in all_reviews:
-                insert_review(cursor, review)
-
-            conn.commit()
+            print(f"✓ Snapshot saved to {snapshot_writer.path}")
+
+            # Load into a new dataset version; readers keep the active one
+            # until the processed rows are committed and the pointer moves
+            hotel_id = properties.get_or_create_property(cursor, url)
+            version_id = datasets.begin_version(cursor, hotel_id, datasets.STABLE_REVIEW_IDS)
+            print(f"\nLoading reviews for hotel {hotel_id} as dataset version {version_id}...")
+            if incremental:
+                datasets.copy_version(cursor, base_version, version_id)
+                print(f"Carried over version {base_version}; adding {len(all_reviews)} new review(s)")
+            with metrics.timer("db_insert_raw_batch"):
+                for review in all_reviews:
+                    insert_review(cursor, review, hotel_id, version_id)
+                properties.mark_scraped(cursor, hotel_id)
+
+                conn.commit()
+            metrics.inc("db_raw_rows_inserted_total", len(all_reviews))
             print(f"✓ Successfully saved {len(all_reviews)} reviews to database")
-            run_review_processor()
+            live_events.publish("scrape", {
+                "status": "processing", "url": url, "hotel_id": hotel_id,
+                "dataset_version": version_id, "reviews": len(all_reviews),
+            }, hotel_id)
+
+            # Gallery-only photos are fetched while the reviews are being processed
+            photo_futures = start_photo_enrichment(
+                url, hotel_id, version_id, photo_tasks, headless, wait_mode, artifacts.policy, incremental
+            )
+            new_ids = {review.review_id for review in all_reviews} if incremental else None
+            processed = run_review_processor(hotel_id, version_id, new_ids)
+            if photo_futures:
+                photos_saved = sum(f.result() for f in photo_futures)
+                print(f"✓ Photo enrichment saved {photos_saved} photo(s)")
+            if not processed:
+                print(f"Dataset version {version_id} was not activated; keeping the previous one.")
+                datasets.discard_version(cursor, version_id)
+                conn.commit()
+                datasets.schedule_purge(lambda: pyodbc.connect(CONN_STR))
+            else:
+                photo_mirror.schedule_mirror(lambda: pyodbc.connect(CONN_STR))
+        elif incremental:
+            hotel_id = properties.find_property(cursor, url)
+            properties.mark_scraped(cursor, hotel_id)
+            conn.commit()
+            print("\nNo new reviews since the last scrape; the active dataset is current.")
         else:
             print("\nNo reviews were collected.")
 
     return {
+        "hotel_id": hotel_id,
+        "dataset_version": version_id,
         "review_count": len(all_reviews),
+        "pages": page_counter,
+        "incremental": incremental,
+        "known_reviews_seen": known_seen,
+        "idle_s": round(idle_s, 3),
+        "traffic": traffic_totals,
+        "artifacts_captured": artifacts.captured,
+        "deferred_photo_reviews": len(photo_tasks),
         "output_file": str(output_file) if output_file else None,
+        "snapshot_file": str(snapshot_writer.path) if all_reviews else None,
     }
 
 
@@ -0,0 +1,226 @@
+"""
+Long-lived pool of Chromium browsers shared by scrape jobs.
+
+Playwright's sync API is bound to the thread that started it, so each pool
+worker is a thread that owns one playwright driver and one browser. Jobs are
+callables submitted to the pool; a free worker runs job(browser, *args) and
+the job opens (and closes) its own context. Browsers stay warm between jobs
+and are relaunched after BROWSER_MAX_USES jobs, when they crash or
+disconnect, or when one worker's browser (with its driver and renderer
+processes) exceeds BROWSER_MAX_RSS_MB.
+"""
+import atexit
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from playwright.sync_api import sync_playwright
+
+from app.test.services import metrics
+
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+MAX_USES = int(os.getenv("BROWSER_MAX_USES", "20"))
+MAX_RSS_MB = float(os.getenv("BROWSER_MAX_RSS_MB", "1500"))  # 0 disables the cap
+LAUNCH_ARGS = ['--disable-blink-features=AutomationControlled']
+
+
+def _children() -> dict[int, list[int]]:
+    """Parent pid -> child pids, from /proc (empty where there is no /proc)."""
+    children: dict[int, list[int]] = {}
+    try:
+        pids = [int(p) for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return children
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields after ")" are fixed
+        ppid = int(stat[stat.rindex(b")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(pid)
+    return children
+
+
+def child_pids(pid: int | None = None) -> set[int]:
+    return set(_children().get(pid or os.getpid(), []))
+
+
+def descendant_rss_mb(root_pid: int | None = None, include_root: bool = False) -> float:
+    """Resident memory of every process below root_pid, and of root_pid itself if asked (Linux /proc; 0 elsewhere)."""
+    root_pid = root_pid or os.getpid()
+    children = _children()
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    stack = [root_pid] if include_root else list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/statm", "rb") as f:
+                total += int(f.read().split()[1]) * page_size
+        except OSError:
+            continue
+    return total / (1024 * 1024)
+
+
+# Held while a worker starts its playwright driver, so the one new child
+# process of this process is known to be that worker's
+_driver_start_lock = threading.Lock()
+
+
+class BrowserPool:
+    def __init__(self, size: int = POOL_SIZE, headless: bool = True,
+                 max_uses: int = MAX_USES, max_rss_mb: float = MAX_RSS_MB):
+        self.size = max(1, size)
+        self.headless = headless
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self._jobs: queue.Queue = queue.Queue()
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"browser-pool-{i}", daemon=True)
+            for i in range(self.size)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Queue fn(browser, *args, **kwargs) on the next free browser."""
+        future: Future = Future()
+        # Run in the caller's context, so its metrics job counts the work
+        context = contextvars.copy_context()
+        self._jobs.put((future, context, fn, args, kwargs, time.perf_counter()))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """submit() and wait for the result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def shutdown(self) -> None:
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=30)
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    def _launch(self, playwright):
+        with metrics.timer("browser_launch"):
+            browser = playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        metrics.inc("browser_launches_total")
+        return browser
+
+    def _recycle_reason(self, browser, uses: int, driver_pid: int | None = None) -> str | None:
+        if not browser.is_connected():
+            return "crashed"
+        if self.max_uses and uses >= self.max_uses:
+            return "max_uses"
+        if self.max_rss_mb and driver_pid and descendant_rss_mb(driver_pid, include_root=True) > self.max_rss_mb:
+            return "memory"
+        return None
+
+    def _set_busy(self, delta: int) -> None:
+        with self._lock:
+            self._busy += delta
+            metrics.set_gauge("browser_pool_busy", self._busy)
+
+    def _start_driver(self):
+        """Start this worker's playwright driver; returns (manager, playwright, driver pid or None)."""
+        manager = sync_playwright()
+        with _driver_start_lock:
+            before = child_pids()
+            playwright = manager.__enter__()
+            started = child_pids() - before
+        return manager, playwright, started.pop() if len(started) == 1 else None
+
+    def _worker(self) -> None:
+        # This worker's driver and the browser it launches are one process tree,
+        # so the memory cap applies per browser, not to everything this process started
+        manager, playwright, driver_pid = self._start_driver()
+        try:
+            browser = None
+            uses = 0
+            try:
+                browser = self._launch(playwright)
+            except Exception as exc:  # noqa: BLE001 - retried when the first job arrives
+                print(f"Browser pool: warm launch failed: {exc}")
+
+            while True:
+                item = self._jobs.get()
+                if item is None:
+                    break
+                future, context, fn, args, kwargs, queued_at = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                metrics.observe("browser_pool_wait", time.perf_counter() - queued_at)
+
+                self._set_busy(1)
+                try:
+                    if browser is None or not browser.is_connected():
+                        browser = self._launch(playwright)
+                        uses = 0
+                    future.set_result(context.run(fn, browser, *args, **kwargs))
+                except BaseException as exc:  # noqa: BLE001 - handed to the caller
+                    future.set_exception(exc)
+                finally:
+                    self._set_busy(-1)
+
+                if browser is None:
+                    continue
+                uses += 1
+                reason = self._recycle_reason(browser, uses, driver_pid)
+                if reason:
+                    print(f"Browser pool: recycling browser after {uses} job(s) ({reason})")
+                    metrics.inc("browser_recycles_total")
+                    try:
+                        browser.close()
+                    except Exception:
+                        pass
+                    browser = None
+                    try:
+                        browser = self._launch(playwright)
+                        uses = 0
+                    except Exception as exc:  # noqa: BLE001
+                        print(f"Browser pool: relaunch failed: {exc}")
+
+            if browser is not None:
+                try:
+                    browser.close()
+                except Exception:
+                    pass
+        finally:
+            manager.__exit__(None, None, None)
+
+
+_pools: dict[bool, BrowserPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(headless: bool = True) -> BrowserPool:
+    """The process-wide pool for headless (or headed) browsers, started on first use."""
+    with _pools_lock:
+        pool = _pools.get(headless)
+        if pool is None:
+            pool = _pools[headless] = BrowserPool(headless=headless)
+        return pool
+
+
+def shutdown_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+atexit.register(shutdown_pools)
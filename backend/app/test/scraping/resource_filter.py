@@ -0,0 +1,123 @@
+"""
+Route-based resource filtering for the Booking.com scraper.
+
+The scraper only reads review text and photo URLs (from src attributes), so
+images, media, fonts and third-party ad/analytics scripts are aborted before
+they are fetched. Documents, stylesheets, scripts and XHR/fetch calls from
+allowed hosts go through untouched, which keeps review pagination working.
+
+Blocked requests never report a size, so "bytes saved" is an estimate from a
+typical size per resource type; bytes actually loaded come from the
+Content-Length of the responses that were let through.
+"""
+import os
+import threading
+from urllib.parse import urlparse
+
+ENABLED = os.getenv("SCRAPE_RESOURCE_FILTER", "1").lower() not in ("0", "false", "no")
+
+BLOCKED_RESOURCE_TYPES = frozenset(
+    t.strip() for t in os.getenv("SCRAPE_BLOCK_RESOURCE_TYPES", "image,media,font").split(",") if t.strip()
+)
+
+# Suffix match, so "doubleclick.net" also blocks "stats.g.doubleclick.net"
+DOMAIN_DENYLIST = tuple(
+    d.strip().lower() for d in os.getenv(
+        "SCRAPE_BLOCK_DOMAINS",
+        "googletagmanager.com,google-analytics.com,doubleclick.net,googlesyndication.com,"
+        "facebook.net,facebook.com,bat.bing.com,hotjar.com,criteo.com,criteo.net,"
+        "adnxs.com,taboola.com,outbrain.com,quantserve.com,scorecardresearch.com",
+    ).split(",") if d.strip()
+)
+
+# Rough transfer sizes used to estimate what a blocked request would have cost
+TYPICAL_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "script": 60_000,
+    "stylesheet": 20_000,
+}
+DEFAULT_TYPICAL_BYTES = 10_000
+
+
+def _denied_host(url: str, denylist=DOMAIN_DENYLIST) -> bool:
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == d or host.endswith("." + d) for d in denylist)
+
+
+class _Counts:
+    __slots__ = ("allowed", "blocked", "bytes_loaded", "bytes_saved_estimate", "blocked_by_type")
+
+    def __init__(self):
+        self.allowed = 0
+        self.blocked = 0
+        self.bytes_loaded = 0
+        self.bytes_saved_estimate = 0
+        self.blocked_by_type: dict[str, int] = {}
+
+    def as_dict(self) -> dict:
+        return {
+            "requests_allowed": self.allowed,
+            "requests_blocked": self.blocked,
+            "bytes_loaded": self.bytes_loaded,
+            "bytes_saved_estimate": self.bytes_saved_estimate,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
+
+
+class ResourceFilter:
+    """Installs a route on a browser context and counts what it blocks."""
+
+    def __init__(self, blocked_types=BLOCKED_RESOURCE_TYPES, denylist=DOMAIN_DENYLIST):
+        self.blocked_types = frozenset(blocked_types)
+        self.denylist = tuple(d.lower() for d in denylist)
+        self._lock = threading.Lock()
+        self._page = _Counts()
+        self._total = _Counts()
+
+    def attach(self, context) -> "ResourceFilter":
+        if ENABLED:
+            context.route("**/*", self._handle)
+            context.on("response", self._on_response)
+        return self
+
+    def _should_block(self, request) -> bool:
+        if request.resource_type == "document" and request.is_navigation_request():
+            return False
+        if request.resource_type in self.blocked_types:
+            return True
+        return _denied_host(request.url, self.denylist)
+
+    def _handle(self, route, request) -> None:
+        if not self._should_block(request):
+            route.continue_()
+            return
+        kind = request.resource_type
+        saved = TYPICAL_BYTES.get(kind, DEFAULT_TYPICAL_BYTES)
+        with self._lock:
+            for counts in (self._page, self._total):
+                counts.blocked += 1
+                counts.bytes_saved_estimate += saved
+                counts.blocked_by_type[kind] = counts.blocked_by_type.get(kind, 0) + 1
+        route.abort("blockedbyclient")
+
+    def _on_response(self, response) -> None:
+        try:
+            size = int(response.headers.get("content-length", 0))
+        except ValueError:
+            size = 0
+        with self._lock:
+            for counts in (self._page, self._total):
+                counts.allowed += 1
+                counts.bytes_loaded += size
+
+    def page_done(self) -> dict:
+        """Counts since the previous call (one scraped page), then reset."""
+        with self._lock:
+            page, self._page = self._page, _Counts()
+        return page.as_dict()
+
+    def totals(self) -> dict:
+        with self._lock:
+            return self._total.as_dict()
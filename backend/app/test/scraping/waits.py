@@ -0,0 +1,148 @@
+"""
+Wait strategies for the Booking.com scraper.
+
+Instead of sleeping a random 2-4.5 s before every click, the scraper waits
+for the event it actually needs: the reviews XHR response, the review cards
+being swapped in the DOM, or a locator reaching a state. Politeness is a
+separate, optional budget enforced per domain: in "polite" mode two
+navigations on the same host are spaced by a jittered interval, no matter
+how many jobs or threads are scraping it.
+"""
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+DEFAULT_WAIT_MODE = os.getenv("SCRAPE_WAIT_MODE", "polite")
+REVIEWS_XHR_PATTERN = re.compile(os.getenv("REVIEWS_XHR_PATTERN", r"/reviewlist"), re.IGNORECASE)
+# GraphQL endpoints serve everything; only operations about reviews count
+REVIEWS_GRAPHQL_OPERATION = re.compile(
+    os.getenv("REVIEWS_GRAPHQL_OPERATION", r'"operationName"\s*:\s*"[^"]*review'), re.IGNORECASE
+)
+REVIEW_CARD = '[data-testid="review-card"]'
+# Poll interval for the DOM check while watching for the XHR
+_POLL_MS = 100
+
+
+@dataclass(frozen=True)
+class WaitProfile:
+    name: str
+    min_interval_ms: int   # minimum gap between navigations on one domain
+    max_interval_ms: int   # upper bound of the jittered gap
+    dom_timeout_ms: int = 10000
+    # Once the reviews XHR has answered, the new cards must show within this
+    xhr_settle_ms: int = 1500
+
+
+PROFILES = {
+    "fast": WaitProfile("fast", 0, 0),
+    "polite": WaitProfile("polite", 2000, 4500),
+}
+
+
+class PolitenessBudget:
+    """Per-domain spacing of navigations, shared by every scrape in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_allowed: dict[str, float] = {}
+
+    def wait(self, domain: str, profile: WaitProfile) -> float:
+        """Block until the domain may be hit again; returns seconds slept."""
+        if profile.max_interval_ms <= 0:
+            return 0.0
+        gap = random.randint(profile.min_interval_ms, profile.max_interval_ms) / 1000
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_allowed.get(domain, now))
+            self._next_allowed[domain] = start + gap
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+_budget = PolitenessBudget()
+
+
+class WaitStrategy:
+    """Event-driven waits for one page, plus the per-domain politeness budget."""
+
+    def __init__(self, page, url: str, mode: str | None = None):
+        mode = mode or DEFAULT_WAIT_MODE
+        if mode not in PROFILES:
+            raise ValueError(f"Unknown wait mode {mode!r}; expected one of {sorted(PROFILES)}")
+        self.page = page
+        self.profile = PROFILES[mode]
+        self.domain = urlparse(url).netloc
+        self.idle_s = 0.0
+
+    def pause(self) -> None:
+        """Spend the politeness budget before an action that hits the site."""
+        self.idle_s += _budget.wait(self.domain, self.profile)
+
+    def _is_reviews_response(self, response) -> bool:
+        request = response.request
+        if request.resource_type not in ("xhr", "fetch"):
+            return False
+        if REVIEWS_XHR_PATTERN.search(response.url):
+            return True
+        if "graphql" not in response.url.lower():
+            return False
+        try:
+            body = request.post_data or ""
+        except Exception:
+            return False
+        return REVIEWS_GRAPHQL_OPERATION.search(body) is not None
+
+    def reviews_loaded(self, action) -> None:
+        """
+        Run an action (a click) and wait until a new set of review cards is
+        in the DOM. The reviews XHR is watched at the same time, not waited
+        for: layouts without one wait only for the cards, and once it has
+        answered the cards get xhr_settle_ms more instead of the full timeout.
+        Raises PlaywrightTimeoutError whenever the cards did not change, so
+        the caller never reads the previous cards as the new ones.
+        """
+        first_card = self.page.locator(REVIEW_CARD).first
+        previous = first_card.text_content(timeout=1000) if first_card.count() > 0 else None
+
+        answered: list[float] = []
+
+        def on_response(response) -> None:
+            if not answered and self._is_reviews_response(response):
+                answered.append(time.monotonic())
+
+        self.page.on("response", on_response)
+        try:
+            action()
+            deadline = time.monotonic() + self.profile.dom_timeout_ms / 1000
+            while True:
+                try:
+                    self.page.wait_for_function(
+                        """([selector, previous]) => {
+                            const card = document.querySelector(selector);
+                            return card !== null && card.textContent !== previous;
+                        }""",
+                        arg=[REVIEW_CARD, previous],
+                        timeout=_POLL_MS,
+                    )
+                    return
+                except PlaywrightTimeoutError:
+                    pass
+                now = time.monotonic()
+                if answered and now >= answered[0] + self.profile.xhr_settle_ms / 1000:
+                    raise PlaywrightTimeoutError(
+                        f"Reviews loaded but the cards did not change within {self.profile.xhr_settle_ms} ms"
+                    )
+                if now >= deadline:
+                    raise PlaywrightTimeoutError(
+                        f"Review cards did not change within {self.profile.dom_timeout_ms} ms"
+                    )
+        finally:
+            self.page.remove_listener("response", on_response)
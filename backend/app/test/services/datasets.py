@@ -0,0 +1,197 @@
+"""
+Versioned datasets: every scrape of a property loads into a new version.
+
+Raw, photo and processed rows carry the version_id they were loaded under.
+Readers only see the version that dbo.properties.active_version points to,
+so a re-scrape loads and processes in the background while GET /reviews
+keeps serving the previous version. The pointer moves in the same
+transaction that commits the processed rows; retired versions are deleted
+afterwards by a background purge thread.
+
+Version states: loading -> active -> retired, or loading -> failed.
+"""
+import threading
+
+VERSIONED_TABLES = ("dbo.review_photos", "dbo.ProcessedReviews", "dbo.reviews")
+
+# dataset_versions.review_id_scheme of versions whose review_ids come from
+# the card itself; NULL marks older versions with positional ids
+STABLE_REVIEW_IDS = "stable"
+
+# Columns carried from one version to the next by copy_version()
+_COPY_COLUMNS = {
+    "dbo.reviews": (
+        "hotel_id, review_id, title, score, positive_txt, negative_txt, posted_date, "
+        "reviewer_stay_date, num_of_nights, traveler_type, room_name, raw_review"
+    ),
+    "dbo.review_photos": "hotel_id, review_id, src, alt, content_hash",
+    "dbo.ProcessedReviews": (
+        "hotel_id, review_id, id, platformReviewId, source, rating, userName, reviewerName, reviewText, [text], "
+        "summary, sentiment, language, categories, keyPhrases, reviewDate, firstSeen, lastUpdated, "
+        "scrapedAt, [status], replyStatus, hasReply"
+    ),
+}
+
+
+def active_filter(hotel_id: int | None = None, column: str = "version_id"):
+    """WHERE clause and parameters selecting active-version rows (of one hotel, or all)."""
+    if hotel_id is None:
+        return f"WHERE {column} IN (SELECT active_version FROM dbo.properties)", []
+    return f"WHERE {column} IN (SELECT active_version FROM dbo.properties WHERE hotel_id = ?)", [hotel_id]
+
+
+def begin_version(cursor, hotel_id: int, review_id_scheme: str | None = None) -> int:
+    """Open a new 'loading' version for a hotel (caller commits)."""
+    # The id comes from the insert itself: concurrent scrapes of one hotel each get their own
+    row = cursor.execute(
+        """
+        INSERT INTO dbo.dataset_versions (hotel_id, status, review_id_scheme)
+        OUTPUT INSERTED.version_id VALUES (?, 'loading', ?)
+        """,
+        hotel_id,
+        review_id_scheme,
+    ).fetchone()
+    return int(row[0])
+
+
+def review_id_scheme(cursor, version_id: int) -> str | None:
+    """How a version's review_ids were assigned: STABLE_REVIEW_IDS, or None for positional ids."""
+    row = cursor.execute(
+        "SELECT review_id_scheme FROM dbo.dataset_versions WHERE version_id = ?", version_id
+    ).fetchone()
+    return row[0] if row else None
+
+
+def copy_version(cursor, from_version: int, to_version: int) -> None:
+    """
+    Carry every row of one version into another (caller commits). An
+    incremental scrape starts its new version from the active one and only
+    adds the reviews it found. The copy keeps the source's review_id_scheme.
+    """
+    for table, columns in _COPY_COLUMNS.items():
+        cursor.execute(
+            f"INSERT INTO {table} (version_id, {columns}) SELECT ?, {columns} FROM {table} WHERE version_id = ?",
+            to_version,
+            from_version,
+        )
+    cursor.execute(
+        """
+        UPDATE dbo.dataset_versions
+        SET review_id_scheme = (SELECT review_id_scheme FROM dbo.dataset_versions WHERE version_id = ?)
+        WHERE version_id = ?
+        """,
+        from_version,
+        to_version,
+    )
+
+
+def active_version(cursor, hotel_id: int) -> int | None:
+    row = cursor.execute(
+        "SELECT active_version FROM dbo.properties WHERE hotel_id = ?", hotel_id
+    ).fetchone()
+    return row[0] if row else None
+
+
+def active_versions(cursor, hotel_id: int | None = None) -> tuple:
+    """Active version ids (of one hotel, or all), sorted; changes whenever a dataset swaps."""
+    sql = "SELECT active_version FROM dbo.properties WHERE active_version IS NOT NULL"
+    params = []
+    if hotel_id is not None:
+        sql += " AND hotel_id = ?"
+        params.append(hotel_id)
+    return tuple(sorted(r[0] for r in cursor.execute(sql, *params).fetchall()))
+
+
+def activate_version(cursor, hotel_id: int, version_id: int) -> bool:
+    """
+    Point the hotel at version_id and retire the version it replaces.
+    Runs inside the caller's transaction; returns True if a version was retired.
+    """
+    retired = cursor.execute(
+        """
+        UPDATE dbo.dataset_versions SET status = 'retired'
+        WHERE hotel_id = ? AND status = 'active' AND version_id <> ?
+        """,
+        hotel_id,
+        version_id,
+    ).rowcount
+    cursor.execute(
+        """
+        UPDATE dbo.dataset_versions SET status = 'active', activated_at = CURRENT_TIMESTAMP
+        WHERE version_id = ?
+        """,
+        version_id,
+    )
+    cursor.execute(
+        "UPDATE dbo.properties SET active_version = ? WHERE hotel_id = ?", version_id, hotel_id
+    )
+    return retired > 0
+
+
+def retire_versions(cursor, hotel_id: int | None = None) -> None:
+    """Hide a hotel's (or every hotel's) data at once; rows go with the next purge."""
+    if hotel_id is None:
+        cursor.execute("UPDATE dbo.properties SET active_version = NULL")
+        cursor.execute("UPDATE dbo.dataset_versions SET status = 'retired' WHERE status = 'active'")
+        return
+    cursor.execute("UPDATE dbo.properties SET active_version = NULL WHERE hotel_id = ?", hotel_id)
+    cursor.execute(
+        "UPDATE dbo.dataset_versions SET status = 'retired' WHERE hotel_id = ? AND status = 'active'",
+        hotel_id,
+    )
+
+
+def discard_version(cursor, version_id: int) -> None:
+    """Mark a version that never finished loading for purging (caller commits)."""
+    cursor.execute(
+        "UPDATE dbo.dataset_versions SET status = 'failed' WHERE version_id = ? AND status = 'loading'",
+        version_id,
+    )
+
+
+def purge_versions(connect) -> int:
+    """Delete the rows of retired and failed versions; one commit per table and version."""
+    with connect() as conn:
+        cursor = conn.cursor()
+        versions = [r[0] for r in cursor.execute(
+            "SELECT version_id FROM dbo.dataset_versions WHERE status IN ('retired', 'failed')"
+        ).fetchall()]
+        for version_id in versions:
+            for table in VERSIONED_TABLES:
+                cursor.execute(f"DELETE FROM {table} WHERE version_id = ?", version_id)
+                conn.commit()
+            cursor.execute("DELETE FROM dbo.dataset_versions WHERE version_id = ?", version_id)
+            conn.commit()
+    return len(versions)
+
+
+# ------------------------------------------------------------------
+# Background purge
+# ------------------------------------------------------------------
+_purge_wanted = threading.Event()
+_purge_lock = threading.Lock()
+_purge_thread: threading.Thread | None = None
+
+
+def _purge_loop(connect) -> None:
+    while True:
+        _purge_wanted.wait()
+        _purge_wanted.clear()
+        try:
+            purged = purge_versions(connect)
+            if purged:
+                print(f"✓ Purged {purged} old dataset version(s)")
+        except Exception as e:
+            print(f"Dataset purge failed: {e}")
+
+
+def schedule_purge(connect) -> None:
+    """Ask the purge thread (started on first use) to drop old versions."""
+    global _purge_thread
+    with _purge_lock:
+        if _purge_thread is None:
+            _purge_thread = threading.Thread(
+                target=_purge_loop, args=(connect,), name="dataset-purge", daemon=True
+            )
+            _purge_thread.start()
+    _purge_wanted.set()
@@ -0,0 +1,218 @@
+"""
+Transactional outbox from the review processor to the embedding service.
+
+ProcessedReviewWriter.write() calls enqueue() on its own cursor, so a review's
+outbox row commits (or rolls back) with the review itself. A background
+dispatcher thread drains the table in batches to POST /embed/batch, which
+upserts by review id and skips unchanged text, so redelivery is harmless and
+costs no embedding calls. Failed batches are retried with exponential
+backoff; a row that keeps failing is parked after MAX_ATTEMPTS.
+
+Rows are claimed with a short lease before sending, so dispatchers in
+several processes (gunicorn workers, the scraper) don't send the same batch.
+The API and the scrape runner start their dispatcher at startup, so rows
+left behind by a crash or a short-lived process drain without new inserts.
+
+Enabled when EMBEDDING_SERVICE_URL is set; run
+database/query/add_embedding_outbox.sql first. Times are epoch seconds.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+from app.test.services import metrics
+
+SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "").rstrip("/")
+ENABLED = bool(SERVICE_URL)
+BATCH_SIZE = int(os.getenv("EMBEDDING_OUTBOX_BATCH", "100"))
+POLL_S = float(os.getenv("EMBEDDING_OUTBOX_POLL_S", "5"))
+MAX_ATTEMPTS = int(os.getenv("EMBEDDING_OUTBOX_MAX_ATTEMPTS", "8"))
+TIMEOUT_S = float(os.getenv("EMBEDDING_OUTBOX_TIMEOUT_S", "60"))
+BACKOFF_S = 5
+MAX_BACKOFF_S = 900
+# Dispatched rows are kept this long, then deleted
+RETENTION_S = 24 * 3600
+
+# A claimed batch not acknowledged within this time is claimable again
+_LEASE_S = TIMEOUT_S * 2
+_OWNER = uuid.uuid4().hex[:16]
+
+
+def embedding_id(hotel_id: int, platform_review_id: str) -> str:
+    """Vector id of a review: stable across scrapes and dataset versions."""
+    return f"{hotel_id}:{platform_review_id}"
+
+
+def enqueue(cursor, rows: list[dict], hotel_id: int | None, version_id: int | None) -> int:
+    """Add processed rows to the outbox on the caller's cursor; the caller commits."""
+    if not ENABLED or hotel_id is None:
+        return 0
+    now = time.time()
+    items = []
+    for r in rows:
+        text = r.get("text") or r.get("reviewText") or ""
+        if not text or not r.get("platformReviewId"):
+            continue
+        metadata = {
+            "version_id": version_id,
+            "platformReviewId": r["platformReviewId"],
+            "rating": r.get("rating"),
+            "sentiment": r.get("sentiment"),
+        }
+        items.append((
+            hotel_id, version_id, embedding_id(hotel_id, r["platformReviewId"]), text,
+            json.dumps({k: v for k, v in metadata.items() if v is not None}), now, now,
+        ))
+    if items:
+        cursor.executemany(
+            "INSERT INTO dbo.embedding_outbox (hotel_id, version_id, embedding_id, text, metadata, "
+            "created_ts, next_attempt_ts) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            items,
+        )
+    metrics.inc("embedding_outbox_enqueued_total", len(items))
+    return len(items)
+
+
+def send_batch(reviews: list[dict]) -> dict:
+    """POST one batch to the embedding service; raises on any failure."""
+    import httpx
+
+    with metrics.timer("embedding_outbox_send"):
+        response = httpx.post(f"{SERVICE_URL}/embed/batch", json={"reviews": reviews}, timeout=TIMEOUT_S)
+    response.raise_for_status()
+    return response.json()
+
+
+# ------------------------------------------------------------------
+# Dispatch
+# ------------------------------------------------------------------
+def _claim(conn, now: float) -> list:
+    """Lease up to BATCH_SIZE due rows, oldest first, for this process."""
+    cursor = conn.cursor()
+    candidates = [r[0] for r in cursor.execute(
+        "SELECT id FROM dbo.embedding_outbox "
+        "WHERE dispatched_ts IS NULL AND attempts < ? AND next_attempt_ts <= ? "
+        "AND (lease_until_ts IS NULL OR lease_until_ts < ?) ORDER BY id",
+        MAX_ATTEMPTS, now, now,
+    ).fetchmany(BATCH_SIZE)]
+    if not candidates:
+        return []
+    marks = ",".join("?" * len(candidates))
+    # Re-checks the lease, so of two dispatchers racing for a row only one wins it
+    cursor.execute(
+        f"UPDATE dbo.embedding_outbox SET lease_owner = ?, lease_until_ts = ? "
+        f"WHERE id IN ({marks}) AND dispatched_ts IS NULL AND (lease_until_ts IS NULL OR lease_until_ts < ?)",
+        _OWNER, now + _LEASE_S, *candidates, now,
+    )
+    conn.commit()
+    return cursor.execute(
+        f"SELECT id, hotel_id, embedding_id, text, metadata, attempts, created_ts FROM dbo.embedding_outbox "
+        f"WHERE id IN ({marks}) AND lease_owner = ? AND dispatched_ts IS NULL ORDER BY id",
+        *candidates, _OWNER,
+    ).fetchall()
+
+
+def _acknowledge(conn, rows: list, now: float) -> None:
+    marks = ",".join("?" * len(rows))
+    conn.cursor().execute(
+        f"UPDATE dbo.embedding_outbox SET dispatched_ts = ?, lease_owner = NULL, lease_until_ts = NULL, "
+        f"last_error = NULL WHERE id IN ({marks})",
+        now, *[r.id for r in rows],
+    )
+    conn.commit()
+    metrics.inc("embedding_outbox_dispatched_total", len(rows))
+    for r in rows:
+        metrics.observe("embedding_outbox_delivery", now - r.created_ts)
+
+
+def _fail(conn, rows: list, error: str, now: float) -> None:
+    cursor = conn.cursor()
+    for r in rows:
+        attempts = r.attempts + 1
+        delay = min(BACKOFF_S * 2 ** r.attempts, MAX_BACKOFF_S)
+        cursor.execute(
+            "UPDATE dbo.embedding_outbox SET attempts = ?, next_attempt_ts = ?, last_error = ?, "
+            "lease_owner = NULL, lease_until_ts = NULL WHERE id = ?",
+            attempts, now + delay, error[:500], r.id,
+        )
+        if attempts >= MAX_ATTEMPTS:
+            metrics.inc("embedding_outbox_parked_total")
+    conn.commit()
+    metrics.inc("embedding_outbox_failures_total")
+
+
+def _record_lag(conn, now: float) -> None:
+    pending, oldest = conn.cursor().execute(
+        "SELECT COUNT(*), MIN(created_ts) FROM dbo.embedding_outbox "
+        "WHERE dispatched_ts IS NULL AND attempts < ?",
+        MAX_ATTEMPTS,
+    ).fetchone()
+    metrics.set_gauge("embedding_outbox_pending", pending)
+    metrics.set_gauge("embedding_outbox_lag_seconds", now - oldest if oldest else 0)
+
+
+def dispatch_once(connect) -> int:
+    """Drain every due row in batches; returns rows delivered. Stops at the first failed batch."""
+    delivered = 0
+    with connect() as conn:
+        while True:
+            rows = _claim(conn, time.time())
+            if not rows:
+                break
+            reviews = [
+                {"review_id": r.embedding_id, "hotel_id": r.hotel_id, "text": r.text,
+                 "metadata": json.loads(r.metadata or "{}")}
+                for r in rows
+            ]
+            try:
+                send_batch(reviews)
+            except Exception as e:
+                print(f"Embedding outbox batch of {len(rows)} failed: {e}")
+                _fail(conn, rows, str(e), time.time())
+                break
+            _acknowledge(conn, rows, time.time())
+            delivered += len(rows)
+        now = time.time()
+        conn.cursor().execute(
+            "DELETE FROM dbo.embedding_outbox WHERE dispatched_ts < ?", now - RETENTION_S
+        )
+        conn.commit()
+        _record_lag(conn, now)
+    return delivered
+
+
+# ------------------------------------------------------------------
+# Background dispatcher
+# ------------------------------------------------------------------
+_dispatch_wanted = threading.Event()
+_dispatch_lock = threading.Lock()
+_dispatch_thread: threading.Thread | None = None
+
+
+def _dispatch_loop(connect) -> None:
+    # Wakes on new rows, and every POLL_S for retries and other processes' rows
+    while True:
+        _dispatch_wanted.wait(POLL_S)
+        _dispatch_wanted.clear()
+        try:
+            delivered = dispatch_once(connect)
+            if delivered:
+                print(f"✓ Sent {delivered} reviews to the embedding service")
+        except Exception as e:
+            print(f"Embedding outbox dispatch failed: {e}")
+
+
+def schedule_dispatch(connect) -> None:
+    """Ask the dispatcher thread (started on first use) to drain the outbox."""
+    global _dispatch_thread
+    if not ENABLED:
+        return
+    with _dispatch_lock:
+        if _dispatch_thread is None:
+            _dispatch_thread = threading.Thread(
+                target=_dispatch_loop, args=(connect,), name="embedding-outbox", daemon=True
+            )
+            _dispatch_thread.start()
+    _dispatch_wanted.set()
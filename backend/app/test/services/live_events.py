@@ -0,0 +1,201 @@
+"""
+Live events for dashboards, pushed over GET /reviews/stream (Server-Sent
+Events): scrape progress and every processed review as soon as its
+ProcessedReviewWriter.commit() transaction commits.
+
+Publishers (the scraper and review processor, in any worker or process on
+the host) append to a small SQLite event log. Each API process runs one
+broker task that tails the log and fans new events out to in-memory
+subscriber queues, so an idle dashboard connection costs a queue and a
+sleeping coroutine, and the log is polled once per interval per process
+however many clients are connected. Event ids are log row ids, so a client
+that reconnects with Last-Event-ID is replayed what it missed.
+"""
+import asyncio
+import json
+import os
+import pathlib
+import sqlite3
+import time
+from contextlib import closing
+
+from app.test.services import metrics
+
+EVENTS_PATH = pathlib.Path(
+    os.getenv("LIVE_EVENTS_PATH", pathlib.Path(__file__).resolve().parent / "live_events.db")
+)
+POLL_INTERVAL_S = float(os.getenv("LIVE_EVENTS_POLL_S", "0.25"))
+HEARTBEAT_S = float(os.getenv("LIVE_EVENTS_HEARTBEAT_S", "15"))
+# Events kept for Last-Event-ID replay
+RETENTION = int(os.getenv("LIVE_EVENTS_RETENTION", "20000"))
+# A client this far behind is disconnected; EventSource reconnects and replays
+QUEUE_SIZE = int(os.getenv("LIVE_EVENTS_QUEUE_SIZE", "2000"))
+RETRY_MS = 3000
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event TEXT NOT NULL,
+        hotel_id INTEGER,
+        data TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    EVENTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(EVENTS_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+# ------------------------------------------------------------------
+# Publishing (sync; called from scrape and processing threads)
+# ------------------------------------------------------------------
+def publish_many(event: str, items: list[tuple[int | None, dict]]) -> None:
+    """
+    Append events of one type, given as (hotel_id, data) pairs, in one
+    transaction. Failures are logged and swallowed: live updates must never
+    break the pipeline.
+    """
+    if not items:
+        return
+    now = time.time()
+    try:
+        with closing(_connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO events (event, hotel_id, data, created_at) VALUES (?, ?, ?, ?)",
+                [(event, hotel_id, json.dumps(data, default=str, ensure_ascii=False), now)
+                 for hotel_id, data in items],
+            )
+            last_id = conn.execute("SELECT MAX(id) FROM events").fetchone()[0]
+            conn.execute("DELETE FROM events WHERE id <= ?", (last_id - RETENTION,))
+    except sqlite3.Error as e:
+        print(f"Live event publish failed: {e}")
+        return
+    metrics.inc("live_events_published_total", len(items))
+
+
+def publish(event: str, data: dict, hotel_id: int | None = None) -> None:
+    publish_many(event, [(hotel_id, data)])
+
+
+def read_since(last_id: int, limit: int = 1000) -> list[tuple]:
+    """(id, event, hotel_id, data) rows after last_id, oldest first."""
+    with closing(_connect()) as conn:
+        return conn.execute(
+            "SELECT id, event, hotel_id, data FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit),
+        ).fetchall()
+
+
+def latest_id() -> int:
+    with closing(_connect()) as conn:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+
+# ------------------------------------------------------------------
+# Fan-out (async; one broker per API process)
+# ------------------------------------------------------------------
+class Subscriber:
+    def __init__(self, hotel_id: int | None):
+        self.hotel_id = hotel_id
+        self.queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, hotel_id: int | None) -> bool:
+        # Events without a hotel (e.g. an early scrape page) go to everyone
+        return self.hotel_id is None or hotel_id is None or hotel_id == self.hotel_id
+
+    def offer(self, row: tuple) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            metrics.inc("live_events_dropped_clients_total")
+
+
+class Broker:
+    def __init__(self):
+        self._subscribers: set[Subscriber] = set()
+        self._task: asyncio.Task | None = None
+        self._last_id = 0
+
+    def subscribe(self, hotel_id: int | None = None) -> Subscriber:
+        subscriber = Subscriber(hotel_id)
+        self._subscribers.add(subscriber)
+        metrics.set_gauge("live_events_subscribers", len(self._subscribers), merge="sum")
+        if self._task is None or self._task.done():
+            self._last_id = latest_id()
+            self._task = asyncio.get_running_loop().create_task(self._tail())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        metrics.set_gauge("live_events_subscribers", len(self._subscribers), merge="sum")
+
+    async def _tail(self) -> None:
+        """Poll the log while anyone is listening; stop when the last client leaves."""
+        while self._subscribers:
+            try:
+                rows = await asyncio.to_thread(read_since, self._last_id)
+            except sqlite3.Error as e:
+                print(f"Live event tail failed: {e}")
+                rows = []
+            for row in rows:
+                for subscriber in list(self._subscribers):
+                    if subscriber.wants(row[2]):
+                        subscriber.offer(row)
+            if rows:
+                self._last_id = rows[-1][0]
+            if len(rows) < 1000:
+                await asyncio.sleep(POLL_INTERVAL_S)
+
+
+broker = Broker()
+
+
+def _format(row: tuple) -> str:
+    event_id, event, _, data = row
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+async def sse_stream(is_disconnected, hotel_id: int | None = None, last_event_id: str | None = None):
+    """
+    Server-Sent Events body: replays events after last_event_id (the
+    Last-Event-ID header of a reconnecting client), then streams live ones.
+    Sends a comment every HEARTBEAT_S so proxies keep idle connections open.
+    """
+    subscriber = broker.subscribe(hotel_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+
+        # Subscribed first, so nothing committed during the replay is lost;
+        # queued events the replay already covered are skipped below
+        sent_id = 0
+        if last_event_id and last_event_id.isdigit():
+            for row in await asyncio.to_thread(read_since, int(last_event_id), RETENTION):
+                if subscriber.wants(row[2]):
+                    yield _format(row)
+                sent_id = row[0]
+
+        while True:
+            try:
+                row = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if row[0] > sent_id:
+                yield _format(row)
+                sent_id = row[0]
+            if subscriber.overflowed and subscriber.queue.empty():
+                break
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,317 @@
+"""
+Lightweight in-process metrics: counters, gauges and latency histograms.
+
+Rendered in Prometheus text format by the /metrics endpoint and collected
+into per-job summaries. Set METRICS_ENABLED=0 to turn every call into a no-op.
+
+With METRICS_MULTIPROC_DIR set (gunicorn.conf.py does), every process also
+writes its metrics to a file there every METRICS_FLUSH_S seconds and at
+exit, and /metrics renders the sum over all of them: each gunicorn worker
+and the scrape runner. Counters and histograms of exited processes are
+folded into archive.json and kept; their gauges are dropped.
+
+This file is the source of truth; embedding-service/app/metrics.py is a copy
+(that image is built from its own directory) and differs only in PREFIX.
+"""
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import pathlib
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+PREFIX = "review_pipeline_"
+
+MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+FLUSH_S = float(os.getenv("METRICS_FLUSH_S", "5"))
+
+# Histogram buckets in seconds (Prometheus "le" bounds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, list] = {}  # name -> [value, time set, how processes combine]
+_histograms: dict[str, list] = {}  # name -> [bucket_counts..., count, sum]
+_NULL_TIMER = nullcontext()
+
+# The innermost job of the current thread or task; see job()
+_current_job: contextvars.ContextVar["JobSummary | None"] = contextvars.ContextVar("metrics_job", default=None)
+
+
+def inc(name: str, value: float = 1) -> None:
+    """Add to a counter."""
+    if not ENABLED:
+        return
+    summary = _current_job.get()
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+        if summary is not None:
+            summary.counters[name] = summary.counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float, merge: str = "last") -> None:
+    """
+    Set a gauge. Across processes (MULTIPROC_DIR) the value set last wins,
+    or with merge="sum" the live processes' values add up.
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        _gauges[name] = [value, time.time(), merge]
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record one duration in a histogram."""
+    if not ENABLED:
+        return
+    idx = bisect.bisect_left(BUCKETS, seconds)
+    summary = _current_job.get()
+    with _lock:
+        if summary is not None:
+            totals = summary.timers.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = [0] * (len(BUCKETS) + 2)
+        if idx < len(BUCKETS):
+            hist[idx] += 1
+        hist[-2] += 1
+        hist[-1] += seconds
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def timer(name: str):
+    """Context manager timing a block into the named histogram."""
+    return _Timer(name) if ENABLED else _NULL_TIMER
+
+
+def snapshot() -> dict:
+    """Copy of the current counters and histogram totals."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": {name: g[0] for name, g in _gauges.items()},
+            "timers": {name: (h[-2], h[-1]) for name, h in _histograms.items()},
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def render_prometheus() -> str:
+    """Prometheus text exposition format (version 0.0.4), over every process when MULTIPROC_DIR is set."""
+    state = _merged() if MULTIPROC_DIR else _own_state()
+    counters = sorted(state["counters"].items())
+    gauges = sorted((name, g[0]) for name, g in state["gauges"].items())
+    histograms = sorted(state["histograms"].items())
+
+    lines = []
+    for name, value in counters:
+        lines += [f"# TYPE {PREFIX}{name} counter", f"{PREFIX}{name} {value:g}"]
+    for name, value in gauges:
+        lines += [f"# TYPE {PREFIX}{name} gauge", f"{PREFIX}{name} {value:g}"]
+    for name, hist in histograms:
+        metric = f"{PREFIX}{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in zip(BUCKETS, hist):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {hist[-2]}')
+        lines.append(f"{metric}_count {hist[-2]}")
+        lines.append(f"{metric}_sum {hist[-1]:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------------------------------------------------
+# Several processes (METRICS_MULTIPROC_DIR)
+# ------------------------------------------------------------------
+_process_file: pathlib.Path | None = None
+_flusher: threading.Thread | None = None
+
+
+def _own_state() -> dict:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": {name: list(g) for name, g in _gauges.items()},
+            "histograms": {name: list(h) for name, h in _histograms.items()},
+        }
+
+
+def _add(into: dict, state: dict, gauges: bool = True) -> None:
+    for name, value in state["counters"].items():
+        into["counters"][name] = into["counters"].get(name, 0) + value
+    for name, hist in state["histograms"].items():
+        total = into["histograms"].setdefault(name, [0] * len(hist))
+        for i, value in enumerate(hist):
+            total[i] += value
+    if gauges:
+        for name, (value, ts, merge) in state["gauges"].items():
+            current = into["gauges"].get(name)
+            if current is None:
+                into["gauges"][name] = [value, ts, merge]
+            elif merge == "sum":
+                current[0] += value
+            elif ts >= current[1]:
+                into["gauges"][name] = [value, ts, merge]
+
+
+def _write_json(path: pathlib.Path, data: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def flush() -> None:
+    """Write this process's metrics to its file in MULTIPROC_DIR."""
+    if not (ENABLED and MULTIPROC_DIR and _process_file):
+        return
+    try:
+        _write_json(_process_file, {"pid": os.getpid(), **_own_state()})
+    except OSError as e:
+        print(f"Metrics flush failed: {e}")
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _merged() -> dict:
+    """Every process's metrics; files of exited processes are folded into archive.json."""
+    import fcntl  # POSIX only, like the gunicorn deployment that sets MULTIPROC_DIR
+
+    directory = pathlib.Path(MULTIPROC_DIR)
+    merged = {"counters": {}, "gauges": {}, "histograms": {}}
+    with open(directory / ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = directory / "archive.json"
+        try:
+            archive = json.loads(archive_path.read_text())
+        except (OSError, ValueError):
+            archive = {"counters": {}, "gauges": {}, "histograms": {}}
+        archived = False
+        for path in directory.glob("process-*.json"):
+            if path == _process_file:
+                continue  # Read live below
+            try:
+                state = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue  # Vanished or half written; read next time
+            if _alive(state["pid"]):
+                _add(merged, state)
+            else:
+                _add(archive, state, gauges=False)
+                path.unlink(missing_ok=True)
+                archived = True
+        if archived:
+            _write_json(archive_path, archive)
+    _add(merged, archive, gauges=False)
+    _add(merged, _own_state())
+    return merged
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(FLUSH_S)
+        flush()
+
+
+def _start_process() -> None:
+    """Own file and flusher thread of this process (again in a forked child)."""
+    global _process_file, _flusher
+    pathlib.Path(MULTIPROC_DIR).mkdir(parents=True, exist_ok=True)
+    _process_file = pathlib.Path(MULTIPROC_DIR) / f"process-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+    _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+    _flusher.start()
+
+
+def _after_fork() -> None:
+    # A forked worker starts from zero: the parent's counts are the parent's
+    global _lock
+    _lock = threading.Lock()
+    _counters.clear()
+    _gauges.clear()
+    _histograms.clear()
+    _start_process()
+
+
+if ENABLED and MULTIPROC_DIR:
+    _start_process()
+    os.register_at_fork(after_in_child=_after_fork)
+    atexit.register(flush)
+
+
+class JobSummary:
+    """
+    What was recorded inside one job. Counts belong to the innermost job of
+    the thread or task that recorded them, so concurrent jobs and a nested
+    job (review_processor inside scrape_booking) don't leak into each other.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.counters: dict[str, float] = {}
+        self.timers: dict[str, list] = {}  # name -> [count, sum]
+        self.result: dict = {}
+
+    def finish(self) -> dict:
+        self.result = {"job": self.name, "seconds": round(time.perf_counter() - self.started, 3)}
+        if not ENABLED:
+            return self.result
+
+        with _lock:
+            self.result["counters"] = dict(self.counters)
+            self.result["timers"] = {
+                name: {"count": n, "total_s": round(s, 4), "avg_ms": round(s / n * 1000, 2)}
+                for name, (n, s) in self.timers.items()
+            }
+        return self.result
+
+
+@contextmanager
+def job(name: str):
+    """
+    Collect a structured per-job summary and print it as one JSON line.
+    Work handed to other threads is counted only if it runs in a copy of
+    this context (contextvars.copy_context(), as BrowserPool.submit does).
+    """
+    summary = JobSummary(name)
+    token = _current_job.set(summary)
+    try:
+        yield summary
+    finally:
+        _current_job.reset(token)
+        summary.finish()
+        print(f"Job summary: {json.dumps(summary.result)}")
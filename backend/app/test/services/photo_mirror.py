@@ -0,0 +1,220 @@
+"""
+Local mirror of review photos with content-hash dedupe and thumbnails.
+
+dbo.review_photos keeps the remote Booking.com src; once a photo has been
+downloaded its sha256 is written to review_photos.content_hash and the
+bytes are served by GET /photos/{hash} instead of being hotlinked.
+
+    <PHOTO_STORE_DIR>/full/ab/<hash>.<ext>   original bytes
+    <PHOTO_STORE_DIR>/thumb/ab/<hash>.jpg    fixed-size JPEG thumbnail
+    <PHOTO_STORE_DIR>/.tmp/                  writes in progress, renamed into place
+
+Downloads share one httpx client whose connection pool is capped at
+PHOTO_MIRROR_CONNECTIONS. Identical images (the same photo behind several
+URLs, or re-scraped into a new dataset version) are stored once.
+Schema: database/query/add_photo_content_hash.sql.
+"""
+import hashlib
+import io
+import os
+import pathlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from app.test.services import metrics, read_cache
+
+STORE_DIR = pathlib.Path(
+    os.getenv("PHOTO_STORE_DIR", pathlib.Path(__file__).resolve().parent / "photo_store")
+)
+MAX_CONNECTIONS = int(os.getenv("PHOTO_MIRROR_CONNECTIONS", "8"))
+TIMEOUT_S = float(os.getenv("PHOTO_MIRROR_TIMEOUT_S", "15"))
+MAX_PHOTO_BYTES = int(float(os.getenv("PHOTO_MAX_MB", "15")) * 1024 * 1024)
+THUMB_SIZE = tuple(int(v) for v in os.getenv("PHOTO_THUMB_SIZE", "320x240").split("x"))
+THUMB_QUALITY = int(os.getenv("PHOTO_THUMB_QUALITY", "80"))
+# Resolves relative and protocol-relative srcs ("//cf.bstatic.com/...")
+BASE_URL = os.getenv("PHOTO_BASE_URL", "https://www.booking.com/")
+
+_HASH = re.compile(r"^[0-9a-f]{64}$")
+_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+MEDIA_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp", "gif": "image/gif"}
+
+
+def is_content_hash(value: str) -> bool:
+    return bool(_HASH.match(value))
+
+
+def photo_dict(src, alt, content_hash):
+    """Photo payload; mirrored photos also point at the local copy and thumbnail."""
+    return {
+        "src": src,
+        "alt": alt,
+        "localSrc": f"/photos/{content_hash}" if content_hash else None,
+        "thumbSrc": f"/photos/{content_hash}?size=thumb" if content_hash else None,
+    }
+
+
+def _shard(kind: str, content_hash: str) -> pathlib.Path:
+    return STORE_DIR / kind / content_hash[:2]
+
+
+def photo_path(content_hash: str, size: str = "full") -> pathlib.Path | None:
+    """File for a mirrored photo ("full" or "thumb"), or None if it isn't stored."""
+    if size == "thumb":
+        path = _shard("thumb", content_hash) / f"{content_hash}.jpg"
+        return path if path.is_file() else None
+    # Only image extensions: nothing else in the shard counts as a stored photo
+    for ext in MEDIA_TYPES:
+        path = _shard("full", content_hash) / f"{content_hash}.{ext}"
+        if path.is_file():
+            return path
+    return None
+
+
+def _write_atomic(path: pathlib.Path, data: bytes) -> None:
+    # Temp files live in their own directory (same filesystem, so the rename
+    # stays atomic), where photo_path() never looks
+    tmp_dir = STORE_DIR / ".tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tmp_dir / f"{path.name}.{os.getpid()}.{threading.get_ident()}"
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def store_photo(data: bytes) -> tuple[str, bool]:
+    """
+    Save image bytes and their thumbnail under the content hash.
+    Returns (hash, created); created is False when the image was already stored.
+    Raises ValueError for bytes Pillow can't decode.
+    """
+    from PIL import Image, ImageOps
+
+    content_hash = hashlib.sha256(data).hexdigest()
+    if photo_path(content_hash) is not None:
+        return content_hash, False
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            ext = _EXTENSIONS.get(img.format, "jpg")
+            thumb = ImageOps.fit(ImageOps.exif_transpose(img).convert("RGB"), THUMB_SIZE)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"not an image: {e}") from e
+
+    buffer = io.BytesIO()
+    thumb.save(buffer, "JPEG", quality=THUMB_QUALITY, optimize=True)
+    _write_atomic(_shard("thumb", content_hash) / f"{content_hash}.jpg", buffer.getvalue())
+    # Written last: photo_path() treats the original as "fully stored"
+    _write_atomic(_shard("full", content_hash) / f"{content_hash}.{ext}", data)
+    return content_hash, True
+
+
+def _download(client, url: str) -> bytes:
+    with client.stream("GET", url) as response:
+        response.raise_for_status()
+        chunks, size = [], 0
+        for chunk in response.iter_bytes():
+            size += len(chunk)
+            if size > MAX_PHOTO_BYTES:
+                raise ValueError(f"larger than {MAX_PHOTO_BYTES} bytes")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def mirror_photos(connect, version_id: int | None = None, base_url: str = BASE_URL) -> dict:
+    """
+    Download every photo without a content_hash (optionally of one dataset
+    version), store it and record the hash. Failed downloads stay NULL and
+    are retried on the next run.
+    """
+    # httpx and Pillow are only needed by the worker, not to serve /photos
+    import httpx
+
+    with connect() as conn:
+        cursor = conn.cursor()
+        sql = "SELECT DISTINCT src FROM dbo.review_photos WHERE content_hash IS NULL AND src IS NOT NULL"
+        params = []
+        if version_id is not None:
+            sql += " AND version_id = ?"
+            params.append(version_id)
+        srcs = [r[0] for r in cursor.execute(sql, *params).fetchall()]
+
+    stats = {"photos": len(srcs), "downloaded": 0, "deduplicated": 0, "failed": 0, "bytes": 0}
+    if not srcs:
+        return stats
+
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    hashes = []
+    with httpx.Client(limits=limits, timeout=TIMEOUT_S, follow_redirects=True) as client:
+
+        def fetch(src: str):
+            try:
+                with metrics.timer("photo_mirror_fetch"):
+                    data = _download(client, urljoin(base_url, src))
+                content_hash, created = store_photo(data)
+            except (httpx.HTTPError, OSError, ValueError) as e:
+                print(f"Photo mirror failed for {src}: {e}")
+                return src, None, False, 0
+            return src, content_hash, created, len(data)
+
+        with ThreadPoolExecutor(max_workers=MAX_CONNECTIONS, thread_name_prefix="photo-mirror") as executor:
+            for src, content_hash, created, size in executor.map(fetch, srcs):
+                if content_hash is None:
+                    stats["failed"] += 1
+                    continue
+                stats["downloaded"] += 1
+                stats["bytes"] += size
+                stats["deduplicated"] += not created
+                hashes.append((content_hash, src))
+
+    if hashes:
+        with connect() as conn:
+            conn.cursor().executemany(
+                "UPDATE dbo.review_photos SET content_hash = ? WHERE src = ? AND content_hash IS NULL", hashes
+            )
+            conn.commit()
+        # Cached /reviews bodies still lack the new localSrc / thumbSrc
+        read_cache.clear("reviews:")
+
+    metrics.inc("photo_mirror_downloads_total", stats["downloaded"])
+    metrics.inc("photo_mirror_dedup_total", stats["deduplicated"])
+    metrics.inc("photo_mirror_failures_total", stats["failed"])
+    metrics.inc("photo_mirror_bytes_total", stats["bytes"])
+    return stats
+
+
+# ------------------------------------------------------------------
+# Background worker
+# ------------------------------------------------------------------
+_mirror_wanted = threading.Event()
+_mirror_lock = threading.Lock()
+_mirror_thread: threading.Thread | None = None
+
+
+def _mirror_loop(connect) -> None:
+    while True:
+        _mirror_wanted.wait()
+        _mirror_wanted.clear()
+        try:
+            stats = mirror_photos(connect)
+            if stats["photos"]:
+                print(f"✓ Photo mirror: {stats}")
+        except Exception as e:
+            print(f"Photo mirror failed: {e}")
+
+
+def schedule_mirror(connect) -> None:
+    """Ask the mirror thread (started on first use) to fetch pending photos."""
+    global _mirror_thread
+    with _mirror_lock:
+        if _mirror_thread is None:
+            _mirror_thread = threading.Thread(
+                target=_mirror_loop, args=(connect,), name="photo-mirror", daemon=True
+            )
+            _mirror_thread.start()
+    _mirror_wanted.set()
@@ -0,0 +1,101 @@
+"""
+Reusable cached prefix for the review processor's static SYSTEM_PROMPT.
+
+The field-mapping rules are identical for every batch, so they are sent
+once as a Gemini explicit context cache and each request carries only the
+batch's review payload plus the cache name. Caches are found again by
+display name (a hash of model and prompt), so workers and restarts share
+one cache until it expires. When explicit caching is unavailable (prompt
+under the model's minimum, API version, quota) the prompt goes in
+system_instruction instead: still a stable prefix, which Gemini's implicit
+caching can hit.
+
+PROMPT_CACHE_MODE: "explicit" (default) or "implicit" (system_instruction only).
+"""
+import hashlib
+import os
+import threading
+import time
+
+from app.test.services import metrics
+
+MODE = os.getenv("PROMPT_CACHE_MODE", "explicit")
+TTL_S = int(os.getenv("PROMPT_CACHE_TTL_S", "3600"))
+# Refresh a cache this long before it expires rather than race the expiry
+_RENEW_MARGIN_S = 60
+
+
+class PromptCache:
+    """Explicit context cache for one (model, system prompt) pair, created on first use."""
+
+    def __init__(self, model: str, system_prompt: str, mode: str = MODE, ttl_s: int = TTL_S):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.mode = mode
+        self.ttl_s = ttl_s
+        digest = hashlib.sha256(f"{model}\n{system_prompt}".encode("utf-8")).hexdigest()[:16]
+        self.display_name = f"review-processor-{digest}"
+        self._name: str | None = None
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def generate_config(self, client) -> dict:
+        """Config for generate_content: the cached prefix, or the prompt as system_instruction."""
+        name = self._cache_name(client) if self.mode == "explicit" else None
+        if name:
+            return {"cached_content": name}
+        return {"system_instruction": self.system_prompt}
+
+    def invalidate(self) -> None:
+        """Forget the cache (e.g. the API reported it gone); the next call recreates it."""
+        with self._lock:
+            self._name = None
+            self._expires_at = 0.0
+
+    def _cache_name(self, client) -> str | None:
+        now = time.time()
+        with self._lock:
+            if self._name and now < self._expires_at - _RENEW_MARGIN_S:
+                return self._name
+            if now < self._retry_at:
+                return None
+            try:
+                self._name, self._expires_at = self._find(client, now) or self._create(client, now)
+            except Exception as e:
+                # Don't retry on every batch; fall back to the implicit prefix meanwhile
+                print(f"Prompt cache unavailable, using system_instruction: {e}")
+                metrics.inc("llm_prompt_cache_errors_total")
+                self._name, self._retry_at = None, now + self.ttl_s
+            return self._name
+
+    def _find(self, client, now: float) -> tuple[str, float] | None:
+        """A live cache another worker (or an earlier run) created for the same prompt."""
+        for cache in client.caches.list():
+            if getattr(cache, "display_name", None) != self.display_name:
+                continue
+            expires_at = _timestamp(getattr(cache, "expire_time", None))
+            if expires_at and expires_at - _RENEW_MARGIN_S > now:
+                return cache.name, expires_at
+        return None
+
+    def _create(self, client, now: float) -> tuple[str, float]:
+        with metrics.timer("llm_prompt_cache_create"):
+            cache = client.caches.create(
+                model=self.model,
+                config={
+                    "display_name": self.display_name,
+                    "system_instruction": self.system_prompt,
+                    "ttl": f"{self.ttl_s}s",
+                },
+            )
+        print(f"✓ Created prompt cache {cache.name} (ttl {self.ttl_s}s)")
+        return cache.name, _timestamp(getattr(cache, "expire_time", None)) or now + self.ttl_s
+
+
+def _timestamp(value) -> float | None:
+    if value is None:
+        return None
+    if hasattr(value, "timestamp"):
+        return value.timestamp()
+    return float(value)
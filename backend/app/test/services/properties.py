@@ -0,0 +1,77 @@
+"""
+Property (hotel) dimension shared by the raw and processed review tables.
+
+Every row in dbo.reviews, dbo.review_photos and dbo.ProcessedReviews carries
+the hotel_id of the dbo.properties row it was scraped from. Scrapes,
+deletes and reprocessing are scoped to one hotel_id, so scraping hotel B
+never touches hotel A's rows (see datasets.py for versions within a hotel). Schema: database/query/add_property_partitioning.sql.
+"""
+from urllib.parse import urlsplit, urlunsplit
+
+
+def normalize_booking_url(url: str) -> str:
+    """
+    Canonical key for a property page: scheme and host lower-cased, query
+    string and fragment (dates, tracking ids) dropped.
+    """
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+def find_property(cursor, booking_url: str) -> int | None:
+    """hotel_id of the property for this Booking URL, or None if it was never scraped."""
+    row = cursor.execute(
+        "SELECT hotel_id FROM dbo.properties WHERE booking_url = ?", normalize_booking_url(booking_url)
+    ).fetchone()
+    return int(row[0]) if row else None
+
+
+def get_or_create_property(cursor, booking_url: str) -> int:
+    """hotel_id of the property for this Booking URL, inserting it on first sight."""
+    key = normalize_booking_url(booking_url)
+    row = cursor.execute(
+        "SELECT hotel_id FROM dbo.properties WHERE booking_url = ?", key
+    ).fetchone()
+    if row is None:
+        cursor.execute("INSERT INTO dbo.properties (booking_url) VALUES (?)", key)
+        row = cursor.execute(
+            "SELECT hotel_id FROM dbo.properties WHERE booking_url = ?", key
+        ).fetchone()
+    return int(row[0])
+
+
+def list_properties(cursor) -> list[dict]:
+    rows = cursor.execute(
+        "SELECT hotel_id, booking_url, name, last_scraped_at, active_version "
+        "FROM dbo.properties ORDER BY hotel_id"
+    ).fetchall()
+    return [
+        {
+            "hotel_id": r.hotel_id,
+            "booking_url": r.booking_url,
+            "name": r.name,
+            "last_scraped_at": r.last_scraped_at,
+            "active_version": r.active_version,
+        }
+        for r in rows
+    ]
+
+
+def property_exists(cursor, hotel_id: int) -> bool:
+    """Whether the property row exists, with or without an active dataset version."""
+    return cursor.execute(
+        "SELECT 1 FROM dbo.properties WHERE hotel_id = ?", hotel_id
+    ).fetchone() is not None
+
+
+def list_hotel_ids(cursor) -> list[int]:
+    """Hotels that currently have an active dataset version."""
+    return [r[0] for r in cursor.execute(
+        "SELECT hotel_id FROM dbo.properties WHERE active_version IS NOT NULL ORDER BY hotel_id"
+    ).fetchall()]
+
+
+def mark_scraped(cursor, hotel_id: int) -> None:
+    cursor.execute(
+        "UPDATE dbo.properties SET last_scraped_at = CURRENT_TIMESTAMP WHERE hotel_id = ?", hotel_id
+    )
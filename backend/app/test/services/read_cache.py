@@ -0,0 +1,84 @@
+"""
+Cross-process read cache for the API: a local SQLite file shared by every
+worker on the host, so N workers don't each rebuild the same /reviews
+payload from SQL Server.
+
+Entries hold encoded response bodies. Callers key them by the active
+dataset versions (see datasets.active_versions), so a new or retired
+version is a different key and is never served stale; the TTL bounds
+everything else (e.g. photos mirrored into the live version). Set
+READ_CACHE_TTL_S=0 to disable the cache.
+"""
+import os
+import pathlib
+import sqlite3
+import time
+from contextlib import closing
+
+from app.test.services import metrics
+
+CACHE_PATH = pathlib.Path(
+    os.getenv("READ_CACHE_PATH", pathlib.Path(__file__).resolve().parent / "read_cache.db")
+)
+TTL_S = float(os.getenv("READ_CACHE_TTL_S", "30"))
+ENABLED = TTL_S > 0
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS read_cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires_at REAL NOT NULL
+    )
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    # A connection per call: safe across threads and across the worker fork
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def get(key: str) -> bytes | None:
+    """The cached value, or None when missing, expired or the cache is off."""
+    if not ENABLED:
+        return None
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT value FROM read_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+    metrics.inc("read_cache_hits_total" if row else "read_cache_misses_total")
+    return row[0] if row else None
+
+
+def put(key: str, value: bytes, ttl_s: float = TTL_S) -> None:
+    """Store a value for ttl_s seconds and drop entries that have expired."""
+    if not ENABLED:
+        return
+    now = time.time()
+    with closing(_connect()) as conn, conn:
+        conn.execute("DELETE FROM read_cache WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "INSERT OR REPLACE INTO read_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl_s),
+        )
+
+
+def get_or_build(key: str, build) -> bytes:
+    """Serve key from the cache, or call build() and cache what it returns."""
+    value = get(key)
+    if value is None:
+        value = build()
+        put(key, value)
+    return value
+
+
+def clear(prefix: str = "") -> None:
+    """Drop every entry (or those whose key starts with prefix), in all workers."""
+    if not ENABLED:
+        return
+    with closing(_connect()) as conn, conn:
+        conn.execute("DELETE FROM read_cache WHERE key LIKE ? || '%'", (prefix,))
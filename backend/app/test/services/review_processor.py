@@ -3,18 +3,26 @@ import json
 import pathlib
 import re
 import os
-from dataclasses import dataclass, asdict
-from typing import List, Optional
+import sys
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
 from datetime import date, datetime
 
 # 3rd Party Imports
 import pyodbc
 from pydantic import BaseModel
-from google import genai
 from dotenv import load_dotenv
 
 load_dotenv()  # take environment variables from .env file
 
+# Make 'app' importable when this file is run directly (services -> test -> app -> backend)
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[3]))
+
+from app.test.services import datasets, embedding_outbox, live_events, metrics, properties, search_index, snapshot
+from app.test.services.prompt_cache import PromptCache
+from app.test.services.review_rows import REVIEWS_WITH_PHOTOS_SQL, fold_photo_rows, serialize_review_row
+
 # ------------------------------------------------------------------
 # 1. Configuration & Setup
 # ------------------------------------------------------------------
@@ -28,18 +36,29 @@ CONN_STR = (
 )
 
 GENAI_KEY = os.getenv("GENAI_KEY")
-client = genai.Client(api_key=GENAI_KEY, http_options={"api_version": "v1"})
+# Built by get_client() on the first LLM call; tests may assign a stand-in
+client = None
+
+
+def get_client():
+    """The Gemini client, created (and google.genai imported) on first use."""
+    global client
+    if client is None:
+        from google import genai
+
+        client = genai.Client(api_key=GENAI_KEY, http_options={"api_version": "v1"})
+    return client
 
 
 # 2. Data Models (DTOs)
 # ------------------------------------------------------------------
-@dataclass
+@dataclass(slots=True)
 class Picture:
     src: str
     alt: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Review:
     """Represents a RAW review from the old tables."""
 
@@ -78,113 +97,329 @@ class ProcessedReview(BaseModel):
 # ------------------------------------------------------------------
 
 
-def fetch_reviews() -> List[Review]:
+# Reviews per keyset page read from the raw tables, and per LLM request
+FETCH_PAGE_SIZE = int(os.getenv("FETCH_PAGE_SIZE", "1000"))
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "100"))
+
+RAW_REVIEWS_WITH_PHOTOS_SQL = """
+    SELECT
+        r.review_id, r.title, r.score, r.positive_txt, r.negative_txt,
+        r.posted_date, r.reviewer_stay_date, r.num_of_nights, r.traveler_type,
+        r.room_name, r.raw_review, ph.src AS photo_src, ph.alt AS photo_alt
+    FROM dbo.reviews r
+    LEFT JOIN dbo.review_photos ph
+        ON ph.version_id = r.version_id AND ph.review_id = r.review_id
+    {where}
+    ORDER BY r.review_id
+"""
+
+
+def _review(row) -> Review:
+    return Review(
+        review_id=row.review_id,
+        title=row.title or "",
+        score=float(row.score or 0),
+        positive_txt=row.positive_txt or "",
+        negative_txt=row.negative_txt or "",
+        posted_date=row.posted_date.isoformat() if row.posted_date else None,
+        reviewer_stay_date=(
+            row.reviewer_stay_date.isoformat() if row.reviewer_stay_date else None
+        ),
+        num_of_nights=row.num_of_nights or 0,
+        traveler_type=row.traveler_type or "",
+        room_name=row.room_name or "",
+        raw_review=row.raw_review or "",
+        photo=[],
+    )
+
+
+def _fetch_page(version_id: int, after: int | None, page_size: int, review_ids: set[int] | None):
     """
-    Fetches RAW reviews + photos from the source tables.
-    Used by main() to get data for the AI.
+    One keyset page of a version: (reviews, last review_id read, exhausted).
+    Rows arrive ordered by review_id, so a review's photo rows are adjacent
+    and are merged as they stream past. The connection is closed before the
+    caller sees the page, so nothing stays open while a batch is with the LLM.
     """
-    with pyodbc.connect(CONN_STR) as conn:
-        cur = conn.cursor()
-
-        # 1. Fetch Reviews
-        rows = cur.execute(
-            "SELECT review_id, title, score, positive_txt, negative_txt, "
-            "posted_date, reviewer_stay_date, num_of_nights, traveler_type, "
-            "room_name, raw_review FROM reviews"
-        ).fetchall()
-
-        # 2. Fetch Photos
-        pics = cur.execute("SELECT review_id, src, alt FROM review_photos").fetchall()
-
-        # Map photos to review_ids
-        photo_map: dict[int, List[Picture]] = {}
-        for rev_id, src, alt in pics:
-            photo_map.setdefault(rev_id, []).append(
-                Picture(src=src or "", alt=alt or "")
-            )
+    where, params = "WHERE r.version_id = ?", [version_id]
+    if after is not None:
+        where += " AND r.review_id > ?"
+        params.append(after)
+    page, last_id, current, seen = [], None, None, 0
+    conn = pyodbc.connect(CONN_STR)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(RAW_REVIEWS_WITH_PHOTOS_SQL.format(where=where), *params)
+        while True:
+            with metrics.timer("db_fetch_raw_batch"):
+                rows = cursor.fetchmany(page_size)
+            if not rows:
+                break
+            for row in rows:
+                if row.review_id != last_id:
+                    if last_id is not None:
+                        if current is not None:
+                            page.append(current)
+                        seen += 1
+                        if seen >= page_size:
+                            # This review starts the next page
+                            return page, last_id, False
+                    last_id = row.review_id
+                    skip = review_ids is not None and row.review_id not in review_ids
+                    current = None if skip else _review(row)
+                if current is not None and row.photo_src is not None:
+                    current.photo.append(Picture(src=row.photo_src, alt=row.photo_alt or ""))
+        if current is not None:
+            page.append(current)
+        return page, last_id, True
+    finally:
+        conn.close()
+
+
+def iter_reviews(
+    hotel_id: int | None = None, version_id: int | None = None, review_ids: set[int] | None = None,
+    page_size: int = FETCH_PAGE_SIZE,
+) -> Iterator[Review]:
+    """
+    Streams RAW reviews + photos: one dataset version, or the active version
+    of one hotel (or of every hotel), optionally only the given review_ids.
+    Each version is read in keyset pages of page_size reviews (a range seek
+    on (version_id, review_id)), so memory stays at one page whatever the
+    dataset size.
+    """
+    if version_id is not None:
+        versions = (version_id,)
+    else:
+        with pyodbc.connect(CONN_STR) as conn:
+            versions = datasets.active_versions(conn.cursor(), hotel_id)
+    for version in versions:
+        after, exhausted = None, False
+        while not exhausted:
+            page, after, exhausted = _fetch_page(version, after, page_size, review_ids)
+            yield from page
+
+
+def fetch_reviews(
+    hotel_id: int | None = None, version_id: int | None = None, review_ids: set[int] | None = None
+) -> List[Review]:
+    """All of iter_reviews() as a list; prefer iter_reviews() for large datasets."""
+    return list(iter_reviews(hotel_id, version_id, review_ids))
+
+
+def batched(items, size: int):
+    """Lists of up to size items from any iterable, pulled lazily."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def review_payload(r: Review) -> dict:
+    """A review as the LLM sees it (the asdict() shape, without its deep copy)."""
+    return {
+        "review_id": r.review_id,
+        "title": r.title,
+        "score": r.score,
+        "positive_txt": r.positive_txt,
+        "negative_txt": r.negative_txt,
+        "posted_date": r.posted_date,
+        "reviewer_stay_date": r.reviewer_stay_date,
+        "num_of_nights": r.num_of_nights,
+        "traveler_type": r.traveler_type,
+        "room_name": r.room_name,
+        "raw_review": r.raw_review,
+        "photo": [{"src": p.src, "alt": p.alt} for p in r.photo],
+    }
+
+
+# Helpers: Safe date parsing
+def parse_ts(ts_str):
+    try:
+        return datetime.strptime(ts_str, "%B %d, %Y at %I:%M %p")
+    except (ValueError, TypeError):
+        return None
 
-        # 3. Build Review Objects
-        reviews = []
-        for r in rows:
-            rev = Review(
-                review_id=r.review_id,
-                title=r.title or "",
-                score=float(r.score or 0),
-                positive_txt=r.positive_txt or "",
-                negative_txt=r.negative_txt or "",
-                posted_date=r.posted_date.isoformat() if r.posted_date else None,
-                reviewer_stay_date=(
-                    r.reviewer_stay_date.isoformat() if r.reviewer_stay_date else None
-                ),
-                num_of_nights=r.num_of_nights or 0,
-                traveler_type=r.traveler_type or "",
-                room_name=r.room_name or "",
-                raw_review=r.raw_review or "",
-                photo=photo_map.get(r.review_id, []),
-            )
-            reviews.append(rev)
-    return reviews
+
+def parse_date(date_str):
+    try:
+        return datetime.strptime(date_str, "%b %d, %Y").date()
+    except (ValueError, TypeError):
+        return None
 
 
-def insert_processed_reviews(conn: pyodbc.Connection, rows: list[dict]) -> None:
-    """
-    Inserts processed reviews into the ProcessedReviews SQL table.
+def raw_review_id(platform_review_id) -> int | None:
+    """The raw review a processed row came from ("BK-101" -> 101)."""
+    suffix = (platform_review_id or "").rsplit("-", 1)[-1]
+    return int(suffix) if suffix.isdigit() else None
+
+
+_INSERT_PROCESSED_SQL = """
+    INSERT INTO dbo.ProcessedReviews (
+        hotel_id, version_id, review_id, id, platformReviewId, source, rating, userName, reviewerName, 
+        reviewText, [text], summary, sentiment, language, categories, 
+        keyPhrases, reviewDate, firstSeen, lastUpdated, scrapedAt, 
+        [status], replyStatus, hasReply
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# Raw review ids checked per query when linking processed rows to dbo.reviews
+_LINK_CHUNK = 500
+
+
+class ProcessedReviewWriter:
     """
-    sql = """
-        INSERT INTO dbo.ProcessedReviews (
-            id, platformReviewId, source, rating, userName, reviewerName, 
-            reviewText, [text], summary, sentiment, language, categories, 
-            keyPhrases, reviewDate, firstSeen, lastUpdated, scrapedAt, 
-            [status], replyStatus, hasReply
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    Writes one dataset version's processed rows batch by batch, so only the
+    batch in hand is in memory. write() adds rows (and their outbox rows) on
+    the caller's connection without committing; commit() activates the
+    version in the same commit, then publishes the committed rows to the
+    live events and the search index, streamed back from the database.
     """
 
-    cur = conn.cursor()
+    def __init__(self, conn: pyodbc.Connection, hotel_id: int | None = None, version_id: int | None = None,
+                 append: bool = False):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.hotel_id = hotel_id
+        self.version_id = version_id
+        self.append = append
+        self.rows_written = 0
+        self.queued = 0
+        # Appends publish only their own rows; a replaced version publishes all of its rows
+        self._appended_ids: set[str] | None = set() if append else None
+        if hotel_id is not None and version_id is None:
+            self.version_id = datasets.active_version(self.cur, hotel_id)
+        if self.version_id is not None and not append:
+            self.cur.execute("DELETE FROM dbo.ProcessedReviews WHERE version_id = ?", self.version_id)
+
+    def _linked_ids(self, rows: list[dict]) -> set[int] | None:
+        """The rows' raw review ids that exist in the version; None without a version."""
+        if self.version_id is None:
+            return None
+        wanted = sorted({i for i in (raw_review_id(r.get("platformReviewId")) for r in rows) if i is not None})
+        found = set()
+        for start in range(0, len(wanted), _LINK_CHUNK):
+            chunk = wanted[start:start + _LINK_CHUNK]
+            found.update(r[0] for r in self.cur.execute(
+                f"SELECT review_id FROM dbo.reviews WHERE version_id = ? AND review_id IN ({', '.join('?' * len(chunk))})",
+                self.version_id, *chunk,
+            ).fetchall())
+        return found
+
+    def write(self, rows: list[dict]) -> None:
+        # review_id references dbo.reviews; an id the LLM made up is stored as NULL
+        raw_ids = self._linked_ids(rows)
+        for r in rows:
+            # Convert lists to JSON strings for SQL storage
+            categories_json = json.dumps(r.get("categories", []), ensure_ascii=False)
+            key_phrases_json = json.dumps(r.get("keyPhrases", []), ensure_ascii=False)
+            review_id = raw_review_id(r.get("platformReviewId"))
+            if raw_ids is not None and review_id not in raw_ids:
+                review_id = None
+
+            self.cur.execute(
+                _INSERT_PROCESSED_SQL,
+                self.hotel_id,
+                self.version_id,
+                review_id,
+                r["id"],
+                r.get("platformReviewId", ""),
+                r.get("source", "Booking.com"),
+                r["rating"],
+                r.get("userName", ""),
+                r.get("reviewerName", ""),
+                r.get("reviewText", ""),
+                r.get("text", ""),
+                r.get("summary", ""),
+                r.get("sentiment", "Neutral"),
+                r.get("language", "English"),
+                categories_json,
+                key_phrases_json,
+                parse_date(r.get("date")),
+                parse_ts(r.get("firstSeen")),
+                parse_ts(r.get("lastUpdated")),
+                parse_ts(r.get("scrapedAt")),
+                r.get("status", "Pending"),
+                r.get("replyStatus", "Pending"),
+                r.get("hasReply", "No"),
+            )
+            if self._appended_ids is not None:
+                self._appended_ids.add(str(r["id"]))
+        # Outbox rows for the embedding service commit with the reviews themselves
+        self.queued += embedding_outbox.enqueue(self.cur, rows, self.hotel_id, self.version_id)
+        self.rows_written += len(rows)
+
+    def commit(self) -> None:
+        hotel_id, version_id = self.hotel_id, self.version_id
+        retired = False
+        if hotel_id is not None and version_id is not None:
+            retired = datasets.activate_version(self.cur, hotel_id, version_id)
+        self.conn.commit()
+        print(f"✓ Saved {self.rows_written} processed reviews to SQL table.")
+        if self.queued:
+            embedding_outbox.schedule_dispatch(lambda: pyodbc.connect(CONN_STR))
+        try:
+            publish_processed(self.cur, hotel_id, version_id, self._appended_ids)
+        except Exception as e:
+            print(f"Publishing the committed reviews failed: {e}")
+        if retired:
+            print(f"✓ Dataset version {version_id} is now live for hotel {hotel_id}")
+            datasets.schedule_purge(lambda: pyodbc.connect(CONN_STR))
+
+
+def insert_processed_reviews(
+    conn: pyodbc.Connection, rows: list[dict], hotel_id: int | None = None, version_id: int | None = None,
+    append: bool = False,
+) -> None:
+    """
+    Inserts processed reviews into the ProcessedReviews SQL table for one
+    dataset version (default: the hotel's active one) and makes that version
+    active. Replaced rows, the insert and the pointer switch share one commit.
+    With append, the version's existing rows (carried over by an incremental
+    scrape) are kept and rows are only added. Rows are queued for the
+    embedding service in the same commit (see embedding_outbox).
+    """
+    writer = ProcessedReviewWriter(conn, hotel_id, version_id, append)
+    writer.write(rows)
+    writer.commit()
 
-    for r in rows:
-        # Helper: Safe date parsing
-        def parse_ts(ts_str):
-            try:
-                return datetime.strptime(ts_str, "%B %d, %Y at %I:%M %p")
-            except (ValueError, TypeError):
-                return None
 
-        def parse_date(date_str):
+def publish_processed(cur, hotel_id: int | None, version_id: int | None, ids: set[str] | None = None) -> None:
+    """
+    Push a committed version's rows (or only ids) to GET /reviews/stream
+    listeners and the full-text search index. The rows are read back page
+    by page and serialized exactly as GET /reviews does (review_rows).
+    """
+    if version_id is None:
+        cur.execute(REVIEWS_WITH_PHOTOS_SQL.format(where="WHERE p.version_id IS NULL"))
+    else:
+        cur.execute(REVIEWS_WITH_PHOTOS_SQL.format(where="WHERE p.version_id = ?"), version_id)
+    # Keep the full-text search sidecar in sync with the committed rows
+    search_ok = True
+    try:
+        if hotel_id is not None and ids is None:
+            search_index.clear_index(hotel_id)
+    except Exception as e:
+        print(f"Search index update failed: {e}")
+        search_ok = False
+    committed = (
+        serialize_review_row(row, photos)
+        for row, photos in fold_photo_rows(cur, FETCH_PAGE_SIZE)
+        if ids is None or str(row.id) in ids
+    )
+    for reviews in batched(committed, FETCH_PAGE_SIZE):
+        try:
+            live_events.publish_many("review", [(hotel_id, r) for r in reviews])
+        except Exception as e:
+            print(f"Live review events failed: {e}")
+        if search_ok:
             try:
-                return datetime.strptime(date_str, "%b %d, %Y").date()
-            except (ValueError, TypeError):
-                return None
-
-        # Convert lists to JSON strings for SQL storage
-        categories_json = json.dumps(r.get("categories", []), ensure_ascii=False)
-        key_phrases_json = json.dumps(r.get("keyPhrases", []), ensure_ascii=False)
-
-        cur.execute(
-            sql,
-            r["id"],
-            r.get("platformReviewId", ""),
-            r.get("source", "Booking.com"),
-            r["rating"],
-            r.get("userName", ""),
-            r.get("reviewerName", ""),
-            r.get("reviewText", ""),
-            r.get("text", ""),
-            r.get("summary", ""),
-            r.get("sentiment", "Neutral"),
-            r.get("language", "English"),
-            categories_json,
-            key_phrases_json,
-            parse_date(r.get("date")),
-            parse_ts(r.get("firstSeen")),
-            parse_ts(r.get("lastUpdated")),
-            parse_ts(r.get("scrapedAt")),
-            r.get("status", "Pending"),
-            r.get("replyStatus", "Pending"),
-            r.get("hasReply", "No"),
-        )
-    conn.commit()
-    print(f"✓ Saved {len(rows)} processed reviews to SQL table.")
+                search_index.index_reviews(reviews, hotel_id)
+            except Exception as e:
+                print(f"Search index update failed: {e}")
+                search_ok = False
 
 
 # ------------------------------------------------------------------
@@ -198,9 +433,7 @@ def strip_markdown_fences(text: str) -> str:
 
 SYSTEM_PROMPT = """Role: You are an Advanced Review Data Processor and Sentiment Analyst for a generic Hotel Reputation Management SaaS.
 
-Task: Analyze the provided raw review JSON data and transform it into a strictly formatted, enriched JSON array for our database.
-
-Input Data: {hotel_data}
+Task: Analyze the raw review JSON data given after these instructions as `Input Data` and transform it into a strictly formatted, enriched JSON array for our database.
 
 ---
 
@@ -238,7 +471,7 @@ For each review object in the input, generate an output object using these speci
 Return ONLY a valid JSON array. Do not include markdown formatting (```json) or introductory text.
 
 [
-  {{
+  {
     "id": "REV-001",
     "rating": 3,
     "userName": "AAppley",
@@ -259,72 +492,199 @@ Return ONLY a valid JSON array. Do not include markdown formatting (```json) or
     "lastUpdated": "July 11, 2023 at 09:00 AM",
     "scrapedAt": "July 11, 2023 at 08:00 PM",
     "hasReply": "No"
-  }}
+  }
 ]
 """
 # Note: Ensure the prompt string above is the FULL text we designed earlier.
 
+# SYSTEM_PROMPT is static and goes first (as a cached prefix); only this varies per batch
+BATCH_PROMPT = "Input Data: {hotel_data}\n"
+
+MODEL = "gemini-2.5-flash-lite"
+prompt_cache = PromptCache(MODEL, SYSTEM_PROMPT)
+
 
 # ------------------------------------------------------------------
 # 5. Main Execution
 # ------------------------------------------------------------------
-def main() -> None:
-    # 1. Get Raw Data
-    print("Fetching raw reviews from DB...")
-    reviews = fetch_reviews()
-    if not reviews:
-        print("No reviews found in DB – aborting.")
+def _record_token_usage(response, first_token_s: float | None = None) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
         return
-    print(f"Fetched {len(reviews)} raw reviews.")
-    
-        
-    # 2. Prepare Prompt
-    # We only send a sample if you have too many, or handle pagination logic here.
-    # For now, we process all of them (watch out for Token limits!).
-    hotel_data = json.dumps([asdict(r) for r in reviews], ensure_ascii=False)
-
-    # IMPORTANT: Ensure your SYSTEM_PROMPT contains the literal text provided previously
-    prompt = SYSTEM_PROMPT.format(hotel_data=hotel_data)
-    # try:
-    #     with open("promt.txt", 'w') as file:
-    #         file.write((prompt))
-    # except IOError as e:
-    #     print(f"Error writing prompt to file: {e}")
-
-    # 3. Call Gemini
-    print("Sending data to Gemini for analysis...")
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+    metrics.inc("llm_prompt_tokens_total", prompt_tokens)
+    metrics.inc("llm_output_tokens_total", getattr(usage, "candidates_token_count", 0) or 0)
+    # Prompt tokens served from the cached SYSTEM_PROMPT prefix (billed at the cached rate)
+    metrics.inc("llm_cached_prompt_tokens_total", cached_tokens)
+    metrics.inc("llm_prefix_cache_hits_total" if cached_tokens else "llm_prefix_cache_misses_total")
+    share = f" ({cached_tokens / prompt_tokens:.0%})" if prompt_tokens else ""
+    ttft = f", first token after {first_token_s:.2f}s" if first_token_s is not None else ""
+    print(f"LLM batch: {prompt_tokens} prompt tokens, {cached_tokens} from cached prefix{share}{ttft}")
+
+
+def generate(contents: str) -> tuple[str, object, float]:
+    """
+    Stream one batch through Gemini behind the cached SYSTEM_PROMPT prefix.
+    Returns (text, final chunk with usage_metadata, seconds to first token).
+    A cache that expired or was deleted server-side is dropped and the call
+    retried once with the prefix sent inline.
+    """
+    client = get_client()
+    config = prompt_cache.generate_config(client)
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite", contents=prompt
-        )
+        return _generate_stream(client, contents, config)
     except Exception as e:
+        if "cached_content" not in config:
+            raise
+        print(f"Cached prompt prefix rejected ({e}); retrying without it")
+        prompt_cache.invalidate()
+        return _generate_stream(client, contents, {"system_instruction": SYSTEM_PROMPT})
+
+
+def _generate_stream(client, contents: str, config: dict) -> tuple[str, object, float]:
+    start = time.perf_counter()
+    first_token_s, parts, last = None, [], None
+    for chunk in client.models.generate_content_stream(model=MODEL, contents=contents, config=config):
+        if first_token_s is None:
+            first_token_s = time.perf_counter() - start
+            metrics.observe("llm_first_token", first_token_s)
+        parts.append(chunk.text or "")
+        last = chunk
+    return "".join(parts), last, first_token_s
+
+
+def main(hotel_id: int | None = None, version_id: int | None = None, review_ids: set[int] | None = None) -> int:
+    """
+    Process one dataset version (a fresh scrape), one hotel's active version,
+    or every hotel's active version in turn. Returns the rows committed.
+    With review_ids (an incremental scrape) only those raw reviews are sent to
+    the LLM and appended to the version's carried-over processed rows.
+    """
+    with metrics.job("review_processor"):
+        if hotel_id is not None:
+            return _process_reviews(hotel_id, version_id, review_ids)
+        with pyodbc.connect(CONN_STR) as conn:
+            hotel_ids = properties.list_hotel_ids(conn.cursor())
+        return sum(_process_reviews(hid) for hid in hotel_ids)
+
+
+def _analyze_batch(reviews: List[Review]) -> list[dict] | None:
+    """One LLM request for a batch of raw reviews; None if it failed."""
+    hotel_data = json.dumps([review_payload(r) for r in reviews], ensure_ascii=False)
+
+    # Only the review payload varies; the instructions are the cached prefix
+    prompt = BATCH_PROMPT.format(hotel_data=hotel_data)
+
+    print(f"Sending {len(reviews)} reviews to Gemini for analysis...")
+    try:
+        with metrics.timer("llm_generate"):
+            response_text, response, first_token_s = generate(prompt)
+    except Exception as e:
+        metrics.inc("llm_errors_total")
         print(f"Error calling Gemini: {e}")
-        return
+        return None
+    metrics.inc("llm_calls_total")
+    _record_token_usage(response, first_token_s)
 
-    # 4. Parse Response
-    response_text = response.text
     clean_json_text = strip_markdown_fences(response_text)
-
     try:
-        cleaned_rows = json.loads(clean_json_text)
-        if not isinstance(cleaned_rows, list):
+        with metrics.timer("llm_json_parse"):
+            rows = json.loads(clean_json_text)
+        if not isinstance(rows, list):
             raise ValueError("Response is not a JSON array")
     except json.JSONDecodeError as e:
         print(f"Failed to parse JSON: {e}")
         print("Raw response:", clean_json_text)
-        return
+        return None
+    return rows
 
-    print("--- Analysis Complete ---")
-
-    # 5. Save Results
-    pathlib.Path("analyzed_data_frontend.json").write_text(
-        json.dumps(cleaned_rows, indent=2, ensure_ascii=False),
-        encoding="utf-8",
-    )
 
+def _process_reviews(hotel_id: int, version_id: int | None = None, review_ids: set[int] | None = None) -> int:
+    """
+    Steps 1.-5. for one hotel, one LLM_BATCH_SIZE batch at a time: raw
+    reviews are read a page at a time and each analyzed batch is inserted,
+    snapshotted and written to the JSON file before the next one is sent,
+    so memory stays at one batch however large the hotel.
+    """
+    append = review_ids is not None
     with pyodbc.connect(CONN_STR) as conn:
-        insert_processed_reviews(conn, cleaned_rows)
+        cursor = conn.cursor()
+        own_version = version_id is None
+        if own_version:
+            # Reprocessing the active version: load a copy of it as a new version, so
+            # readers keep the old rows until the new ones are all committed
+            base_version = datasets.active_version(cursor, hotel_id)
+            if base_version is None:
+                print(f"Hotel {hotel_id} has no active dataset version – aborting.")
+                return 0
+            version_id = datasets.begin_version(cursor, hotel_id)
+            datasets.copy_version(cursor, base_version, version_id)
+            conn.commit()
+
+        print(f"Fetching raw reviews for hotel {hotel_id} (version {version_id}) from DB...")
+        reviews = iter_reviews(hotel_id, version_id, review_ids)
+        writer = ProcessedReviewWriter(conn, hotel_id, version_id, append)
+        snapshot_writer = snapshot.SnapshotWriter(
+            "analyzed_data_frontend.arrow", snapshot.PROCESSED_SCHEMA, batch_size=LLM_BATCH_SIZE
+        )
+        json_path = pathlib.Path("analyzed_data_frontend.json")
+        json_tmp = json_path.with_name(json_path.name + ".tmp")
+        fetched = json_rows = 0
+        failed = False
+        try:
+            with open(json_tmp, "w", encoding="utf-8") as json_file:
+                json_file.write("[")
+                for batch in batched(reviews, LLM_BATCH_SIZE):
+                    fetched += len(batch)
+                    rows = _analyze_batch(batch)
+                    if rows is None:
+                        # The version is replaced as a whole, so one failed batch fails the run
+                        reviews.close()
+                        failed = True
+                        break
+                    # The version is still loading, so readers don't see these rows yet
+                    with metrics.timer("db_insert_processed_batch"):
+                        writer.write(rows)
+                        conn.commit()
+                    snapshot_writer.write_many({**r, "hotel_id": hotel_id} for r in rows)
+                    for r in rows:
+                        # One review per line, appended as it comes: still a JSON array
+                        json_file.write(("\n" if not json_rows else ",\n") + json.dumps(r, ensure_ascii=False))
+                        json_rows += 1
+                json_file.write("\n]\n")
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if failed or not fetched:
+                snapshot_writer.abort()
+                json_tmp.unlink(missing_ok=True)
+                conn.rollback()
+                if own_version:
+                    datasets.discard_version(cursor, version_id)
+                    conn.commit()
+        if not fetched:
+            print("No reviews found in DB – aborting.")
+            return 0
+        if failed:
+            return 0
+        print(f"Analyzed {fetched} raw reviews.")
+        print("--- Analysis Complete ---")
+
+        # 5. Save Results
+        snapshot_writer.close()
+        os.replace(json_tmp, json_path)
+        writer.commit()
+    metrics.inc("db_processed_rows_inserted_total", writer.rows_written)
+    return writer.rows_written
 
 
 if __name__ == "__main__":
     main()
+    if embedding_outbox.ENABLED:
+        # The dispatcher thread dies with this process; send what is due before exiting
+        try:
+            embedding_outbox.dispatch_once(lambda: pyodbc.connect(CONN_STR))
+        except Exception as e:
+            print(f"Embedding outbox dispatch failed: {e}")
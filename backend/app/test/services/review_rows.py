@@ -0,0 +1,86 @@
+"""
+The /reviews review shape, shared by everything that emits it.
+
+GET /reviews (main.py) and the live review events pushed over
+GET /reviews/stream (review_processor.publish_processed) both read
+ProcessedReviews joined to their photos with REVIEWS_WITH_PHOTOS_SQL and
+serialize each row with serialize_review_row(), so the two can't drift.
+"""
+import datetime
+import json
+
+from app.test.services import photo_mirror
+
+# Processed reviews joined to their photos through (version_id, review_id):
+# one row per photo, or a single photo-less row, with each review's rows adjacent
+REVIEWS_WITH_PHOTOS_SQL = """
+    SELECT
+        p.hotel_id, p.version_id, p.id, p.platformReviewId, p.rating, p.userName, p.reviewerName,
+        p.reviewText, p.summary, p.sentiment, p.language, p.categories,
+        p.keyPhrases, p.reviewDate, p.status, p.replyStatus, p.hasReply, p.source,
+        ph.src AS photo_src, ph.alt AS photo_alt, ph.content_hash AS photo_hash
+    FROM dbo.ProcessedReviews p
+    LEFT JOIN dbo.review_photos ph
+        ON ph.version_id = p.version_id AND ph.review_id = p.review_id
+    {where}
+    ORDER BY p.version_id, p.id
+"""
+
+
+def parse_json_list(value):
+    """Decode a JSON list column, falling back to an empty list."""
+    if not value:
+        return []
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return []
+
+
+def fold_photo_rows(cursor, fetch_size: int):
+    """(row, photos) per review from an executed REVIEWS_WITH_PHOTOS_SQL cursor, via fetchmany."""
+    current, photos = None, []
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        for row in rows:
+            if current is None or (row.version_id, row.id) != (current.version_id, current.id):
+                if current is not None:
+                    yield current, photos
+                current, photos = row, []
+            if row.photo_src is not None:
+                photos.append(photo_mirror.photo_dict(row.photo_src, row.photo_alt or "", row.photo_hash))
+    if current is not None:
+        yield current, photos
+
+
+def serialize_review_row(row, photos):
+    """
+    Build the exact JSON shape FastAPI produces for ReviewModel, without
+    running Pydantic validation. Keys follow ReviewModel's field order.
+    """
+    review_date = row.reviewDate
+    if isinstance(review_date, datetime.datetime):
+        review_date = review_date.date()
+
+    return {
+        "hotel_id": row.hotel_id,
+        "id": str(row.id),
+        "platformReviewId": row.platformReviewId,
+        "rating": int(row.rating or 0),
+        "userName": row.userName or "Anonymous",
+        "reviewerName": row.reviewerName,
+        "reviewText": row.reviewText,
+        "summary": row.summary,
+        "sentiment": row.sentiment,
+        "language": row.language,
+        "categories": parse_json_list(row.categories),
+        "keyPhrases": parse_json_list(row.keyPhrases),
+        "photos": photos,
+        "source": row.source,
+        "date": review_date,
+        "status": row.status,
+        "replyStatus": row.replyStatus,
+        "hasReply": row.hasReply,
+    }
@@ -0,0 +1,169 @@
+"""
+Scrape jobs run outside the web workers.
+
+A scrape takes minutes, far longer than a gunicorn worker is guaranteed to
+live: workers are recycled after max_requests and get only
+graceful_timeout seconds to finish. With SCRAPE_RUNNER=process (the default
+under gunicorn.conf.py) POST /scrape/booking only appends a job to a small
+SQLite queue, and one runner process per host, started by the gunicorn
+master, claims and runs the jobs with its own warm browser pool.
+
+SCRAPE_RUNNER=inline (the default for `python main.py`) keeps the old
+behaviour: the scrape runs as a background task of the request's worker.
+
+    python services/scrape_queue.py      # run a runner by hand
+"""
+import json
+import os
+import pathlib
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import closing
+
+TEST_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+MODE = os.getenv("SCRAPE_RUNNER", "inline")
+QUEUE_PATH = pathlib.Path(
+    os.getenv("SCRAPE_QUEUE_PATH", pathlib.Path(__file__).resolve().parent / "scrape_queue.db")
+)
+# Scrapes run at once by a runner; the browser pool has this many browsers by default
+CONCURRENCY = int(os.getenv("SCRAPE_RUNNER_CONCURRENCY", os.getenv("BROWSER_POOL_SIZE", "2")))
+POLL_S = float(os.getenv("SCRAPE_RUNNER_POLL_S", "1"))
+# Finished jobs kept for inspection
+RETENTION_S = 7 * 24 * 3600
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scrape_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        runner_pid INTEGER,
+        created_ts REAL NOT NULL,
+        started_ts REAL,
+        finished_ts REAL,
+        error TEXT
+    )
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    QUEUE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(QUEUE_PATH, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+# ------------------------------------------------------------------
+# Web side
+# ------------------------------------------------------------------
+def enqueue(payload: dict) -> int:
+    """Queue one scrape (the scrape_booking keyword arguments); returns the job id."""
+    with closing(_connect()) as conn:
+        return conn.execute(
+            "INSERT INTO scrape_jobs (payload, created_ts) VALUES (?, ?)",
+            (json.dumps(payload), time.time()),
+        ).lastrowid
+
+
+# ------------------------------------------------------------------
+# Runner side
+# ------------------------------------------------------------------
+def claim() -> tuple[int, dict] | None:
+    """Take the oldest queued job for this process, or None."""
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id, payload FROM scrape_jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE scrape_jobs SET status = 'running', runner_pid = ?, started_ts = ? WHERE id = ?",
+                (os.getpid(), time.time(), row[0]),
+            )
+        conn.execute("COMMIT")
+    return (row[0], json.loads(row[1])) if row else None
+
+
+def finish(job_id: int, error: str | None = None) -> None:
+    with closing(_connect()) as conn:
+        conn.execute(
+            "UPDATE scrape_jobs SET status = ?, finished_ts = ?, error = ? WHERE id = ?",
+            ("failed" if error else "done", time.time(), error, job_id),
+        )
+        conn.execute("DELETE FROM scrape_jobs WHERE finished_ts < ?", (time.time() - RETENTION_S,))
+
+
+def _fail_orphans() -> None:
+    """Jobs marked running by a runner that is gone will never finish; record them as failed."""
+    with closing(_connect()) as conn:
+        for job_id, pid in conn.execute(
+            "SELECT id, runner_pid FROM scrape_jobs WHERE status = 'running'"
+        ).fetchall():
+            try:
+                os.kill(pid, 0)
+                continue  # That runner is still alive (e.g. draining during a deploy)
+            except (OSError, TypeError):
+                pass
+            conn.execute(
+                "UPDATE scrape_jobs SET status = 'failed', finished_ts = ?, error = ? WHERE id = ?",
+                (time.time(), "runner exited during the scrape", job_id),
+            )
+
+
+def serve() -> None:
+    """Run queued scrapes, CONCURRENCY at a time, until SIGTERM; running scrapes are finished first."""
+    sys.path.append(str(TEST_DIR.parents[1]))
+    import pyodbc
+    from app.test.scraping.booking import CONN_STR, scrape_booking
+    from app.test.services import embedding_outbox
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    _fail_orphans()
+    # The processor runs in this process; its outbox rows drain here too, including leftovers
+    embedding_outbox.schedule_dispatch(lambda: pyodbc.connect(CONN_STR))
+
+    def loop() -> None:
+        while not stopping.is_set():
+            try:
+                job = claim()
+            except sqlite3.Error as e:
+                print(f"Scrape queue unavailable: {e}")
+                job = None
+            if job is None:
+                stopping.wait(POLL_S)
+                continue
+            job_id, payload = job
+            print(f"Scrape job {job_id}: {payload.get('url')}")
+            try:
+                scrape_booking(**payload)
+                finish(job_id)
+            except Exception as e:  # noqa: BLE001 - one failed scrape must not stop the runner
+                print(f"Scrape job {job_id} failed: {e}")
+                finish(job_id, str(e)[:500])
+
+    threads = [threading.Thread(target=loop, name=f"scrape-runner-{i}") for i in range(max(1, CONCURRENCY))]
+    for thread in threads:
+        thread.start()
+    print(f"Scrape runner {os.getpid()} serving {QUEUE_PATH} with {len(threads)} slot(s)")
+    for thread in threads:
+        thread.join()
+
+
+def start_runner() -> subprocess.Popen:
+    """Start a runner process (from the gunicorn master, so it outlives worker recycling)."""
+    return subprocess.Popen(
+        [sys.executable, str(pathlib.Path(__file__).resolve())],
+        cwd=TEST_DIR,  # The scraper's output paths are relative to app/test
+        env={**os.environ, "SCRAPE_RUNNER": "process"},
+    )
+
+
+if __name__ == "__main__":
+    serve()
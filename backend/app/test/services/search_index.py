@@ -0,0 +1,218 @@
+"""
+Local SQLite FTS5 sidecar for full-text search over processed reviews.
+
+The index is kept in sync from the committed rows by
+ProcessedReviewWriter.commit() (review_processor) and cleared together
+with the SQL tables. It supports phrase queries ("wifi slow"), BM25 ranking
+and highlighted matches.
+"""
+import datetime
+import hashlib
+import html
+import json
+import os
+import pathlib
+import re
+import sqlite3
+from contextlib import closing
+
+INDEX_PATH = pathlib.Path(
+    os.getenv("SEARCH_INDEX_PATH", pathlib.Path(__file__).resolve().parent / "search_index.db")
+)
+
+# Column weights for bm25(): reviewText, summary, keyPhrases
+BM25_WEIGHTS = (1.0, 2.0, 3.0)
+HIGHLIGHT_OPEN = "<mark>"
+HIGHLIGHT_CLOSE = "</mark>"
+# highlight() wraps matches in these control characters; the review text
+# around them is HTML-escaped before they become the <mark> tags
+_MATCH_OPEN = "\x02"
+_MATCH_CLOSE = "\x03"
+
+# Bump when the columns change; older index files are dropped and rebuilt empty
+SCHEMA_VERSION = 2
+_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS review_fts USING fts5(
+        reviewText,
+        summary,
+        keyPhrases,
+        hotel_id UNINDEXED,
+        review_id UNINDEXED,
+        platformReviewId UNINDEXED,
+        rating UNINDEXED,
+        sentiment UNINDEXED,
+        userName UNINDEXED,
+        reviewDate UNINDEXED,
+        tokenize = 'porter unicode61'
+    )
+"""
+
+_QUERY_TOKENS = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def _connect() -> sqlite3.Connection:
+    INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(INDEX_PATH)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        existed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'review_fts'"
+        ).fetchone() is not None
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS review_fts")
+            conn.execute(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if existed:
+            print("Search index schema changed; run POST /reviews/search/reindex to rebuild it.")
+    return conn
+
+
+def _doc_rowid(hotel_id, review_id: str) -> int:
+    """Stable 63-bit rowid so re-indexing a review is a keyed delete."""
+    digest = hashlib.blake2b(f"{hotel_id}:{review_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+def _key_phrases_text(value) -> str:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return value
+    return " · ".join(value or [])
+
+
+def _iso_date(value) -> str | None:
+    """Review dates as YYYY-MM-DD, the format /reviews returns, whatever the caller passed."""
+    if not value:
+        return None
+    if isinstance(value, datetime.date):
+        return value.isoformat()[:10]
+    text = str(value)
+    try:
+        return datetime.date.fromisoformat(text[:10]).isoformat()
+    except ValueError:
+        pass
+    try:
+        # The scraper's "Nov 15, 2025", as stored by insert_processed_reviews()
+        return datetime.datetime.strptime(text, "%b %d, %Y").date().isoformat()
+    except ValueError:
+        return text
+
+
+def _highlight_html(value: str | None) -> str | None:
+    """Escape indexed text for HTML, keeping only our own <mark> tags live."""
+    if value is None:
+        return None
+    return html.escape(value).replace(_MATCH_OPEN, HIGHLIGHT_OPEN).replace(_MATCH_CLOSE, HIGHLIGHT_CLOSE)
+
+
+def build_match_query(q: str) -> str:
+    """
+    Turn user input into an FTS5 MATCH expression.
+
+    Quoted text is kept as a phrase, every other word becomes its own quoted
+    term, and all parts must match (implicit AND).
+    """
+    parts = []
+    for phrase, word in _QUERY_TOKENS.findall(q):
+        text = (phrase or word).replace('"', "").strip()
+        if text:
+            parts.append(f'"{text}"')
+    return " ".join(parts)
+
+
+def index_reviews(rows: list[dict], hotel_id: int | None = None) -> None:
+    """Insert or replace one hotel's processed reviews in the search index."""
+    if not rows:
+        return
+    with closing(_connect()) as conn, conn:
+        conn.executemany(
+            "DELETE FROM review_fts WHERE rowid = ?",
+            [(_doc_rowid(hotel_id, r["id"]),) for r in rows],
+        )
+        conn.executemany(
+            """
+            INSERT INTO review_fts (
+                rowid, reviewText, summary, keyPhrases, hotel_id, review_id, platformReviewId,
+                rating, sentiment, userName, reviewDate
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    _doc_rowid(hotel_id, r["id"]),
+                    r.get("reviewText") or r.get("text") or "",
+                    r.get("summary") or "",
+                    _key_phrases_text(r.get("keyPhrases")),
+                    hotel_id,
+                    r["id"],
+                    r.get("platformReviewId"),
+                    r.get("rating"),
+                    r.get("sentiment"),
+                    r.get("userName"),
+                    _iso_date(r.get("date")),
+                )
+                for r in rows
+            ],
+        )
+
+
+def clear_index(hotel_id: int | None = None) -> None:
+    """Drop one hotel's documents, or every document, from the search index."""
+    with closing(_connect()) as conn, conn:
+        if hotel_id is None:
+            conn.execute("DELETE FROM review_fts")
+        else:
+            conn.execute("DELETE FROM review_fts WHERE hotel_id = ?", (hotel_id,))
+
+
+def search_reviews(q: str, limit: int = 20, hotel_id: int | None = None) -> list[dict]:
+    """
+    Ranked search across reviewText, summary and keyPhrases.
+
+    Raises ValueError for queries with no searchable terms.
+    """
+    match = build_match_query(q)
+    if not match:
+        raise ValueError("Search query is empty.")
+
+    sql = f"""
+        SELECT
+            hotel_id, review_id, platformReviewId, rating, sentiment, userName, reviewDate,
+            bm25(review_fts, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score,
+            highlight(review_fts, 0, ?, ?),
+            highlight(review_fts, 1, ?, ?),
+            highlight(review_fts, 2, ?, ?)
+        FROM review_fts
+        WHERE review_fts MATCH ? {"AND hotel_id = ?" if hotel_id is not None else ""}
+        ORDER BY score
+        LIMIT ?
+    """
+    params = [*(_MATCH_OPEN, _MATCH_CLOSE) * 3, match]
+    if hotel_id is not None:
+        params.append(hotel_id)
+    params.append(limit)
+    with closing(_connect()) as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    return [
+        {
+            "hotelId": hotel,
+            "id": review_id,
+            "platformReviewId": platform_id,
+            "rating": rating,
+            "sentiment": sentiment,
+            "userName": user_name,
+            "date": review_date,
+            # bm25() is lower-is-better; flip it so higher means more relevant
+            "score": round(-score, 4),
+            "highlights": {
+                "reviewText": _highlight_html(text_hl),
+                "summary": _highlight_html(summary_hl),
+                "keyPhrases": _highlight_html(phrases_hl),
+            },
+        }
+        for (hotel, review_id, platform_id, rating, sentiment, user_name, review_date,
+             score, text_hl, summary_hl, phrases_hl) in rows
+    ]
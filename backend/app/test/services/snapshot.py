@@ -0,0 +1,311 @@
+"""
+Columnar snapshots of raw and processed reviews (Arrow IPC file format).
+
+Snapshots are written batch by batch, memory-mapped on read (zero-copy),
+and support column projection and row filters without loading the rest of
+the file. They double as an offline replay and backup path:
+
+    python -m app.test.services.snapshot export processed.arrow
+    python -m app.test.services.snapshot import processed.arrow
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import pathlib
+from dataclasses import asdict, is_dataclass
+from typing import Iterable, Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+DEFAULT_BATCH_SIZE = 5000
+
+_PHOTO = pa.struct([("src", pa.string()), ("alt", pa.string())])
+
+RAW_SCHEMA = pa.schema([
+    ("review_id", pa.int64()),
+    ("title", pa.string()),
+    ("score", pa.float64()),
+    ("positive_txt", pa.string()),
+    ("negative_txt", pa.string()),
+    ("posted_date", pa.string()),
+    ("reviewer_stay_date", pa.string()),
+    ("num_of_nights", pa.int32()),
+    ("traveler_type", pa.string()),
+    ("room_name", pa.string()),
+    ("raw_review", pa.string()),
+    ("photo", pa.list_(_PHOTO)),
+])
+
+PROCESSED_SCHEMA = pa.schema([
+    ("hotel_id", pa.int64()),
+    ("booking_url", pa.string()),  # recreates the property if it is gone on import
+    ("id", pa.string()),
+    ("platformReviewId", pa.string()),
+    ("source", pa.string()),
+    ("rating", pa.int32()),
+    ("userName", pa.string()),
+    ("reviewerName", pa.string()),
+    ("reviewText", pa.string()),
+    ("text", pa.string()),
+    ("summary", pa.string()),
+    ("sentiment", pa.string()),
+    ("language", pa.string()),
+    ("categories", pa.list_(pa.string())),
+    ("keyPhrases", pa.list_(pa.string())),
+    ("date", pa.string()),
+    ("firstSeen", pa.string()),
+    ("lastUpdated", pa.string()),
+    ("scrapedAt", pa.string()),
+    ("status", pa.string()),
+    ("replyStatus", pa.string()),
+    ("hasReply", pa.string()),
+])
+
+
+def _to_record(item, schema: pa.Schema) -> dict:
+    """Project a dataclass or dict onto the schema's columns."""
+    data = asdict(item) if is_dataclass(item) else item
+    record = {name: data.get(name) for name in schema.names}
+    if "rating" in record and record["rating"] is not None:
+        record["rating"] = int(round(float(record["rating"])))
+    for name in ("posted_date", "reviewer_stay_date", "date"):
+        if record.get(name) is not None:
+            record[name] = str(record[name])
+    return record
+
+
+class SnapshotWriter:
+    """
+    Incrementally write records to an Arrow IPC file.
+
+    Rows are buffered and flushed as record batches, so memory stays bounded
+    by batch_size. The file is written to a temp path and renamed on close.
+    """
+
+    def __init__(self, path, schema: pa.Schema, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.path = pathlib.Path(path)
+        self.schema = schema
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._buffer: list[dict] = []
+        self._tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._sink = pa.OSFile(str(self._tmp_path), "wb")
+        self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, item) -> None:
+        self._buffer.append(_to_record(item, self.schema))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, items: Iterable) -> None:
+        for item in items:
+            self.write(item)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        batch = pa.RecordBatch.from_pylist(self._buffer, schema=self.schema)
+        self._writer.write_batch(batch)
+        self.rows_written += batch.num_rows
+        self._buffer = []
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+        self._sink.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._writer.close()
+        self._sink.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_snapshot(path, schema: pa.Schema, items: Iterable, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write all items to a snapshot file and return the row count."""
+    with SnapshotWriter(path, schema, batch_size=batch_size) as writer:
+        writer.write_many(items)
+    return writer.rows_written
+
+
+def iter_snapshot_batches(
+    path,
+    columns: Optional[list[str]] = None,
+    filter: Optional[pc.Expression] = None,
+) -> Iterator[pa.Table]:
+    """
+    Yield memory-mapped record batches, projected and filtered.
+
+    Only the pages backing the requested columns are touched.
+    """
+    with pa.memory_map(str(path), "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            table = pa.Table.from_batches([reader.get_batch(i)])
+            if filter is not None:
+                table = table.filter(filter)
+            if columns is not None:
+                table = table.select(columns)
+            if table.num_rows:
+                yield table
+
+
+def read_snapshot(
+    path,
+    columns: Optional[list[str]] = None,
+    filter: Optional[pc.Expression] = None,
+) -> pa.Table:
+    """Read a snapshot as a single table (zero-copy when unfiltered)."""
+    if filter is None:
+        with pa.memory_map(str(path), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.select(columns) if columns is not None else table
+
+    batches = list(iter_snapshot_batches(path, columns=columns, filter=filter))
+    if not batches:
+        with pa.memory_map(str(path), "r") as source:
+            schema = pa.ipc.open_file(source).schema
+        if columns is not None:
+            schema = pa.schema([schema.field(c) for c in columns])
+        return schema.empty_table()
+    return pa.concat_tables(batches)
+
+
+def iter_snapshot_records(path, columns=None, filter=None) -> Iterator[dict]:
+    """Yield snapshot rows as plain dicts, one batch in memory at a time."""
+    for table in iter_snapshot_batches(path, columns=columns, filter=filter):
+        yield from table.to_pylist()
+
+
+# ------------------------------------------------------------------
+# Backup / replay against the database
+# ------------------------------------------------------------------
+def export_processed_reviews(path, batch_size: int = DEFAULT_BATCH_SIZE, hotel_id: int | None = None) -> int:
+    """Stream the active version's processed reviews (of every hotel, or one) into a processed snapshot."""
+    import json
+    import pyodbc
+    from app.test.services import datasets
+    from app.test.services.review_processor import CONN_STR
+
+    list_columns = ("categories", "keyPhrases")
+    where, params = datasets.active_filter(hotel_id, column="r.version_id")
+    with pyodbc.connect(CONN_STR) as conn, SnapshotWriter(path, PROCESSED_SCHEMA, batch_size) as writer:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT r.hotel_id, p.booking_url, r.id, r.platformReviewId, r.source, r.rating, r.userName, "
+            "r.reviewerName, r.reviewText, r.[text], r.summary, r.sentiment, r.language, r.categories, "
+            "r.keyPhrases, r.reviewDate AS date, r.firstSeen, r.lastUpdated, r.scrapedAt, r.[status], "
+            "r.replyStatus, r.hasReply FROM dbo.ProcessedReviews r "
+            f"JOIN dbo.properties p ON p.hotel_id = r.hotel_id {where} ORDER BY r.hotel_id, r.id",
+            *params,
+        )
+        names = [d[0] for d in cur.description]
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                record = dict(zip(names, row))
+                for col in list_columns:
+                    try:
+                        record[col] = json.loads(record[col]) if record[col] else []
+                    except json.JSONDecodeError:
+                        record[col] = []
+                # Use the same text formats the LLM emits so import can re-parse them
+                if record["date"]:
+                    record["date"] = record["date"].strftime("%b %d, %Y")
+                for col in ("firstSeen", "lastUpdated", "scrapedAt"):
+                    if record[col]:
+                        record[col] = record[col].strftime("%B %d, %Y at %I:%M %p")
+                writer.write(record)
+    return writer.rows_written
+
+
+def import_processed_reviews(path, hotel_id: int | None = None) -> int:
+    """
+    Replay a processed snapshot as a new dataset version per hotel, activated
+    like a scrape's. The raw reviews and photos of the hotel's active version
+    are carried into it, so replayed rows keep their links to them.
+
+    hotel_id selects one hotel's rows; snapshots written before rows carried
+    hotel_id need it and are loaded into that hotel whole. A hotel missing
+    from dbo.properties is recreated from the rows' booking_url, under the
+    hotel_id the database assigns.
+    """
+    import pyodbc
+    from app.test.services import datasets, properties
+    from app.test.services.review_processor import CONN_STR, insert_processed_reviews
+
+    per_hotel = "hotel_id" in _schema(path).names
+    sources = [None]
+    if per_hotel:
+        sources = pc.unique(read_snapshot(path, columns=["hotel_id"]).column("hotel_id")).to_pylist()
+    if hotel_id is not None:
+        sources = [h for h in sources if h in (hotel_id, None)]
+    elif None in sources:
+        raise ValueError("Snapshot rows carry no hotel_id; pass the hotel to load them into.")
+
+    total = 0
+    with pyodbc.connect(CONN_STR) as conn:
+        cursor = conn.cursor()
+        for source in sources:
+            # One hotel's rows at a time: insert_processed_reviews() swaps its version in one commit
+            where = None
+            if per_hotel:
+                where = pc.field("hotel_id").is_null() if source is None else pc.field("hotel_id") == source
+            rows = list(iter_snapshot_records(path, filter=where))
+            if not rows:
+                continue
+
+            # Any property counts, with or without an active version (a restore follows a delete)
+            target = source if source is not None else hotel_id
+            if not properties.property_exists(cursor, target):
+                booking_url = rows[0].get("booking_url")
+                if not booking_url:
+                    raise ValueError(f"Hotel {target} is not a known property.")
+                target = properties.get_or_create_property(cursor, booking_url)
+                conn.commit()
+                print(f"Hotel {source} is gone; loading its rows into hotel {target} ({booking_url})")
+
+            base_version = datasets.active_version(cursor, target)
+            version_id = datasets.begin_version(cursor, target)
+            if base_version is not None:
+                datasets.copy_version(cursor, base_version, version_id)
+            conn.commit()
+            insert_processed_reviews(conn, rows, target, version_id)
+            total += len(rows)
+    if total:
+        datasets.schedule_purge(lambda: pyodbc.connect(CONN_STR))
+    return total
+
+
+def _schema(path) -> pa.Schema:
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).schema
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or replay processed review snapshots.")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="Snapshot file (.arrow)")
+    parser.add_argument("--hotel-id", type=int, help="Only this hotel (import: the hotel to load into)")
+    args = parser.parse_args()
+
+    if args.action == "export":
+        count = export_processed_reviews(args.path, hotel_id=args.hotel_id)
+        print(f"✓ Exported {count} processed reviews to {args.path}")
+    else:
+        count = import_processed_reviews(args.path, hotel_id=args.hotel_id)
+        print(f"✓ Replayed {count} processed reviews from {args.path}")
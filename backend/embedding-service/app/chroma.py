@@ -1,24 +1,102 @@
-import chromadb
-from chromadb.config import Settings
+import threading
 
-client = chromadb.Client(
-    Settings(
-        persist_directory="/data/chroma",
-        anonymized_telemetry=False
-    )
-)
+from app import compact_index, metrics
 
-collection = client.get_or_create_collection("hotel_reviews")
+PERSIST_DIRECTORY = "/data/chroma"
+COLLECTION_NAME = "hotel_reviews"
+TOPICS_COLLECTION_NAME = "hotel_review_topics"
+
+_client = None
+_collection = None
+_topics_collection = None
+_lock = threading.Lock()
+
+
+def _get_client():
+    """Open Chroma on first use (chromadb is slow to import); call with _lock held."""
+    global _client
+    if _client is None:
+        import chromadb
+        from chromadb.config import Settings
+
+        with metrics.timer("chroma_open"):
+            _client = chromadb.Client(
+                Settings(
+                    persist_directory=PERSIST_DIRECTORY,
+                    anonymized_telemetry=False
+                )
+            )
+    return _client
+
+def get_collection():
+    """The review collection, opened on first use."""
+    global _collection
+    if _collection is None:
+        with _lock:
+            if _collection is None:
+                _collection = _get_client().get_or_create_collection(COLLECTION_NAME)
+    return _collection
+
+def get_topics_collection():
+    """Topic centroids per hotel (see app.topics)."""
+    global _topics_collection
+    if _topics_collection is None:
+        with _lock:
+            if _topics_collection is None:
+                _topics_collection = _get_client().get_or_create_collection(TOPICS_COLLECTION_NAME)
+    return _topics_collection
 
 def save_embedding(review_id: str, embedding, metadata: dict):
-    collection.add(
-        ids=[review_id],
-        embeddings=[embedding],
-        metadatas=[metadata]
-    )
+    save_embeddings([review_id], [embedding], [metadata])
+
+def save_embeddings(review_ids: list[str], embeddings: list, metadatas: list[dict], documents: list[str] = None):
+    """Insert or replace vectors by id, so re-sent reviews never duplicate."""
+    collection = get_collection()
+    with metrics.timer("chroma_upsert"):
+        collection.upsert(
+            ids=review_ids,
+            embeddings=embeddings,
+            metadatas=metadatas,
+            documents=documents
+        )
+    if compact_index.ENABLED:
+        compact_index.get_index().add(
+            review_ids, embeddings, [(m or {}).get("hotel_id", -1) for m in metadatas]
+        )
+
+def search_similar(embedding, k: int = 10, hotel_id: int | None = None) -> list[dict]:
+    """
+    Nearest reviews by cosine similarity: from the compact index when
+    VECTOR_INDEX=int8, otherwise from Chroma's own index.
+    """
+    if compact_index.ENABLED:
+        with metrics.timer("vector_search"):
+            hits = compact_index.get_index().search(embedding, k, hotel_id)
+        return [{"review_id": review_id, "score": score} for review_id, score in hits]
+
+    with metrics.timer("vector_search"):
+        found = get_collection().query(
+            query_embeddings=[list(embedding)],
+            n_results=k,
+            where={"hotel_id": hotel_id} if hotel_id is not None else None,
+            include=["distances"],
+        )
+    # Chroma's default space is squared L2; for unit vectors that is 2 - 2 * cosine
+    return [
+        {"review_id": review_id, "score": 1 - distance / 2}
+        for review_id, distance in zip(found["ids"][0], found["distances"][0])
+    ]
+
+def stored_metadatas(review_ids: list[str]) -> dict[str, dict]:
+    """Metadata of the ids already in the collection."""
+    found = get_collection().get(ids=review_ids, include=["metadatas"])
+    return {
+        review_id: metadata or {}
+        for review_id, metadata in zip(found["ids"], found["metadatas"])
+    }
 
 def count_embeddings():
-    return collection.count()
+    return get_collection().count()
 
 def peek_embeddings(limit=5):
-    return collection.peek(limit=limit)
+    return get_collection().peek(limit=limit)
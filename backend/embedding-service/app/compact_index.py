@@ -0,0 +1,237 @@
+"""
+Optional compact vector index (VECTOR_INDEX=int8) alongside Chroma.
+
+Each vector is kept in memory as int8 codes with one float32 scale
+(symmetric per-vector scalar quantization): 768 + 4 bytes instead of
+3072 for float32, and no graph links. A query scans the codes in blocks
+for candidates, then re-ranks the top k * COMPACT_RERANK candidates
+exactly against the full float32 vectors, which stay on disk in a
+memory-mapped file and are only read for those rows.
+
+Chroma remains the store of record (metadata, documents, topics); the
+index is written next to it by save_embeddings() and rebuilt from the
+collection if its files are missing. Rows an interrupted append left in
+only some of the files are cut off on load.
+"""
+import os
+import pathlib
+import threading
+
+import numpy as np
+
+from app import metrics
+
+ENABLED = os.getenv("VECTOR_INDEX", "chroma") == "int8"
+INDEX_DIR = pathlib.Path(os.getenv("COMPACT_INDEX_DIR", "/data/compact_index"))
+RERANK_FACTOR = int(os.getenv("COMPACT_RERANK", "4"))
+# Rows dequantized per product while scanning: small enough that the float32
+# block stays in cache, which makes the scan faster than a float32 one
+BLOCK = 256
+
+
+def quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(int8 codes, per-row scale) with vectors ~= codes * scale[:, None]."""
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.rint(vectors / scales[:, None]).clip(-127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _unit(vectors) -> np.ndarray:
+    x = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return x / norms
+
+
+class CompactIndex:
+    """int8 codes in memory, float32 vectors on disk; upsert by id, cosine search."""
+
+    def __init__(self, directory: pathlib.Path, dim: int | None = None):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._codes = np.empty((0, 0), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._hotels = np.empty(0, dtype=np.int32)
+        self._vectors = None  # memmap over vectors.f32, reopened when the index grows
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --------------------------------------------------------------
+    # Files: row i of each is the vector with ids[i]
+    # --------------------------------------------------------------
+    def _path(self, name: str) -> pathlib.Path:
+        return self.directory / name
+
+    def _load(self) -> None:
+        ids_path = self._path("ids.txt")
+        text = ids_path.read_text(encoding="utf-8") if ids_path.exists() else ""
+        ids = text.splitlines()
+        if text and not text.endswith("\n"):
+            ids.pop()  # The last id was only partly written
+        dim_path = self._path("dim.txt")
+        if dim_path.exists():
+            self.dim = int(dim_path.read_text())
+        elif ids and self._path("codes.i8").exists():
+            # Written before dim.txt existed; exact unless a crash left extra bytes
+            self.dim = self.dim or self._path("codes.i8").stat().st_size // len(ids)
+        if not self.dim:
+            # No row is readable without the dimension; start the files over
+            for name in ("vectors.f32", "codes.i8", "scales.f32", "hotels.i32"):
+                if self._path(name).exists():
+                    os.truncate(self._path(name), 0)
+            return
+
+        # Files are appended in turn, so a crash leaves some of them with extra
+        # (or, for a missing file, fewer) rows: keep the rows all files hold
+        # and cut the rest off, or the next append would misalign the rows
+        row_bytes = self._row_bytes()
+        sizes = {name: self._path(name).stat().st_size if self._path(name).exists() else 0
+                 for name in row_bytes}
+        n = min(len(ids), *(sizes[name] // size for name, size in row_bytes.items()))
+        for name, size in row_bytes.items():
+            if sizes[name] != n * size:
+                os.truncate(self._path(name), n * size)
+        if len(ids) != n or (text and not text.endswith("\n")):
+            ids_path.write_text("".join(f"{review_id}\n" for review_id in ids[:n]), encoding="utf-8")
+        if not n:
+            return
+
+        self.ids = ids[:n]
+        self._rows = {review_id: i for i, review_id in enumerate(self.ids)}
+        self._codes = np.fromfile(self._path("codes.i8"), dtype=np.int8).reshape(n, self.dim)
+        self._scales = np.fromfile(self._path("scales.f32"), dtype=np.float32)
+        self._hotels = np.fromfile(self._path("hotels.i32"), dtype=np.int32)
+
+    def _row_bytes(self) -> dict[str, int]:
+        return {"vectors.f32": 4 * self.dim, "codes.i8": self.dim, "scales.f32": 4, "hotels.i32": 4}
+
+    def _write_rows(self, name: str, rows: np.ndarray, at: list[int]) -> None:
+        """Overwrite existing rows in place (row size is fixed per file)."""
+        row_bytes = rows[0].nbytes
+        with open(self._path(name), "r+b") as f:
+            for i, row in zip(at, rows):
+                f.seek(i * row_bytes)
+                f.write(row.tobytes())
+
+    def _append(self, name: str, rows: np.ndarray) -> None:
+        with open(self._path(name), "ab") as f:
+            f.write(rows.tobytes())
+
+    def _vectors_map(self) -> np.ndarray:
+        if self._vectors is None or len(self._vectors) != len(self.ids):
+            self._vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r",
+                                      shape=(len(self.ids), self.dim))
+        return self._vectors
+
+    # --------------------------------------------------------------
+    # Writes and queries
+    # --------------------------------------------------------------
+    def add(self, ids: list[str], vectors, hotel_ids: list[int]) -> None:
+        """Insert or replace vectors by id."""
+        x = _unit(vectors)
+        codes, scales = quantize(x)
+        hotels = np.asarray(hotel_ids, dtype=np.int32)
+        with self._lock, metrics.timer("compact_index_add"):
+            self.dim = self.dim or x.shape[1]
+            if not self._path("dim.txt").exists():
+                self._path("dim.txt").write_text(str(self.dim))
+            existing = [(j, self._rows[review_id]) for j, review_id in enumerate(ids) if review_id in self._rows]
+            if existing:
+                src, rows = [e[0] for e in existing], [e[1] for e in existing]
+                self._write_rows("vectors.f32", x[src], rows)
+                self._write_rows("codes.i8", codes[src], rows)
+                self._write_rows("scales.f32", scales[src], rows)
+                self._write_rows("hotels.i32", hotels[src], rows)
+                self._codes[rows], self._scales[rows], self._hotels[rows] = codes[src], scales[src], hotels[src]
+
+            # Last occurrence wins when a batch repeats an id, as with Chroma's upsert
+            last = {review_id: j for j, review_id in enumerate(ids)}
+            new = [j for review_id, j in last.items() if review_id not in self._rows]
+            if not new:
+                return
+            self._append("vectors.f32", x[new])
+            self._append("codes.i8", codes[new])
+            self._append("scales.f32", scales[new])
+            self._append("hotels.i32", hotels[new])
+            with open(self._path("ids.txt"), "a", encoding="utf-8") as f:
+                f.write("".join(f"{ids[j]}\n" for j in new))
+            start = len(self.ids)
+            self.ids.extend(ids[j] for j in new)
+            self._rows.update((ids[j], start + n) for n, j in enumerate(new))
+            self._codes = np.concatenate([self._codes.reshape(-1, self.dim), codes[new]])
+            self._scales = np.concatenate([self._scales, scales[new]])
+            self._hotels = np.concatenate([self._hotels, hotels[new]])
+        metrics.set_gauge("compact_index_vectors", len(self.ids))
+
+    def search(self, query, k: int = 10, hotel_id: int | None = None,
+               rerank: int = RERANK_FACTOR) -> list[tuple[str, float]]:
+        """Top k (id, cosine similarity): int8 scan for candidates, exact re-rank from disk."""
+        q = _unit(query)[0]
+        with self._lock:
+            n = len(self.ids)
+            codes, scales, hotels = self._codes, self._scales, self._hotels
+            vectors = self._vectors_map() if n else None
+        if not n:
+            return []
+
+        with metrics.timer("compact_index_scan"):
+            approx = np.empty(n, dtype=np.float32)
+            buffer = np.empty((BLOCK, self.dim), dtype=np.float32)
+            for start in range(0, n, BLOCK):
+                block = buffer[:min(BLOCK, n - start)]
+                block[...] = codes[start:start + BLOCK]
+                np.dot(block, q, out=approx[start:start + BLOCK])
+            approx *= scales
+            if hotel_id is not None:
+                approx[hotels != hotel_id] = -np.inf
+            m = min(n, k * max(rerank, 1))
+            candidates = np.argpartition(-approx, m - 1)[:m] if m < n else np.arange(n)
+            candidates = np.sort(candidates[np.isfinite(approx[candidates])])  # sorted: sequential reads
+
+        with metrics.timer("compact_index_rerank"):
+            exact = np.asarray(vectors[candidates]) @ q
+            order = np.argsort(-exact)[:k]
+        return [(self.ids[candidates[i]], float(exact[i])) for i in order]
+
+    def memory_bytes(self) -> int:
+        """Bytes held in memory by the quantized arrays (ids excluded)."""
+        return self._codes.nbytes + self._scales.nbytes + self._hotels.nbytes
+
+
+_index: CompactIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> CompactIndex:
+    """The process's index, rebuilt from the Chroma collection if its files are missing."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = CompactIndex(INDEX_DIR)
+                if not len(index):
+                    _rebuild(index)
+                _index = index
+    return _index
+
+
+def _rebuild(index: CompactIndex, page_size: int = 5000) -> None:
+    from app.chroma import get_collection
+
+    collection = get_collection()
+    offset = 0
+    with metrics.timer("compact_index_rebuild"):
+        while True:
+            page = collection.get(limit=page_size, offset=offset, include=["embeddings", "metadatas"])
+            if not len(page["ids"]):
+                break
+            index.add(page["ids"], page["embeddings"],
+                      [(m or {}).get("hotel_id", -1) for m in page["metadatas"]])
+            offset += page_size
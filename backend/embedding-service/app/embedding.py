@@ -1,22 +1,72 @@
 import os
+import threading
 import time
-from google import genai
-from google.api_core.exceptions import ResourceExhausted
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+from app import metrics
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_client():
+    """The Gemini client, created (and google.genai imported) on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from google import genai
+
+                _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    return _client
 
 def embed_text(text: str, retries: int = 3):
+    from google.api_core.exceptions import ResourceExhausted
+
+    client = get_client()
     for attempt in range(retries):
         try:
-            result = client.models.embed_content(
-                model="text-embedding-004",
-                contents=text
-            )
+            with metrics.timer("embed_request"):
+                result = client.models.embed_content(
+                    model="text-embedding-004",
+                    contents=text
+                )
+            metrics.inc("embeddings_total")
             return result.embeddings[0].values
 
         except ResourceExhausted:
+            metrics.inc("embed_quota_retries_total")
             wait = 20
             print(f"[WARN] Gemini quota hit. Retrying in {wait}s...")
             time.sleep(wait)
 
     raise Exception("Embedding failed due to quota limits")
+
+# Texts per embed_content request (the API's batch limit)
+MAX_BATCH = 100
+
+def embed_texts(texts: list[str], retries: int = 3) -> list[list[float]]:
+    """Embed many texts with one request per MAX_BATCH instead of one each."""
+    from google.api_core.exceptions import ResourceExhausted
+
+    client = get_client()
+    vectors = []
+    for start in range(0, len(texts), MAX_BATCH):
+        chunk = texts[start:start + MAX_BATCH]
+        for attempt in range(retries):
+            try:
+                with metrics.timer("embed_batch_request"):
+                    result = client.models.embed_content(
+                        model="text-embedding-004",
+                        contents=chunk
+                    )
+                break
+            except ResourceExhausted:
+                metrics.inc("embed_quota_retries_total")
+                wait = 20
+                print(f"[WARN] Gemini quota hit. Retrying in {wait}s...")
+                time.sleep(wait)
+        else:
+            raise Exception("Embedding failed due to quota limits")
+        metrics.inc("embeddings_total", len(chunk))
+        vectors.extend(e.values for e in result.embeddings)
+    return vectors
@@ -1,9 +1,14 @@
+import hashlib
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
-from app.embedding import embed_text
-from app.chroma import save_embedding
-from app.chroma import collection
+from app.embedding import embed_text, embed_texts
+from app.chroma import (
+    count_embeddings, peek_embeddings, save_embedding, save_embeddings, search_similar, stored_metadatas
+)
+from app import metrics, topics
 
 app = FastAPI(title="Embedding Service")
 
@@ -26,10 +31,86 @@ def embed(review: Review):
 
     return {"status": "success"}
 
+
+class BatchReview(Review):
+    metadata: dict = {}
+
+
+class ReviewBatch(BaseModel):
+    reviews: list[BatchReview]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@app.post("/embed/batch")
+def embed_batch(batch: ReviewBatch):
+    """
+    Idempotent bulk embed for the review pipeline's outbox: reviews are keyed
+    by review_id, and one whose text is unchanged since it was last embedded
+    is skipped, so redelivered or re-scraped reviews cost no embedding calls.
+    A re-embedded review keeps its topic label until topics.assign() moves it.
+    """
+    latest = {r.review_id: r for r in batch.reviews}  # a later duplicate wins
+    hashes = {review_id: text_hash(r.text) for review_id, r in latest.items()}
+    stored = stored_metadatas(list(latest))
+    todo = [r for review_id, r in latest.items() if stored.get(review_id, {}).get("text_hash") != hashes[review_id]]
+    metrics.inc("embed_batch_skipped_total", len(latest) - len(todo))
+
+    if todo:
+        vectors = embed_texts([r.text for r in todo])
+        save_embeddings(
+            [r.review_id for r in todo],
+            vectors,
+            [
+                {
+                    **r.metadata,
+                    **{k: v for k, v in stored.get(r.review_id, {}).items() if k in topics.LABEL_KEYS},
+                    "hotel_id": r.hotel_id,
+                    "text_hash": hashes[r.review_id],
+                }
+                for r in todo
+            ],
+            [r.text for r in todo],
+        )
+        by_hotel: dict[int, list[str]] = {}
+        for r in todo:
+            by_hotel.setdefault(r.hotel_id, []).append(r.review_id)
+        for hotel_id, ids in by_hotel.items():
+            topics.schedule_update(hotel_id, ids)
+    return {"status": "success", "embedded": len(todo), "skipped": len(latest) - len(todo)}
+
+class SearchQuery(BaseModel):
+    text: str
+    hotel_id: int | None = None
+    k: int = 10
+
+
+@app.post("/search")
+def search(query: SearchQuery):
+    """Reviews most similar to a text, optionally within one hotel."""
+    vector = embed_text(query.text)
+    return {"results": search_similar(vector, query.k, query.hotel_id)}
+
+@app.get("/topics")
+def get_topics(hotel_id: int):
+    """Recurring review themes for a hotel: k-means clusters of its review vectors."""
+    return topics.get_topics(hotel_id)
+
+@app.post("/topics/refresh")
+def refresh_topics(hotel_id: int):
+    """Re-cluster a hotel from scratch."""
+    return topics.refit(hotel_id)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.get("/debug/count")
 def debug_count():
-    return {"count": collection.count()}
+    return {"count": count_embeddings()}
 
 @app.get("/debug/peek")
 def debug_peek():
-    return collection.peek(limit=5)
\ No newline at end of file
+    return peek_embeddings(limit=5)
\ No newline at end of file
@@ -0,0 +1,415 @@
+"""
+Topic clustering over a hotel's review embeddings.
+
+A hotel's vectors are bulk-loaded from Chroma into one float32 matrix and
+clustered with mini-batch k-means on unit vectors, so finding the nearest
+centroid for a whole block of reviews is one matrix product and an argmax.
+Each review gets its topic_id written back to its metadata. Centroids, with
+their size, mean rating, negative share and top terms, go to the
+TOPICS_COLLECTION that GET /topics serves.
+
+New vectors are assigned to their nearest centroid and move it with the
+same mini-batch update; a re-embedded review leaves the topic it was
+counted in first. Once incremental additions exceed REFIT_FRACTION
+of the fitted size, the hotel is re-fit from scratch (topic stats and terms
+are as of the last fit).
+"""
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from app import metrics
+from app.chroma import get_collection, get_topics_collection
+
+MAX_TOPICS = int(os.getenv("TOPICS_MAX", "30"))
+MIN_REVIEWS = int(os.getenv("TOPICS_MIN_REVIEWS", "20"))
+REFIT_FRACTION = float(os.getenv("TOPICS_REFIT_FRACTION", "0.2"))
+BATCH_SIZE = 1024
+MAX_ITERATIONS = 200
+TOLERANCE = 1e-4
+# Independent mini-batch runs per fit, and full passes over all vectors after the best one
+N_INIT = 3
+REFINE_PASSES = 5
+# k-means++ seeding runs on a sample; it is quadratic-ish in k * sample
+INIT_SAMPLE = 10000
+# Rows per Chroma get/update call and per distance block
+PAGE_SIZE = 5000
+
+_STOPWORDS = frozenset("""
+    the and was were for with that this there they them their very but not are had has have
+    our you your from all out its just also too would could one two get got did didn
+    hotel room stay stayed
+""".split())
+_WORD = re.compile(r"[a-z]{3,}")
+# Review metadata keys that record which topic (of which model) a vector is counted in
+LABEL_KEYS = ("topic_id", "topic_model")
+
+
+# ------------------------------------------------------------------
+# Vectorized k-means
+# ------------------------------------------------------------------
+def normalize(x: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length, so a dot product is cosine similarity."""
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (x / norms).astype(np.float32, copy=False)
+
+
+def nearest(x: np.ndarray, centroids: np.ndarray, block: int = PAGE_SIZE) -> tuple[np.ndarray, np.ndarray]:
+    """(label, cosine similarity) of every row's nearest centroid, in blocks to bound memory."""
+    labels = np.empty(len(x), dtype=np.int32)
+    sims = np.empty(len(x), dtype=np.float32)
+    for start in range(0, len(x), block):
+        scores = x[start:start + block] @ centroids.T
+        best = scores.argmax(axis=1)
+        labels[start:start + block] = best
+        sims[start:start + block] = scores[np.arange(len(best)), best]
+    return labels, sims
+
+
+def _init_centroids(x: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Greedy k-means++ seeding on a sample: each step draws several candidates
+    with weight D(x)^2 and keeps the one that lowers total distance most.
+    Plain k-means++ often seeds one theme twice in 768-d, where distances
+    within and between themes differ by well under 2x.
+    """
+    sample = x[rng.choice(len(x), min(len(x), INIT_SAMPLE), replace=False)]
+    trials = 2 + int(4 * math.log(k))
+    chosen = [int(rng.integers(len(sample)))]
+    # ||a - b||^2 = 2 - 2 cos(a, b) for unit vectors
+    dist = np.maximum(2 - 2 * (sample @ sample[chosen[0]]), 0)
+    for _ in range(1, k):
+        total = dist.sum()
+        if total <= 0:
+            candidates = rng.integers(len(sample), size=trials)
+        else:
+            candidates = rng.choice(len(sample), size=trials, p=dist / total)
+        candidate_dist = np.minimum(dist[:, None], np.maximum(2 - 2 * (sample @ sample[candidates].T), 0))
+        best = int(candidate_dist.sum(axis=0).argmin())
+        chosen.append(int(candidates[best]))
+        dist = candidate_dist[:, best]
+    return sample[chosen].copy()
+
+
+def _update(centroids: np.ndarray, counts: np.ndarray, batch: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """
+    One mini-batch step: each centroid moves toward its points' mean with a
+    learning rate of 1/(points seen), i.e. it tracks the running mean of all
+    points ever assigned to it. counts is updated in place.
+    """
+    k = len(centroids)
+    onehot = (labels[None, :] == np.arange(k)[:, None]).astype(np.float32)
+    sums = onehot @ batch
+    hits = onehot.sum(axis=1)
+    counts += hits.astype(counts.dtype)
+    rate = np.where(hits > 0, 1 / np.maximum(counts, 1), 0).astype(np.float32)[:, None]
+    return normalize(centroids + rate * (sums - hits[:, None] * centroids))
+
+
+def minibatch_kmeans(x: np.ndarray, k: int, seed: int = 0, batch_size: int = BATCH_SIZE,
+                     max_iterations: int = MAX_ITERATIONS) -> np.ndarray:
+    """Spherical mini-batch k-means (Sculley 2010) over unit rows; returns the centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = _init_centroids(x, k, rng)
+    counts = np.zeros(k, dtype=np.int64)
+    for _ in range(max_iterations):
+        batch = x[rng.choice(len(x), min(batch_size, len(x)), replace=False)]
+        labels, _ = nearest(batch, centroids)
+        updated = _update(centroids, counts, batch, labels)
+        shift = float(np.abs(updated - centroids).max())
+        centroids = updated
+        if shift < TOLERANCE:
+            break
+    return centroids
+
+
+def choose_k(n: int) -> int:
+    return int(min(MAX_TOPICS, max(2, round(math.sqrt(n / 2)))))
+
+
+def _refine(x: np.ndarray, centroids: np.ndarray, labels: np.ndarray, sims: np.ndarray) -> np.ndarray:
+    """
+    One full (Lloyd) pass: each centroid becomes its members' mean. Empty
+    centroids are moved to the worst-fitting points, which splits themes
+    that seeding merged into one cluster.
+    """
+    k = len(centroids)
+    sums = np.zeros_like(centroids)
+    for start in range(0, len(x), PAGE_SIZE):
+        block = labels[start:start + PAGE_SIZE]
+        onehot = (block[None, :] == np.arange(k)[:, None]).astype(np.float32)
+        sums += onehot @ x[start:start + PAGE_SIZE]
+    empty = np.flatnonzero(np.bincount(labels, minlength=k) == 0)
+    if len(empty):
+        sums[empty] = x[np.argsort(sims)[:len(empty)]]
+    return normalize(sums)
+
+
+def fit(x: np.ndarray, k: int | None = None, seed: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Cluster unit rows; returns (centroids, labels, similarities) with empty clusters dropped."""
+    # Best of N_INIT seedings by total similarity; a bad seeding merges two themes
+    best = None
+    for attempt in range(N_INIT):
+        centroids = minibatch_kmeans(x, k or choose_k(len(x)), seed + attempt)
+        labels, sims = nearest(x, centroids)
+        if best is None or sims.sum() > best[2].sum():
+            best = centroids, labels, sims
+    centroids, labels, sims = best
+    for _ in range(REFINE_PASSES):
+        centroids = _refine(x, centroids, labels, sims)
+        labels, sims = nearest(x, centroids)
+    used = np.unique(labels)
+    remap = np.full(len(centroids), -1, dtype=np.int32)
+    remap[used] = np.arange(len(used), dtype=np.int32)
+    return centroids[used], remap[labels], sims
+
+
+def top_terms(documents: list[str], labels: np.ndarray, k: int, n_terms: int = 5) -> list[list[str]]:
+    """Words over-represented in each cluster (document-frequency lift over the hotel)."""
+    cluster_df = [Counter() for _ in range(k)]
+    overall = Counter()
+    for doc, label in zip(documents, labels):
+        words = set(_WORD.findall((doc or "").lower())) - _STOPWORDS
+        cluster_df[label].update(words)
+        overall.update(words)
+    sizes = np.bincount(labels, minlength=k)
+    n = max(len(documents), 1)
+    terms = []
+    for label in range(k):
+        size = max(int(sizes[label]), 1)
+        floor = max(2, 0.05 * size)
+        scored = [
+            ((df / size) * math.log((df / size) / (overall[w] / n)), w)
+            for w, df in cluster_df[label].items() if df >= floor
+        ]
+        terms.append([w for _, w in sorted(scored, reverse=True)[:n_terms]])
+    return terms
+
+
+# ------------------------------------------------------------------
+# Chroma I/O
+# ------------------------------------------------------------------
+def load_vectors(hotel_id: int | None = None, ids: list[str] | None = None):
+    """(ids, unit float32 matrix, metadatas, documents) for a hotel or for given ids."""
+    collection = get_collection()
+    include = ["embeddings", "metadatas", "documents"]
+    all_ids, blocks, metadatas, documents = [], [], [], []
+    with metrics.timer("topics_load"):
+        offset = 0
+        while ids is None or offset < len(ids):
+            if ids is not None:
+                page = collection.get(ids=ids[offset:offset + PAGE_SIZE], include=include)
+            else:
+                page = collection.get(where={"hotel_id": hotel_id}, limit=PAGE_SIZE, offset=offset, include=include)
+            if len(page["ids"]):
+                all_ids.extend(page["ids"])
+                blocks.append(np.asarray(page["embeddings"], dtype=np.float32))
+                metadatas.extend(page["metadatas"])
+                documents.extend(page["documents"] or [None] * len(page["ids"]))
+            offset += PAGE_SIZE
+            if ids is None and len(page["ids"]) < PAGE_SIZE:
+                break
+    x = normalize(np.concatenate(blocks)) if blocks else np.empty((0, 0), dtype=np.float32)
+    return all_ids, x, metadatas, documents
+
+
+def _write_labels(ids: list[str], metadatas: list[dict], labels: np.ndarray, model: int) -> None:
+    collection = get_collection()
+    with metrics.timer("topics_store"):
+        for start in range(0, len(ids), PAGE_SIZE):
+            collection.update(
+                ids=ids[start:start + PAGE_SIZE],
+                metadatas=[
+                    {**(meta or {}), "topic_id": int(label), "topic_model": model}
+                    for meta, label in zip(metadatas[start:start + PAGE_SIZE], labels[start:start + PAGE_SIZE])
+                ],
+            )
+
+
+def _topic_id(hotel_id: int, topic: int) -> str:
+    return f"{hotel_id}:{topic}"
+
+
+def load_model(hotel_id: int):
+    """(centroids, topic metadatas) of the hotel's current model, or None."""
+    found = get_topics_collection().get(where={"hotel_id": hotel_id}, include=["embeddings", "metadatas"])
+    if not len(found["ids"]):
+        return None
+    # A refit swaps topics in before it drops the old model's leftovers; only the newest counts
+    current = max(m["model"] for m in found["metadatas"])
+    keep = [i for i, m in enumerate(found["metadatas"]) if m["model"] == current]
+    order = sorted(keep, key=lambda i: found["metadatas"][i]["topic_id"])
+    centroids = np.asarray(found["embeddings"], dtype=np.float32)[order]
+    return centroids, [found["metadatas"][i] for i in order]
+
+
+# ------------------------------------------------------------------
+# Jobs
+# ------------------------------------------------------------------
+_locks: dict[int, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _hotel_lock(hotel_id: int) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(hotel_id, threading.Lock())
+
+
+def refit(hotel_id: int, only_if_missing: bool = False) -> dict:
+    """
+    Re-cluster every vector of a hotel and replace its topics. The old model
+    keeps serving until the new one is stored. With only_if_missing, a hotel
+    that got a model while this call waited for the lock is left alone.
+    """
+    with _hotel_lock(hotel_id):
+        if only_if_missing:
+            model = load_model(hotel_id)
+            if model is not None:
+                _, topic_meta = model
+                return {"hotel_id": hotel_id, "topics": len(topic_meta), "model": topic_meta[0]["model"]}
+        ids, x, metadatas, documents = load_vectors(hotel_id)
+        topics = get_topics_collection()
+        old_ids = topics.get(where={"hotel_id": hotel_id}, include=[])["ids"]
+        if len(ids) < MIN_REVIEWS:
+            if old_ids:
+                topics.delete(ids=old_ids)
+            return {"hotel_id": hotel_id, "reviews": len(ids), "topics": 0}
+
+        with metrics.timer("topics_fit"):
+            centroids, labels, sims = fit(x, seed=hotel_id)
+        k = len(centroids)
+        model = int(time.time())
+        terms = top_terms(documents, labels, k)
+        ratings = np.array([float((m or {}).get("rating") or np.nan) for m in metadatas], dtype=np.float32)
+        negative = np.array([(m or {}).get("sentiment") == "Negative" for m in metadatas])
+
+        topic_meta = []
+        for label in range(k):
+            members = np.flatnonzero(labels == label)
+            closest = members[np.argsort(-sims[members])[:3]]
+            rated = ratings[members][~np.isnan(ratings[members])]
+            topic_meta.append({
+                "hotel_id": hotel_id,
+                "topic_id": label,
+                "model": model,
+                "size": int(len(members)),
+                "fitted_size": int(len(members)),
+                "mean_rating": round(float(rated.mean()), 2) if len(rated) else -1.0,
+                "negative_share": round(float(negative[members].mean()), 3),
+                "terms": ", ".join(terms[label]),
+                "examples": "|".join(ids[i] for i in closest),
+            })
+        new_ids = [_topic_id(hotel_id, label) for label in range(k)]
+        topics.upsert(ids=new_ids, embeddings=centroids.tolist(), metadatas=topic_meta)
+        stale = sorted(set(old_ids) - set(new_ids))
+        if stale:
+            topics.delete(ids=stale)
+        _write_labels(ids, metadatas, labels, model)
+    metrics.inc("topics_refits_total")
+    return {"hotel_id": hotel_id, "reviews": len(ids), "topics": k, "model": model}
+
+
+def assign(hotel_id: int, ids: list[str]) -> int:
+    """Label new or changed vectors with the nearest topic and fold them into its centroid."""
+    with _hotel_lock(hotel_id):
+        model = load_model(hotel_id)
+        refit_missing = refit_needed = model is None
+        if model is not None:
+            centroids, topic_meta = model
+            ids, x, metadatas, _ = load_vectors(ids=ids)
+            if not ids:
+                return 0
+            current = topic_meta[0]["model"]
+            counted = np.array([
+                (m or {}).get("topic_id", -1) if (m or {}).get("topic_model") == current else -1
+                for m in metadatas
+            ], dtype=np.int64)
+            counted = counted[(counted >= 0) & (counted < len(centroids))]
+            with metrics.timer("topics_assign"):
+                labels, _ = nearest(x, centroids)
+                counts = np.array([m["size"] for m in topic_meta], dtype=np.int64)
+                # A re-embedded review is already in its old topic's size; take it out before re-adding
+                np.subtract.at(counts, counted, 1)
+                np.maximum(counts, 0, out=counts)
+                centroids = _update(centroids, counts, x, labels)
+            for meta, size in zip(topic_meta, counts):
+                meta["size"] = int(size)
+            get_topics_collection().update(
+                ids=[_topic_id(hotel_id, m["topic_id"]) for m in topic_meta],
+                embeddings=centroids.tolist(),
+                metadatas=topic_meta,
+            )
+            _write_labels(ids, metadatas, labels, current)
+            metrics.inc("topics_assigned_total", len(ids))
+            fitted = sum(m["fitted_size"] for m in topic_meta)
+            refit_needed = counts.sum() - fitted > REFIT_FRACTION * fitted
+    if refit_needed:
+        refit(hotel_id, only_if_missing=refit_missing)
+    return len(ids)
+
+
+def get_topics(hotel_id: int) -> dict:
+    """GET /topics payload; fits the hotel on first request."""
+    model = load_model(hotel_id)
+    if model is None:
+        # Concurrent first requests queue on the hotel's lock; only the first one fits
+        refit(hotel_id, only_if_missing=True)
+        model = load_model(hotel_id)
+    if model is None:
+        return {"hotel_id": hotel_id, "model": None, "topics": []}
+    _, topic_meta = model
+    total = sum(m["size"] for m in topic_meta) or 1
+    topics = [
+        {
+            "topic_id": m["topic_id"],
+            "size": m["size"],
+            "share": round(m["size"] / total, 3),
+            "terms": [t for t in m["terms"].split(", ") if t],
+            "mean_rating": m["mean_rating"] if m["mean_rating"] >= 0 else None,
+            "negative_share": m["negative_share"],
+            "examples": [e for e in m["examples"].split("|") if e],
+        }
+        for m in topic_meta
+    ]
+    topics.sort(key=lambda t: t["size"], reverse=True)
+    return {"hotel_id": hotel_id, "model": topic_meta[0]["model"], "reviews": total, "topics": topics}
+
+
+# ------------------------------------------------------------------
+# Background updates (fed by /embed/batch)
+# ------------------------------------------------------------------
+_pending: dict[int, set[str]] = {}
+_pending_lock = threading.Lock()
+_update_wanted = threading.Event()
+_update_thread: threading.Thread | None = None
+
+
+def _update_loop() -> None:
+    while True:
+        _update_wanted.wait()
+        _update_wanted.clear()
+        with _pending_lock:
+            work = dict(_pending)
+            _pending.clear()
+        for hotel_id, ids in work.items():
+            try:
+                assign(hotel_id, sorted(ids))
+            except Exception as e:
+                print(f"[WARN] Topic update failed for hotel {hotel_id}: {e}")
+
+
+def schedule_update(hotel_id: int, ids: list[str]) -> None:
+    """Queue newly embedded reviews for topic assignment on the update thread."""
+    global _update_thread
+    with _pending_lock:
+        _pending.setdefault(hotel_id, set()).update(ids)
+        if _update_thread is None:
+            _update_thread = threading.Thread(target=_update_loop, name="topic-update", daemon=True)
+            _update_thread.start()
+    _update_wanted.set()
@@ -0,0 +1,142 @@
+"""
+Compact int8 index (app.compact_index) against full float32 search on
+synthetic 768-d review vectors (the bench_topics generator: unit vectors
+around random themes).
+
+For each size, reports in-memory bytes per vector, recall@10 against exact
+float32 brute force, and single-query latency (p50/p95) for:
+  float32       exact brute force over an in-memory float32 matrix
+  int8          the compact scan alone, no re-ranking
+  int8+rerank   the compact scan, then exact re-ranking of k * R candidates
+                read from the on-disk float32 file (warm page cache)
+  chroma        the current collection (HNSW), if chromadb is installed;
+                memory is the RSS added by loading it
+
+Run from backend/embedding-service:
+    python -m benchmarks.bench_compact_index --sizes 10000 100000
+"""
+import argparse
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SERVICE_DIR = pathlib.Path(__file__).resolve().parents[1]
+K = 10
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def recall(found: list[list[str]], truth: list[list[str]]) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def timed(queries: np.ndarray, search) -> tuple[list, dict]:
+    results, times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(search(q))
+        times.append((time.perf_counter() - start) * 1000)
+    return results, {"p50_ms": round(float(np.percentile(times, 50)), 2),
+                     "p95_ms": round(float(np.percentile(times, 95)), 2)}
+
+
+def chroma_run(x: np.ndarray, ids: list[str], queries: np.ndarray, truth: list, workdir: pathlib.Path) -> dict:
+    import chromadb
+
+    before = _rss_mb()
+    client = chromadb.PersistentClient(path=str(workdir / "chroma"))
+    collection = client.create_collection("bench")
+    for start in range(0, len(x), 5000):
+        collection.add(ids=ids[start:start + 5000], embeddings=x[start:start + 5000].tolist())
+    bytes_per_vector = (_rss_mb() - before) * 2**20 / len(x)
+    found, latency = timed(queries, lambda q: collection.query(query_embeddings=[q.tolist()], n_results=K)["ids"][0])
+    return {"bytes_per_vector": round(bytes_per_vector), "recall@10": round(recall(found, truth), 3), **latency}
+
+
+def run(size: int, args) -> dict:
+    from app import compact_index
+    from benchmarks.bench_topics import synthetic
+
+    x, _ = synthetic(size, args.topics, args.noise)
+    queries, _ = synthetic(args.queries, args.topics, args.noise, seed=1)
+    ids = [f"r{i}" for i in range(size)]
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix=f"compact-{size}-"))
+
+    index = compact_index.CompactIndex(workdir / "index")
+    start = time.perf_counter()
+    for s in range(0, size, 5000):
+        index.add(ids[s:s + 5000], x[s:s + 5000], [0] * len(x[s:s + 5000]))
+    build_s = time.perf_counter() - start
+
+    def exact(q):
+        return [ids[i] for i in np.argsort(-(x @ q))[:K]]
+
+    truth, float_latency = timed(queries, exact)
+    report = {
+        "vectors": size,
+        "build_s": round(build_s, 2),
+        "float32": {"bytes_per_vector": x.itemsize * x.shape[1], "recall@10": 1.0, **float_latency},
+    }
+
+    # rerank=1 re-orders the int8 top k but cannot change the set: int8 recall alone
+    found, latency = timed(queries, lambda q: [i for i, _ in index.search(q, K, rerank=1)])
+    bytes_per_vector = round(index.memory_bytes() / size)
+    report["int8"] = {"bytes_per_vector": bytes_per_vector, "recall@10": round(recall(found, truth), 3), **latency}
+    for factor in args.rerank:
+        found, latency = timed(queries, lambda q: [i for i, _ in index.search(q, K, rerank=factor)])
+        report[f"int8+rerank{factor}"] = {
+            "bytes_per_vector": bytes_per_vector, "recall@10": round(recall(found, truth), 3), **latency
+        }
+    report["disk_bytes_per_vector"] = round(
+        sum(f.stat().st_size for f in (workdir / "index").iterdir()) / size
+    )
+
+    if args.chroma:
+        try:
+            report["chroma"] = chroma_run(x, ids, queries, truth, workdir)
+        except ImportError:
+            print("  chromadb is not installed; skipping the chroma baseline")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compact int8 index vs float32 search on synthetic embeddings.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--topics", type=int, default=200, help="Themes in the synthetic data")
+    parser.add_argument("--noise", type=float, default=0.04, help="Per-dimension noise around each theme")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[2, 4, 8], help="Candidates per result re-ranked")
+    parser.add_argument("--no-chroma", dest="chroma", action="store_false", help="Skip the Chroma baseline")
+    parser.add_argument("--out", type=pathlib.Path, help="Write the results as JSON")
+    args = parser.parse_args()
+    sys.path.insert(0, str(SERVICE_DIR))
+    os.environ.setdefault("VECTOR_INDEX", "int8")
+
+    results = []
+    for size in args.sizes:
+        r = run(size, args)
+        results.append(r)
+        print(f"{size} vectors (index build {r['build_s']}s, {r['disk_bytes_per_vector']} B/vector on disk)")
+        print(f"  {'mode':<14} {'B/vector':>9} {'recall@10':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode, m in r.items():
+            if isinstance(m, dict):
+                print(f"  {mode:<14} {m['bytes_per_vector']:>9} {m['recall@10']:>10} {m['p50_ms']:>8} {m['p95_ms']:>8}")
+
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"✓ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
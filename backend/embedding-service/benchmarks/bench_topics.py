@@ -0,0 +1,128 @@
+"""
+CPU benchmark for the topic clustering job (app.topics) on synthetic
+768-d review vectors: `--topics` true themes, each a random unit direction
+plus noise, so cluster quality can be scored against the known labels.
+
+Reports k-means fit time, a full nearest-centroid pass (vectorized vs a
+per-vector Python loop, extrapolated from a sample), the incremental
+assign step for a batch of new vectors, purity and peak RSS. Chroma is not
+involved; this measures the NumPy work only.
+
+Run from backend/embedding-service:
+    python -m benchmarks.bench_topics --sizes 10000 100000
+"""
+import argparse
+import json
+import pathlib
+import resource
+import sys
+import time
+
+import numpy as np
+
+SERVICE_DIR = pathlib.Path(__file__).resolve().parents[1]
+DIM = 768
+
+
+def synthetic(n: int, topics: int, noise: float, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Unit vectors around `topics` random centers, built in blocks to stay float32."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, DIM)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    labels = rng.integers(topics, size=n)
+    x = np.empty((n, DIM), dtype=np.float32)
+    for start in range(0, n, 10000):
+        block = labels[start:start + 10000]
+        x[start:start + len(block)] = centers[block] + noise * rng.standard_normal((len(block), DIM), dtype=np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x, labels
+
+
+def loop_nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Baseline: one vector and one centroid at a time."""
+    labels = np.empty(len(x), dtype=np.int32)
+    for i, row in enumerate(x):
+        best, best_sim = 0, -2.0
+        for j, c in enumerate(centroids):
+            sim = float(np.dot(row, c))
+            if sim > best_sim:
+                best, best_sim = j, sim
+        labels[i] = best
+    return labels
+
+
+def purity(labels: np.ndarray, truth: np.ndarray) -> float:
+    k, t = labels.max() + 1, truth.max() + 1
+    table = np.zeros((k, t), dtype=np.int64)
+    np.add.at(table, (labels, truth), 1)
+    return float(table.max(axis=1).sum() / len(labels))
+
+
+def run(size: int, args) -> dict:
+    from app import topics
+
+    x, truth = synthetic(size, args.topics, args.noise)
+    new, _ = synthetic(args.new, args.topics, args.noise, seed=1)
+
+    start = time.perf_counter()
+    centroids, labels, _ = topics.fit(x, k=args.k or args.topics)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    topics.nearest(x, centroids)
+    assign_s = time.perf_counter() - start
+
+    sample = x[:args.loop_sample]
+    start = time.perf_counter()
+    loop_nearest(sample, centroids)
+    loop_s = (time.perf_counter() - start) * size / len(sample)
+
+    counts = np.bincount(labels, minlength=len(centroids)).astype(np.int64)
+    start = time.perf_counter()
+    new_labels, _ = topics.nearest(new, centroids)
+    topics._update(centroids, counts, new, new_labels)
+    incremental_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "vectors": size,
+        "k": len(centroids),
+        "fit_s": round(fit_s, 2),
+        "assign_all_s": round(assign_s, 3),
+        "assign_all_loop_s_est": round(loop_s, 1),
+        "vectorized_speedup": round(loop_s / assign_s, 1) if assign_s else None,
+        "incremental_ms": round(incremental_ms, 2),
+        "incremental_vectors": args.new,
+        "purity": round(purity(labels, truth), 3),
+        "matrix_mb": round(x.nbytes / 2**20, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Topic clustering benchmark on synthetic embeddings.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--topics", type=int, default=30, help="True themes in the synthetic data")
+    parser.add_argument("--k", type=int, help="Clusters to fit (default: --topics)")
+    parser.add_argument("--noise", type=float, default=0.04, help="Per-dimension noise around each theme")
+    parser.add_argument("--new", type=int, default=100, help="Vectors in the incremental batch")
+    parser.add_argument("--loop-sample", type=int, default=2000, help="Vectors timed with the Python loop")
+    parser.add_argument("--out", type=pathlib.Path, help="Write the results as JSON")
+    args = parser.parse_args()
+    sys.path.insert(0, str(SERVICE_DIR))
+
+    results = []
+    for size in args.sizes:
+        r = run(size, args)
+        results.append(r)
+        print(f"{size:>8} vectors  k={r['k']:<3} fit {r['fit_s']:>6}s  assign {r['assign_all_s']}s "
+              f"(loop ~{r['assign_all_loop_s_est']}s, {r['vectorized_speedup']}x)  "
+              f"+{r['incremental_vectors']} in {r['incremental_ms']} ms  purity {r['purity']}  "
+              f"peak RSS {r['peak_rss_mb']} MB")
+
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"✓ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Production run mode for the embedding service.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Same settings as the review API's gunicorn.conf.py. WEB_CONCURRENCY
+defaults to 1 here: the Chroma client is embedded and keeps its collection
+in the process, so extra workers only help once it points at a shared
+Chroma server.
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+max_requests = int(os.getenv("WORKER_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "200"))
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+keepalive = 5
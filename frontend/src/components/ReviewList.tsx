@@ -3,6 +3,11 @@ import ReviewItem from "./ReviewItem";
 import ReviewDetailModal from "./ReviewDetailModal";
 import "./ReviewList.css";
 
+const API_BASE = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
+
+// Review ids (e.g. "REV-001") repeat across hotels; a review is (hotel_id, id)
+const sameReview = (a: any, b: any) => a.hotel_id === b.hotel_id && a.id === b.id;
+
 // const ReviewList = () => {
 //   // 1. State for data, loading, and error handling
 //   const [reviews, setReviews] = useState([]);
@@ -14,7 +19,7 @@ import "./ReviewList.css";
 //     const fetchReviews = async () => {
 //       try {
 //         // Ensure this URL matches your running FastAPI instance
-//         const response = await fetch("http://127.0.0.1:8000/reviews");
+//         const response = await fetch(`${API_BASE}/reviews`);
         
 //         if (!response.ok) {
 //           throw new Error(`HTTP error! status: ${response.status}`);
@@ -93,7 +98,7 @@ const ReviewList = () => {
     const fetchReviews = async () => {
       try {
         // Ensure this URL matches your running FastAPI instance
-        const response = await fetch("http://127.0.0.1:8000/reviews");
+        const response = await fetch(`${API_BASE}/reviews`);
         
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
@@ -110,6 +115,18 @@ const ReviewList = () => {
     };
 
     fetchReviews();
+
+    // Live updates: newly processed reviews arrive over SSE, no re-polling
+    const events = new EventSource(`${API_BASE}/reviews/stream`);
+    events.addEventListener("review", (event) => {
+      const review = JSON.parse((event as MessageEvent).data);
+      setReviews((current: any[]) => [
+        review,
+        ...current.filter((r) => !sameReview(r, review)),
+      ]);
+    });
+
+    return () => events.close();
   }, []);
 
   if (loading) {
@@ -150,7 +167,7 @@ const ReviewList = () => {
       <div className="review-rows">
         {reviews.map((review) => (
           <ReviewItem 
-            key={review.id} 
+            key={`${review.hotel_id}:${review.id}`} 
             review={review}
             onOpen={() => handleOpenReview(review)}
           />